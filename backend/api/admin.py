@@ -1,10 +1,17 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from django.utils import timezone
 from .models import (
     Program, Gallery, Testimonial, Event, Branch, 
     Inquiry, Blog, TeamMember, FAQ, Setting,
-    AboutPage, AboutFeature, HomeSlider, HomeStats, Admission
+    AboutPage, AboutFeature, HomeSlider, HomeStats, Admission, VideoIngestJob,
+    NotificationDigest,
 )
+from . import analytics
+from .changelist import HighVolumeAdminMixin
+from .export import ADMISSION_COLUMNS, INQUIRY_COLUMNS, export_admin_action
+from .video_ingest import enqueue_video_ingest
 
 
 @admin.register(Program)
@@ -42,11 +49,17 @@ class BranchAdmin(admin.ModelAdmin):
 
 
 @admin.register(Inquiry)
-class InquiryAdmin(admin.ModelAdmin):
+class InquiryAdmin(HighVolumeAdminMixin, admin.ModelAdmin):
     list_display = ['parent_name', 'phone', 'child_age', 'branch', 'created_at']
     list_filter = ['branch', 'created_at']
+    list_select_related = ['branch']
+    keyset_ordering = '-created_at'
     search_fields = ['parent_name', 'phone', 'message']
     readonly_fields = ['created_at']
+    actions = [
+        export_admin_action(INQUIRY_COLUMNS, 'inquiries', 'csv'),
+        export_admin_action(INQUIRY_COLUMNS, 'inquiries', 'xlsx'),
+    ]
 
 
 @admin.register(Blog)
@@ -112,10 +125,11 @@ class AboutFeatureAdmin(admin.ModelAdmin):
 
 @admin.register(HomeSlider)
 class HomeSliderAdmin(admin.ModelAdmin):
-    list_display = ['title', 'media_type', 'order', 'is_active', 'created_at']
-    list_filter = ['media_type', 'is_active', 'created_at']
+    list_display = ['title', 'media_type', 'order', 'is_active', 'ingest_status', 'created_at']
+    list_filter = ['media_type', 'is_active', 'ingest_status', 'created_at']
     search_fields = ['title', 'subtitle']
     list_editable = ['order', 'is_active']
+    readonly_fields = ['ingest_status', 'ingest_error']
     ordering = ['order', 'title']
     
     fieldsets = (
@@ -123,8 +137,8 @@ class HomeSliderAdmin(admin.ModelAdmin):
             'fields': ('title', 'subtitle', 'media_type')
         }),
         ('Media', {
-            'fields': ('image', 'video', 'video_poster'),
-            'description': 'Upload either an image or video. For videos: max 15 seconds duration, MP4/MOV/AVI format, max 50MB file size. You can also upload a poster image that will be shown before the video loads.'
+            'fields': ('image', 'video', 'video_poster', 'ingest_status', 'ingest_error'),
+            'description': 'Upload either an image or video. For videos: max 15 seconds duration, MP4/MOV/AVI format, max 50MB file size. You can also upload a poster image that will be shown before the video loads. Videos are processed in the background; a poster is extracted automatically if none is uploaded, and the slide goes live once processing is done.'
         }),
         ('Button Settings', {
             'fields': ('button_text', 'button_url')
@@ -134,6 +148,19 @@ class HomeSliderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        upload = form.cleaned_data.get('video')
+        if 'video' not in form.changed_data or not isinstance(upload, UploadedFile):
+            super().save_model(request, obj, form, change)
+            return
+
+        # Keep the previous video (if any) live until the new one is processed
+        obj.video = form.initial.get('video')
+        obj.ingest_status = 'pending'
+        super().save_model(request, obj, form, change)
+        enqueue_video_ingest(obj, upload)
+        messages.info(request, 'The video was queued for processing. The slide will use it once processing completes.')
+
 
 @admin.register(HomeStats)
 class HomeStatsAdmin(admin.ModelAdmin):
@@ -153,14 +180,59 @@ class HomeStatsAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(VideoIngestJob)
+class VideoIngestJobAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'slider', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    list_select_related = ['slider']
+    readonly_fields = ['slider', 'staged_path', 'original_name', 'status', 'attempts', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+def reviewer_name(request):
+    return request.user.get_full_name() or request.user.username
+
+
+def set_admission_status(queryset, status, reviewer):
+    """Move ``queryset`` to ``status`` with one UPDATE, stamping the review like save_model
+
+    Admissions already in ``status`` are left alone. Returns the number changed.
+    """
+    changing = Admission.objects.filter(pk__in=queryset.values('pk')).exclude(status=status)
+    now = timezone.now()
+    with transaction.atomic():
+        # UPDATE sends no signals; the analytics summary is moved explicitly
+        counts = analytics.count_keys(changing)
+        updated = changing.update(status=status, reviewed_at=now, reviewed_by=reviewer, updated_at=now)
+        analytics.record_status_change(counts, status)
+    return updated
+
+
+def status_action(status, label):
+    def action(modeladmin, request, queryset):
+        updated = set_admission_status(queryset, status, reviewer_name(request))
+        modeladmin.message_user(request, f'{updated} admission(s) marked as {label}.', messages.SUCCESS)
+    action.short_description = f'Mark selected admissions as {label}'
+    action.__name__ = f'mark_{status}'
+    return action
+
+
 @admin.register(Admission)
-class AdmissionAdmin(admin.ModelAdmin):
+class AdmissionAdmin(HighVolumeAdminMixin, admin.ModelAdmin):
     list_display = ['student_full_name', 'parent_full_name', 'preferred_program', 'status', 'submitted_at']
     list_filter = ['status', 'preferred_program', 'submitted_at', 'student_gender']
     search_fields = ['student_first_name', 'student_last_name', 'parent_first_name', 'parent_last_name', 'parent_email']
     list_editable = ['status']
     readonly_fields = ['submitted_at', 'updated_at']
     ordering = ['-submitted_at']
+    keyset_ordering = '-submitted_at'
+    actions = [
+        *(status_action(status, label) for status, label in Admission.STATUS_CHOICES),
+        export_admin_action(ADMISSION_COLUMNS, 'admissions', 'csv'),
+        export_admin_action(ADMISSION_COLUMNS, 'admissions', 'xlsx'),
+    ]
     
     fieldsets = (
         ('Student Information', {
@@ -194,7 +266,36 @@ class AdmissionAdmin(admin.ModelAdmin):
     )
     
     def save_model(self, request, obj, form, change):
+        pending = getattr(request, '_status_changes', None)
+        if pending is not None and change and form.changed_data == ['status']:
+            # A list_editable status edit: applied with the others in one UPDATE per status
+            pending.setdefault(obj.status, []).append(obj.pk)
+            return
         if change and 'status' in form.changed_data:
             obj.reviewed_at = timezone.now()
-            obj.reviewed_by = request.user.get_full_name() or request.user.username
+            obj.reviewed_by = reviewer_name(request)
         super().save_model(request, obj, form, change)
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST' or '_save' not in request.POST:
+            return super().changelist_view(request, extra_context)
+        request._status_changes = {}
+        with transaction.atomic():
+            response = super().changelist_view(request, extra_context)
+            for status, pks in request._status_changes.items():
+                set_admission_status(Admission.objects.filter(pk__in=pks), status, reviewer_name(request))
+        return response
+
+
+@admin.register(NotificationDigest)
+class NotificationDigestAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'kind', 'branch', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['kind', 'status', 'created_at']
+    list_select_related = ['branch']
+    readonly_fields = [
+        'kind', 'branch', 'object_ids', 'last_object_id', 'recipients', 'subject', 'body', 'status',
+        'attempts', 'next_attempt_at', 'last_error', 'created_at', 'sent_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
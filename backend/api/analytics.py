@@ -0,0 +1,308 @@
+"""
+Admission funnel numbers, behind ``AdmissionViewSet.analytics``.
+
+``AdmissionStat`` holds one count per submission month, status, preferred
+program, gender and age (in months) at the preferred start date. Saving or
+deleting an admission adjusts the counts it moves between (signals.py);
+the batch endpoint and the submission drainer create admissions with
+``bulk_create`` and call ``record_created`` themselves, and bulk status changes in the admin
+(one UPDATE) call ``record_status_change``.
+``manage.py recompute_admission_stats`` rebuilds the table from the
+Admission rows, e.g. after changes made with raw SQL.
+
+The summary grows with the number of months and distinct dimension values,
+not with the number of admissions, so the endpoint reads all of it in one
+query and aggregates it with NumPy (plain Python without it). Every change
+bumps the content version of AdmissionStat (api/cache.py), and computed
+responses are cached under that version until the next change.
+"""
+import hashlib
+from collections import Counter
+from datetime import date
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .cache import bump_version, version_token
+from .models import Admission, AdmissionStat
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+# Admission fields a summary count depends on
+SOURCE_FIELDS = ('submitted_at', 'status', 'preferred_program', 'student_gender', 'student_date_of_birth', 'preferred_start_date')
+KEY_FIELDS = ('month', 'status', 'preferred_program', 'student_gender', 'age_months')
+# Filters of the admission list that also apply to the summary
+FILTER_FIELDS = ('status', 'preferred_program', 'student_gender')
+AGE_BIN_MONTHS = 6
+# The last age bin collects everything from here up
+AGE_MAX_MONTHS = 90
+MAX_MONTHS = 120
+APPLY_ATTEMPTS = 3
+CACHE_TIMEOUT = 3600
+
+
+def as_date(value):
+    return parse_date(value) if isinstance(value, str) else value
+
+
+def month_of(moment, tz=None):
+    return timezone.localtime(moment, tz).date().replace(day=1)
+
+
+def age_in_months(born, start):
+    born, start = as_date(born), as_date(start)
+    months = (start.year - born.year) * 12 + start.month - born.month
+    return months - 1 if start.day < born.day else months
+
+
+def stat_key(values, tz=None):
+    """Summary key of an admission given as a mapping of SOURCE_FIELDS
+
+    ``tz`` saves looking up the current time zone when keying many rows.
+    """
+    return (
+        month_of(values['submitted_at'], tz),
+        values['status'],
+        values['preferred_program'],
+        values['student_gender'],
+        age_in_months(values['student_date_of_birth'], values['preferred_start_date']),
+    )
+
+
+def source_values(instance):
+    return {field: getattr(instance, field) for field in SOURCE_FIELDS}
+
+
+def apply(deltas):
+    """Add ``deltas`` ({key: change}) to the summary counts"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if len(deltas) == 1:
+        apply_one(*deltas.popitem())
+    else:
+        apply_many(deltas)
+    bump_version(AdmissionStat)
+
+
+def apply_many(deltas):
+    columns = list(zip(*deltas))
+    for attempt in range(APPLY_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # Superset of the affected rows, found through the unique index
+                candidates = AdmissionStat.objects.select_for_update().filter(**{
+                    f'{field}__in': set(values) for field, values in zip(KEY_FIELDS, columns)
+                })
+                existing = {tuple(getattr(stat, field) for field in KEY_FIELDS): stat for stat in candidates}
+                changed, created = [], []
+                for key, delta in deltas.items():
+                    stat = existing.get(key)
+                    if stat is None:
+                        created.append(AdmissionStat(**dict(zip(KEY_FIELDS, key)), count=delta))
+                    else:
+                        stat.count += delta
+                        changed.append(stat)
+                AdmissionStat.objects.bulk_update(changed, ['count'], batch_size=500)
+                AdmissionStat.objects.bulk_create(created, batch_size=500)
+            return
+        except IntegrityError:
+            # Another writer created one of the rows first; read them again
+            if attempt == APPLY_ATTEMPTS - 1:
+                raise
+
+
+def apply_one(key, delta):
+    lookup = dict(zip(KEY_FIELDS, key))
+    stats = AdmissionStat.objects.filter(**lookup)
+    if stats.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            AdmissionStat.objects.create(**lookup, count=delta)
+    except IntegrityError:
+        stats.update(count=F('count') + delta)
+
+
+def record_created(admissions):
+    """Count admissions created without signals (bulk_create)"""
+    apply(Counter(stat_key(source_values(admission)) for admission in admissions))
+
+
+def remember_previous(instance, update_fields=None):
+    """Before a save: note the values the admission is currently counted with"""
+    instance._stat_previous = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(SOURCE_FIELDS):
+        instance._stat_previous = 'unchanged'
+        return
+    instance._stat_previous = Admission.objects.filter(pk=instance.pk).values(*SOURCE_FIELDS).first()
+
+
+def record_saved(instance, update_fields=None):
+    previous = getattr(instance, '_stat_previous', None)
+    if previous == 'unchanged':
+        return
+    if previous is None:
+        apply({stat_key(source_values(instance)): 1})
+        return
+    current = dict(previous)
+    for field in SOURCE_FIELDS if update_fields is None else set(update_fields) & set(SOURCE_FIELDS):
+        current[field] = getattr(instance, field)
+    old, new = stat_key(previous), stat_key(current)
+    if old != new:
+        apply({old: -1, new: 1})
+
+
+def record_deleted(instance):
+    apply({stat_key(source_values(instance)): -1})
+
+
+def count_keys(queryset):
+    """Counter of the summary keys of the admissions in ``queryset``, grouped in the database"""
+    groups = (
+        queryset.order_by()
+        .annotate(month=TruncMonth('submitted_at'))
+        .values('month', 'status', 'preferred_program', 'student_gender', 'student_date_of_birth', 'preferred_start_date')
+        .annotate(admissions=Count('pk'))
+    )
+    counts = Counter()
+    for group in groups.iterator(chunk_size=5000):
+        key = (
+            month_of(group['month']), group['status'], group['preferred_program'], group['student_gender'],
+            age_in_months(group['student_date_of_birth'], group['preferred_start_date']),
+        )
+        counts[key] += group['admissions']
+    return counts
+
+
+def record_status_change(counts, status):
+    """Move ``counts`` (from ``count_keys``, taken before a bulk update) to ``status``"""
+    deltas = Counter()
+    for key, count in counts.items():
+        deltas[key] -= count
+        deltas[(key[0], status, *key[2:])] += count
+    apply(deltas)
+
+
+def recompute():
+    """Rebuild the summary from the Admission table; returns the number of summary rows"""
+    counts = count_keys(Admission.objects.all())
+    with transaction.atomic():
+        AdmissionStat.objects.all().delete()
+        AdmissionStat.objects.bulk_create(
+            (AdmissionStat(**dict(zip(KEY_FIELDS, key)), count=count) for key, count in counts.items()),
+            batch_size=1000,
+        )
+    bump_version(AdmissionStat)
+    return len(counts)
+
+
+def encode(values, known=()):
+    """Integer codes for ``values``; known values first, in their order"""
+    index = {value: code for code, value in enumerate(known)}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return codes, list(index)
+
+
+def bincount(codes, weights, size):
+    if np is not None:
+        return np.bincount(
+            np.asarray(codes, dtype=np.intp), weights=np.asarray(weights, dtype=np.float64), minlength=size,
+        ).astype(np.int64).tolist()
+    totals = [0] * size
+    for code, weight in zip(codes, weights):
+        totals[code] += weight
+    return totals
+
+
+def age_bins(ages):
+    last = AGE_MAX_MONTHS // AGE_BIN_MONTHS
+    if np is not None:
+        return np.clip(np.asarray(ages, dtype=np.intp) // AGE_BIN_MONTHS, 0, last).tolist()
+    return [min(max(age // AGE_BIN_MONTHS, 0), last) for age in ages]
+
+
+def matrix(row_codes, column_codes, weights, rows, columns):
+    """Weighted counts of (row, column) pairs as a list of rows"""
+    if np is not None:
+        codes = np.asarray(row_codes, dtype=np.intp) * columns + np.asarray(column_codes, dtype=np.intp)
+    else:
+        codes = [row * columns + column for row, column in zip(row_codes, column_codes)]
+    flat = bincount(codes, weights, rows * columns)
+    return [flat[row * columns:(row + 1) * columns] for row in range(rows)]
+
+
+def month_range(last, months):
+    year, month = last.year, last.month
+    result = []
+    for _ in range(months):
+        result.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return result[::-1]
+
+
+def summary(months=12, filters=None, today=None):
+    """Totals, a monthly series and the age histogram, from the summary table"""
+    today = today or timezone.localdate()
+    stats = AdmissionStat.objects.filter(count__gt=0, **(filters or {})).order_by()
+    rows = list(stats.values_list(*KEY_FIELDS, 'count'))
+    month_values, status_values, program_values, gender_values, ages, counts = (
+        list(column) for column in zip(*rows)
+    ) if rows else ([], [], [], [], [], [])
+
+    status_codes, statuses = encode(status_values, [value for value, _ in Admission.STATUS_CHOICES])
+    program_codes, programs = encode(program_values, [value for value, _ in Admission.PROGRAM_CHOICES])
+    gender_codes, genders = encode(gender_values, ['male', 'female', 'other'])
+
+    window = month_range(today, months)
+    month_index = {month: code for code, month in enumerate(window)}
+    in_window = [code for code, month in enumerate(month_values) if month in month_index]
+    monthly = matrix(
+        [month_index[month_values[code]] for code in in_window], [status_codes[code] for code in in_window],
+        [counts[code] for code in in_window], len(window), len(statuses),
+    )
+
+    bins = age_bins(ages)
+    bin_count = AGE_MAX_MONTHS // AGE_BIN_MONTHS + 1
+    by_program_age = matrix(program_codes, bins, counts, len(programs), bin_count)
+    bin_labels = [f'{low}-{low + AGE_BIN_MONTHS - 1}' for low in range(0, AGE_MAX_MONTHS, AGE_BIN_MONTHS)]
+    bin_labels.append(f'{AGE_MAX_MONTHS}+')
+
+    return {
+        'total': sum(counts),
+        'by_status': dict(zip(statuses, bincount(status_codes, counts, len(statuses)))),
+        'by_program': dict(zip(programs, bincount(program_codes, counts, len(programs)))),
+        'by_gender': dict(zip(genders, bincount(gender_codes, counts, len(genders)))),
+        'monthly': {
+            'months': [f'{month:%Y-%m}' for month in window],
+            'total': [sum(row) for row in monthly],
+            'by_status': {status: [row[code] for row in monthly] for code, status in enumerate(statuses)},
+        },
+        'age_at_start': {
+            'bin_months': AGE_BIN_MONTHS,
+            'bins': bin_labels,
+            'total': [sum(column) for column in zip(*by_program_age)] if programs else [0] * bin_count,
+            'by_program': dict(zip(programs, by_program_age)),
+        },
+    }
+
+
+def cached_summary(months=12, filters=None):
+    """``summary`` for today, cached until the admission counts change"""
+    filters = filters or {}
+    variant = '&'.join([str(timezone.localdate()), str(months), *(f'{field}={filters[field]}' for field in sorted(filters))])
+    key = f"admission-analytics:{version_token([AdmissionStat])}:{hashlib.md5(variant.encode()).hexdigest()}"
+    data = cache.get(key)
+    if data is None:
+        data = summary(months=months, filters=filters)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,99 @@
+"""
+Bulk creation of many rows through a ModelSerializer, with per-row errors.
+
+Every row is validated with a single serializer instance (``run_validation``
+on one child, not one serializer per row), and valid rows are inserted with
+``bulk_create`` in chunks, each chunk in its own transaction. Invalid rows
+are reported by position while the others are still created. If the database
+rejects a chunk (a constraint or data error), its rows are retried one by one
+so only the offending rows fail; other database errors propagate.
+
+``bulk_create`` sends no model signals. That is fine for flat models whose
+derived state the database maintains itself (for example the full-text
+triggers of api/search.py). Models with signal-driven side effects must
+reproduce them for the created rows.
+"""
+from itertools import repeat
+
+from django.db import DataError, IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from .parsers import MalformedRow
+
+
+def row_error(message):
+    return {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+
+
+class BatchResult:
+    def __init__(self):
+        self.rows = 0
+        self.ids = {}
+        self.errors = []
+        self.truncated = False
+        self.objects = []
+
+    @property
+    def created(self):
+        return len(self.ids)
+
+    def as_data(self):
+        """Summary for the API response; ``ids`` is aligned with the input rows"""
+        return {
+            'created': self.created,
+            'failed': len(self.errors),
+            'ids': [self.ids.get(row) for row in range(self.rows)],
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+
+def insert_chunk(model, pending, result):
+    try:
+        with transaction.atomic():
+            created = model.objects.bulk_create([instance for _, instance in pending])
+    except (IntegrityError, DataError):
+        created = []
+        for row, instance in pending:
+            try:
+                with transaction.atomic():
+                    created.extend(model.objects.bulk_create([instance]))
+            except (IntegrityError, DataError) as exc:
+                result.errors.append({'row': row, 'errors': row_error(str(exc))})
+    by_instance = {id(instance): row for row, instance in pending}
+    for instance in created:
+        result.ids[by_instance[id(instance)]] = instance.pk
+    result.objects.extend(created)
+
+
+def bulk_import(serializer_class, rows, context=None, chunk_size=500, max_rows=None, extra=None):
+    """Validate and create ``rows`` (an iterable of dicts); returns a BatchResult
+
+    ``extra`` optionally yields, aligned with ``rows``, attributes to set on
+    each created instance that the serializer does not accept (e.g. fields
+    excluded from the API).
+    """
+    serializer = serializer_class(context=context or {})
+    model = serializer.Meta.model
+    result = BatchResult()
+    pending = []
+    for row, (data, attributes) in enumerate(zip(rows, repeat({}) if extra is None else extra)):
+        if max_rows is not None and row >= max_rows:
+            result.truncated = True
+            break
+        result.rows = row + 1
+        if isinstance(data, MalformedRow):
+            result.errors.append({'row': row, 'errors': row_error(data.error)})
+            continue
+        try:
+            validated = serializer.run_validation(data)
+        except ValidationError as exc:
+            result.errors.append({'row': row, 'errors': exc.detail})
+            continue
+        pending.append((row, model(**validated, **attributes)))
+        if len(pending) >= chunk_size:
+            insert_chunk(model, pending, result)
+            pending = []
+    if pending:
+        insert_chunk(model, pending, result)
+    return result
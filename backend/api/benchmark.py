@@ -0,0 +1,415 @@
+"""
+Endpoint benchmarks: latency, queries and response size of every API route.
+
+``probes()`` lists one request per route registered in api/urls.py (every
+GET and POST of every router route, plus the plain paths), with detail
+routes pointed at an existing row; routes it cannot point anywhere are
+reported as skipped rather than left out silently. ``ClientRunner`` sends them through the
+Django test client; ``ServerRunner`` through a WSGI server on a local port,
+so the numbers include HTTP parsing and the full WSGI handler. Queries are
+counted with an execute wrapper on the thread that serves the request (the
+server reports its count in a response header).
+
+Each probe is sent once untimed (its latency is reported as ``cold_ms`` and
+staff-only routes are detected from its 401/403) and then ``requests``
+times. Results are plain dicts, so runs can be saved as JSON and compared
+with ``compare``.
+"""
+import http.client
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from rest_framework.renderers import JSONRenderer
+
+from . import sampledata
+from .bundles import BUNDLES
+from .cache import response_cache
+from .models import Branch
+from .profiling import PROFILING, list_profiles, save_profile
+from .querycheck import QueryLog
+from .urls import router, urlpatterns
+
+QUERY_COUNT_HEADER = 'X-Benchmark-Queries'
+# Query strings sent to routes that need one to do real work
+PROBE_QUERIES = {
+    'search-list': 'q=play+learning',
+    'admission-export': 'export_format=csv',
+    'inquiry-export': 'export_format=csv',
+    'admission-analytics': 'months=24',
+}
+BATCH_ROWS = 10
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 2.0
+
+Probe = namedtuple('Probe', ['name', 'method', 'path', 'body'])
+Skipped = namedtuple('Skipped', ['name', 'reason'])
+
+
+def request_data(serializer_class, instance):
+    """The writable fields of ``instance`` as its serializer would accept them"""
+    serializer = serializer_class(instance)
+    writable = {name for name, field in serializer.fields.items() if not field.read_only}
+    return {name: value for name, value in serializer.data.items() if name in writable and value is not None}
+
+
+def post_body(name, viewset):
+    """JSON body for the POST routes: generated like the sample data"""
+    rng = random.Random(name)
+    now = timezone.now()
+    context = {'now': now - timedelta(days=1), 'urls': {}, 'ids': {Branch: list(Branch.objects.values_list('pk', flat=True)[:50])}}
+    build = {'inquiry': sampledata.build_inquiry, 'admission': sampledata.build_admission}[name.split('-')[0]]
+    rows = [request_data(viewset.serializer_class, build(rng, index, context)) for index in range(BATCH_ROWS)]
+    return JSONRenderer().render(rows if name.endswith('-batch') else rows[0])
+
+
+def lookup_value(viewset, basename):
+    if basename == 'bundle':
+        return sorted(BUNDLES)[0] if BUNDLES else None
+    queryset = getattr(viewset, 'queryset', None)
+    if queryset is None:
+        return None
+    return queryset.order_by('pk').values_list(viewset.lookup_field, flat=True).first()
+
+
+def pattern_kwargs(name):
+    """URL kwargs of an existing object for the plain paths with converters"""
+    if name == 'profile-detail':
+        profiles = list_profiles()
+        return {'profile_id': profiles[0]['id']} if profiles else None
+    return None
+
+
+def probes(skipped=None):
+    """One Probe per (route, method) of api/urls.py
+
+    Routes with no object to request are appended to ``skipped`` as Skipped.
+    """
+    skipped = [] if skipped is None else skipped
+    found = [Probe('api-root', 'GET', reverse('api-root'), None)]
+    for prefix, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            mapping = router.get_method_map(viewset, route.mapping)
+            if not mapping:
+                # The viewset has none of the route's actions: the router does not register it
+                continue
+            name = route.name.format(basename=basename)
+            kwargs = {}
+            if route.detail:
+                value = lookup_value(viewset, basename)
+                if value is None:
+                    skipped.append(Skipped(name, f'no {basename} to look up'))
+                    continue
+                lookup_field = getattr(viewset, 'lookup_field', 'pk')
+                kwargs[getattr(viewset, 'lookup_url_kwarg', None) or lookup_field] = value
+            path = reverse(name, kwargs=kwargs)
+            if name in PROBE_QUERIES:
+                path = f'{path}?{PROBE_QUERIES[name]}'
+            for method in mapping:
+                if method == 'get':
+                    found.append(Probe(name, 'GET', path, None))
+                elif method == 'post' and not route.detail:
+                    found.append(Probe(name, 'POST', path, post_body(name, viewset)))
+    for pattern in urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        kwargs = pattern_kwargs(pattern.name) if pattern.pattern.converters else {}
+        if kwargs is None:
+            skipped.append(Skipped(pattern.name, f"no {pattern.name.split('-')[0]} to look up"))
+            continue
+        found.append(Probe(pattern.name, 'GET', reverse(pattern.name, kwargs=kwargs), None))
+    return found
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def summarize(probe, mode, staff, cold, timings, queries, sizes, status):
+    return {
+        'route': probe.name, 'method': probe.method, 'path': probe.path, 'mode': mode, 'staff': staff,
+        'status': status, 'requests': len(timings), 'cold_ms': round(cold * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'queries': max(queries), 'bytes': max(sizes),
+    }
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def counting_queries():
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+class Runner:
+    """Sends probes and collects their statistics; subclasses do the sending"""
+    mode = None
+
+    def __init__(self, staff_user, requests=30):
+        self.staff_user = staff_user
+        self.requests = requests
+
+    def send(self, probe, staff):
+        """Returns (status, bytes, queries, seconds)"""
+        raise NotImplementedError
+
+    def run(self, probe):
+        staff = False
+        status, size, queries, cold = self.send(probe, staff)
+        if status in (401, 403):
+            staff = True
+            status, size, queries, cold = self.send(probe, staff)
+        timings, query_counts, sizes = [], [], []
+        for _ in range(self.requests):
+            status, size, queries, elapsed = self.send(probe, staff)
+            timings.append(elapsed)
+            query_counts.append(queries)
+            sizes.append(size)
+        return summarize(probe, self.mode, staff, cold, timings, query_counts, sizes, status)
+
+
+class ClientRunner(Runner):
+    mode = 'client'
+
+    def __init__(self, staff_user, requests=30):
+        super().__init__(staff_user, requests)
+        self.anonymous = Client()
+        self.staff = Client()
+        self.staff.force_login(staff_user)
+
+    def send(self, probe, staff):
+        client = self.staff if staff else self.anonymous
+        with counting_queries() as counter:
+            started = time.perf_counter()
+            if probe.method == 'POST':
+                response = client.post(probe.path, probe.body, content_type='application/json')
+            else:
+                response = client.get(probe.path)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - started
+        return response.status_code, len(content), counter.count, elapsed
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def counting_application(application):
+    """Wrap a WSGI application to report its query count in QUERY_COUNT_HEADER
+
+    The body is read inside the wrapper so queries made while streaming
+    count too.
+    """
+    def wrapped(environ, start_response):
+        captured = []
+        with counting_queries() as counter:
+            result = application(environ, lambda status, headers, exc_info=None: captured.append((status, headers)))
+            try:
+                body = b''.join(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        status, headers = captured[-1]
+        start_response(status, [*headers, (QUERY_COUNT_HEADER, str(counter.count))])
+        return [body]
+    return wrapped
+
+
+class ServerRunner(Runner):
+    """Sends probes over HTTP to a single-threaded WSGI server, like one sync worker"""
+    mode = 'server'
+
+    def __init__(self, staff_user, requests=30):
+        super().__init__(staff_user, requests)
+        login = Client()
+        login.force_login(staff_user)
+        self.csrf_token = get_random_string(32)
+        self.staff_cookie = (
+            f'{settings.SESSION_COOKIE_NAME}={login.cookies[settings.SESSION_COOKIE_NAME].value}; '
+            f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+        )
+        self.server = WSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        self.server.set_app(counting_application(WSGIHandler()))
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def send(self, probe, staff):
+        headers = {'Connection': 'close'}
+        if staff:
+            headers['Cookie'] = self.staff_cookie
+            headers['X-CSRFToken'] = self.csrf_token
+        if probe.body is not None:
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        conn = http.client.HTTPConnection('127.0.0.1', self.port)
+        try:
+            conn.request(probe.method, probe.path, body=probe.body, headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+        finally:
+            conn.close()
+        elapsed = time.perf_counter() - started
+        return response.status, len(content), int(response.getheader(QUERY_COUNT_HEADER, 0)), elapsed
+
+
+def sample_profile():
+    """A stored profile for /api/profiles/<id>/ to serve"""
+    return save_profile('sample', b'benchmark.py:sample_profile 1\n', {
+        'created_at': timezone.now().isoformat(), 'method': 'GET', 'path': '/api/', 'view': 'api-root',
+        'status': 200, 'duration_ms': 0.0, 'samples': 1, 'user': 'endpoint-benchmark',
+    })
+
+
+@contextmanager
+def scratch_files(workdir):
+    """Media on local storage and profiles under ``workdir``, with one stored profile"""
+    profile_dir = PROFILING['DIR']
+    PROFILING['DIR'] = os.path.join(workdir, 'profiles')
+    try:
+        sample_profile()
+        with override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                # Admin pages render without a collectstatic manifest
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            MEDIA_ROOT=os.path.join(workdir, 'media'),
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1'],
+            SECURE_SSL_REDIRECT=False,
+        ):
+            yield
+    finally:
+        PROFILING['DIR'] = profile_dir
+
+
+@contextmanager
+def scratch_database(keepdb=False):
+    """A test database to seed, with media and profiles in a temporary directory"""
+    workdir = tempfile.mkdtemp(prefix='endpoint-benchmark-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+        # A file, not the in-memory default: the server thread needs its own connection to it
+        test_settings['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        with scratch_files(workdir):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def staff_user():
+    user, _ = get_user_model().objects.get_or_create(
+        username='endpoint-benchmark', defaults={'is_staff': True, 'is_superuser': True},
+    )
+    return user
+
+
+def admin_probes():
+    """One Probe per admin changelist"""
+    return [
+        Probe(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist', 'GET',
+              reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'), None)
+        for model in admin.site._registry
+    ]
+
+
+def send_cold(client, probe):
+    """(status, QueryLog) of ``probe`` sent with empty caches"""
+    cache.clear()
+    response_cache.clear()
+    log = QueryLog()
+    with connection.execute_wrapper(log):
+        if probe.method == 'POST':
+            response = client.post(probe.path, probe.body, content_type='application/json')
+        else:
+            response = client.get(probe.path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return response.status_code, log
+
+
+def measure_queries(selected, user):
+    """{(method, name): (status, QueryLog)} of one cold request per probe, as ``user`` if refused anonymously"""
+    anonymous, staff = Client(), Client()
+    staff.force_login(user)
+    results = {}
+    for probe in selected:
+        status, log = send_cold(anonymous, probe)
+        if status in (302, 401, 403):
+            status, log = send_cold(staff, probe)
+        results[(probe.method, probe.name)] = (status, log)
+    return results
+
+
+def result_key(result):
+    return (result['scale'], result['mode'], result['method'], result['route'])
+
+
+def compare(baseline, current, tolerance=0.2, min_delta_ms=MIN_LATENCY_DELTA_MS):
+    """Regressions of ``current`` against ``baseline`` (both lists of results)
+
+    A result regresses when its p95 grew by more than ``tolerance`` (and by
+    at least ``min_delta_ms``), or when it makes more queries.
+    """
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in current:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        problems = []
+        delta = result['p95_ms'] - before['p95_ms']
+        if delta >= min_delta_ms and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            problems.append(f"p95 {before['p95_ms']:.1f}ms -> {result['p95_ms']:.1f}ms")
+        if result['queries'] > before['queries']:
+            problems.append(f"queries {before['queries']} -> {result['queries']}")
+        if problems:
+            regressions.append((result, problems))
+    return regressions
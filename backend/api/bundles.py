@@ -0,0 +1,130 @@
+"""
+Response bundles: several read-only endpoints composed into one JSON document.
+
+A bundle is declared as a mapping of output keys to (viewset, action) pairs.
+Each part is produced by running the real viewset action, so a bundle always
+returns exactly what the individual endpoints would. The composed document is
+rendered to bytes once and kept in ``response_cache`` until one of the
+underlying models changes (tracked through ``ContentVersion``) or the
+shortest of the bundle's and its endpoints' cache timeouts expires.
+"""
+import copy
+import hashlib
+
+from django.conf import settings
+from django.http import QueryDict
+from django.utils.http import quote_etag
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+
+from .cache import format_versions, request_versions, response_cache
+
+DEFAULT_BUNDLE_TIMEOUT = getattr(settings, 'API_BUNDLE_TIMEOUT', 300)
+
+
+class BundlePart:
+    def __init__(self, viewset, action='list', query=''):
+        self.viewset_path = viewset
+        self.action = action
+        self.query = query
+        self._view = None
+
+    @property
+    def viewset(self):
+        return import_string(self.viewset_path)
+
+    @property
+    def model(self):
+        return self.viewset.queryset.model
+
+    @property
+    def timeout(self):
+        """How long the endpoint itself caches its responses"""
+        return getattr(self.viewset, 'cache_timeout', None) or response_cache.timeout
+
+    def view(self):
+        if self._view is None:
+            self._view = self.viewset.as_view({'get': self.action})
+        return self._view
+
+    def render(self, request):
+        """Run the viewset action against a clean GET copy of ``request``"""
+        sub_request = copy.copy(request)
+        sub_request.method = 'GET'
+        sub_request.GET = QueryDict(self.query)
+        sub_request.META = {**request.META, 'REQUEST_METHOD': 'GET', 'QUERY_STRING': self.query}
+        # The bundle is cached as a whole; parts must return unrendered data
+        sub_request.skip_response_cache = True
+        response = self.view()(sub_request)
+        return response.status_code, response.data
+
+
+class Bundle:
+    def __init__(self, name, parts, timeout=DEFAULT_BUNDLE_TIMEOUT):
+        self.name = name
+        self.parts = parts
+        self.timeout = timeout
+
+    @property
+    def models(self):
+        return [part.model for part in self.parts.values()]
+
+    @property
+    def cache_timeout(self):
+        """The bundle timeout, shortened to that of any part that expires sooner"""
+        return min([self.timeout, *(part.timeout for part in self.parts.values())])
+
+    def build(self, request):
+        """Compose all parts; returns (payload, cacheable)"""
+        payload = {}
+        cacheable = True
+        for key, part in self.parts.items():
+            status_code, data = part.render(request)
+            payload[key] = data
+            if status_code >= 400:
+                cacheable = False
+        return payload, cacheable
+
+    def render(self, request):
+        """Return (content, etag, last_modified), rebuilding only when stale"""
+        # Absolute media URLs depend on the requesting host
+        base_url = request.build_absolute_uri('/')
+        versions = request_versions(request, self.models)
+        key = response_cache.make_key('bundle', self.name, base_url, format_versions(versions))
+        cached = response_cache.get(key, f'bundle.{self.name}')
+        if cached is None:
+            payload, cacheable = self.build(request)
+            content = JSONRenderer().render(payload)
+            cached = (content, quote_etag(hashlib.md5(content).hexdigest()))
+            if cacheable:
+                response_cache.set(key, cached, self.cache_timeout)
+
+        timestamps = [updated_at for _, updated_at in versions.values() if updated_at]
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        return cached[0], cached[1], last_modified
+
+
+BUNDLES = {}
+
+
+def register_bundle(name, parts, **kwargs):
+    BUNDLES[name] = Bundle(name, parts, **kwargs)
+    return BUNDLES[name]
+
+
+def get_bundle(name):
+    return BUNDLES.get(name)
+
+
+register_bundle('home', {
+    'home_slider': BundlePart('api.views.HomeSliderViewSet'),
+    'home_stats': BundlePart('api.views.HomeStatsViewSet'),
+    'testimonials': BundlePart('api.views.TestimonialViewSet'),
+    'programs': BundlePart('api.views.ProgramViewSet'),
+    'upcoming_events': BundlePart('api.views.EventViewSet', 'upcoming'),
+})
+
+register_bundle('about', {
+    'about_page': BundlePart('api.views.AboutPageViewSet'),
+    'features_by_category': BundlePart('api.views.AboutFeatureViewSet', 'by_category'),
+})
@@ -0,0 +1,356 @@
+"""
+Model-versioned caching helpers for the public API.
+
+Every content model served by the public endpoints has a row in
+``ContentVersion`` whose counter is bumped by post_save/post_delete signals
+(see api/signals.py). Cached payloads are keyed by the versions of the models
+they were built from, so a change to any of them makes the old entry
+unreachable without having to track and delete individual keys. Versions live
+in the database, which keeps invalidation consistent across gunicorn workers.
+
+Rendered responses are kept in a bounded in-process LRU and, when
+``API_CACHE['SHARED_ALIAS']`` names a Django cache (Redis, Memcached...), in
+that shared tier as well so a payload built by one worker serves all of them.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import (
+    Program, Gallery, Testimonial, Event, Branch,
+    Blog, TeamMember, FAQ, Setting,
+    AboutPage, AboutFeature, HomeSlider, HomeStats, ContentVersion
+)
+
+# Models whose changes must invalidate cached public responses
+VERSIONED_MODELS = [
+    Program, Gallery, Testimonial, Event, Branch,
+    Blog, TeamMember, FAQ, Setting,
+    AboutPage, AboutFeature, HomeSlider, HomeStats,
+]
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def bump_version(model):
+    """Increment the version counter of ``model`` after a write"""
+    label = model_label(model)
+    updated = ContentVersion.objects.filter(label=label).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                ContentVersion.objects.create(label=label, version=1)
+        except IntegrityError:
+            # Another worker created the row first
+            ContentVersion.objects.filter(label=label).update(
+                version=F('version') + 1, updated_at=timezone.now()
+            )
+
+
+def get_versions(models):
+    """Return {label: (version, updated_at)} for ``models`` in one query"""
+    labels = sorted({model_label(model) for model in models})
+    rows = ContentVersion.objects.filter(label__in=labels).values_list('label', 'version', 'updated_at')
+    versions = {label: (0, None) for label in labels}
+    for label, version, updated_at in rows:
+        versions[label] = (version, updated_at)
+    return versions
+
+
+def request_versions(request, models):
+    """``get_versions`` memoized for the lifetime of one request"""
+    request = getattr(request, '_request', request)
+    memo = request.__dict__.setdefault('_content_versions', {})
+    labels = tuple(sorted({model_label(model) for model in models}))
+    if labels not in memo:
+        memo[labels] = get_versions(models)
+    return memo[labels]
+
+
+def format_versions(versions):
+    return '.'.join(f"{label}:{versions[label][0]}" for label in sorted(versions))
+
+
+def version_token(models, request=None):
+    """Compact string identifying the current state of ``models``"""
+    versions = request_versions(request, models) if request is not None else get_versions(models)
+    return format_versions(versions)
+
+
+API_CACHE = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 512,
+    'TIMEOUT': 300,
+    'SHARED_ALIAS': None,
+    'STATS_FLUSH_INTERVAL': 10,
+    **getattr(settings, 'API_CACHE', {}),
+}
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheStats:
+    """Hit/miss counters per scope (usually ``ViewSet.action``)
+
+    Counters are kept per process. With a shared tier configured, deltas are
+    periodically added to shared counters so the hit ratio of the whole
+    deployment can be read from any worker. Scopes are listed in numbered
+    slots: the process whose ``add`` of ``api:stats:scope:<name>`` succeeds
+    takes the next slot number with ``incr``, so concurrent flushes never
+    overwrite each other's scopes.
+    """
+    FIELDS = ('local_hits', 'shared_hits', 'misses')
+
+    def __init__(self, shared=None, flush_interval=10):
+        self.shared = shared
+        self.flush_interval = flush_interval
+        self._counts = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # Scopes this process knows to be listed in the shared tier
+        self._listed = set()
+
+    def record(self, scope, field):
+        with self._lock:
+            for counts in (self._counts, self._pending):
+                scope_counts = counts.setdefault(scope, dict.fromkeys(self.FIELDS, 0))
+                scope_counts[field] += 1
+        if self.shared is not None and time.monotonic() - self._last_flush > self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        try:
+            for scope, counts in pending.items():
+                for field, value in counts.items():
+                    if not value:
+                        continue
+                    key = f'api:stats:{scope}:{field}'
+                    self.shared.add(key, 0, timeout=None)
+                    self.shared.incr(key, value)
+                if scope not in self._listed:
+                    self.list_scope(scope)
+                    self._listed.add(scope)
+        except Exception:
+            # Statistics must never break a request
+            pass
+
+    def list_scope(self, scope):
+        if self.shared.add(f'api:stats:scope:{scope}', True, timeout=None):
+            self.shared.add('api:stats:scope-count', 0, timeout=None)
+            slot = self.shared.incr('api:stats:scope-count')
+            self.shared.set(f'api:stats:scope-slot:{slot}', scope, timeout=None)
+
+    def shared_scopes(self):
+        count = self.shared.get('api:stats:scope-count') or 0
+        slots = self.shared.get_many([f'api:stats:scope-slot:{slot}' for slot in range(1, count + 1)])
+        return sorted(set(slots.values()))
+
+    @staticmethod
+    def summarize(counts):
+        summary = {}
+        for scope, scope_counts in sorted(counts.items()):
+            hits = scope_counts['local_hits'] + scope_counts['shared_hits']
+            total = hits + scope_counts['misses']
+            summary[scope] = {**scope_counts, 'hit_ratio': round(hits / total, 4) if total else None}
+        return summary
+
+    def snapshot(self):
+        with self._lock:
+            counts = {scope: dict(values) for scope, values in self._counts.items()}
+        return self.summarize(counts)
+
+    def shared_snapshot(self):
+        if self.shared is None:
+            return None
+        counts = {}
+        for scope in self.shared_scopes():
+            counts[scope] = {
+                field: self.shared.get(f'api:stats:{scope}:{field}') or 0 for field in self.FIELDS
+            }
+        return self.summarize(counts)
+
+
+class ResponseCache:
+    """Two-tier cache for rendered API payloads"""
+
+    def __init__(self, max_entries=512, timeout=300, shared_alias=None, stats_flush_interval=10):
+        self.timeout = timeout
+        self.local = LRUCache(max_entries)
+        self.shared = caches[shared_alias] if shared_alias else None
+        self.stats = CacheStats(self.shared, stats_flush_interval)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_entries=API_CACHE['MAX_ENTRIES'],
+            timeout=API_CACHE['TIMEOUT'],
+            shared_alias=API_CACHE['SHARED_ALIAS'],
+            stats_flush_interval=API_CACHE['STATS_FLUSH_INTERVAL'],
+        )
+
+    @staticmethod
+    def make_key(*parts):
+        raw = '|'.join(str(part) for part in parts)
+        return 'api:resp:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key, scope):
+        value = self.local.get(key)
+        if value is not None:
+            self.stats.record(scope, 'local_hits')
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                value = None
+            if value is not None:
+                self.local.set(key, value, self.timeout)
+                self.stats.record(scope, 'shared_hits')
+                return value
+        self.stats.record(scope, 'misses')
+        return None
+
+    def set(self, key, value, timeout=None):
+        timeout = timeout or self.timeout
+        self.local.set(key, value, timeout)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, timeout)
+            except Exception:
+                pass
+
+    def clear(self):
+        self.local.clear()
+
+
+response_cache = ResponseCache.from_settings()
+
+
+def normalize_query(query_params):
+    """Order-independent representation of the request query string"""
+    return '&'.join(
+        f"{key}={','.join(sorted(query_params.getlist(key)))}" for key in sorted(query_params)
+    )
+
+
+def cached_view(func):
+    """Serve a viewset action from ``response_cache`` (see CachedViewMixin)"""
+    @functools.wraps(func)
+    def wrapper(self, request, *args, **kwargs):
+        return self.cached_response(func, request, *args, **kwargs)
+    return wrapper
+
+
+class CachedViewMixin:
+    """Cache rendered JSON responses of the viewset actions decorated with ``@cached_view``
+
+    The key combines the viewset, action, URL kwargs, normalized query params,
+    requesting host and the content versions of ``cache_models`` (the
+    viewset's model by default).
+    """
+    cache_models = None
+    cache_timeout = None
+
+    def get_cache_models(self):
+        return self.cache_models or [self.queryset.model]
+
+    def get_cache_scope(self):
+        return f"{self.__class__.__name__}.{self.action}"
+
+    def get_cache_key(self, request, kwargs):
+        return response_cache.make_key(
+            self.get_cache_scope(),
+            sorted(kwargs.items()),
+            normalize_query(request.query_params),
+            request.build_absolute_uri('/'),
+            request.accepted_media_type,
+            version_token(self.get_cache_models(), request),
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if (not API_CACHE['ENABLED'] or request.method != 'GET'
+                or getattr(request, 'skip_response_cache', False)
+                or getattr(request.accepted_renderer, 'format', None) != 'json'):
+            return handler(self, request, *args, **kwargs)
+
+        scope = self.get_cache_scope()
+        key = self.get_cache_key(request, kwargs)
+        cached = response_cache.get(key, scope)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(self, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            response_cache.set(key, (response.content, response['Content-Type']), self.cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedResponseMixin(CachedViewMixin):
+    """CachedViewMixin caching ``list`` and ``retrieve`` of a read-only model viewset"""
+
+    @cached_view
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_view
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
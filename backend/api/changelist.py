@@ -0,0 +1,124 @@
+"""
+High-volume mode for the admin changelists of the submission tables.
+
+The stock changelist runs COUNT(*) twice per page (filtered and unfiltered),
+pages with OFFSET, which gets slower with every page, and searches with
+``icontains`` over every search field. ``HighVolumeAdminMixin`` instead:
+
+* counts with the planner's estimate on PostgreSQL once a result has more
+  than ``ESTIMATE_ABOVE`` rows (a briefly cached exact COUNT below that and
+  on other databases) and skips the unfiltered total;
+* pages with keysets (api/pagination.py) while the list has its default
+  ordering, so every page costs the same as the first; sorting by a column
+  or asking for a page number falls back to numbered pages;
+* searches through the model's full-text index (api/search.py) when it has
+  one.
+"""
+from functools import cached_property
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.utils.text import smart_split, unescape_string_literal
+from rest_framework.exceptions import NotFound
+
+from .pagination import KeysetPagination, cached_count, encode_cursor, estimated_count
+from .search import full_text_search
+
+CURSOR_VAR = 'cursor'
+ESTIMATE_ABOVE = 10000
+COUNT_CACHE_TIMEOUT = 60
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count is the planner's estimate for large results"""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        self.estimated = estimate is not None and estimate > ESTIMATE_ABOVE
+        if self.estimated:
+            return estimate
+        return cached_count(self.object_list, COUNT_CACHE_TIMEOUT)
+
+
+class KeysetChangeList(ChangeList):
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def keyset_applies(self, request):
+        ordering = self.model_admin.keyset_ordering
+        return bool(ordering) and not self.show_all and not (
+            {ORDER_VAR, PAGE_VAR} & set(request.GET)
+        )
+
+    def get_results(self, request):
+        self.keyset = None
+        if not self.keyset_applies(request):
+            super().get_results(request)
+            self.count_estimated = getattr(self.paginator, 'estimated', False)
+            return
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        keyset = KeysetPagination(request, self.model_admin.keyset_ordering, self.list_per_page, CURSOR_VAR)
+        # Only the key columns are read to find the page, then its rows by primary key
+        keys = self.queryset.select_related(None).only(keyset.field_name)
+        try:
+            rows = keyset.paginate_queryset(keys)
+        except NotFound:
+            raise IncorrectLookupParameters
+        self.keyset = keyset
+        self.keyset_previous_url = self.keyset_url(keyset, rows[0] if rows else None, reverse=True)
+        self.keyset_next_url = self.keyset_url(keyset, rows[-1] if rows else None, reverse=False)
+
+        self.paginator = paginator
+        self.result_count = paginator.count
+        self.count_estimated = getattr(paginator, 'estimated', False)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = keyset.has_next or keyset.has_previous
+        self.result_list = self.queryset.filter(pk__in=[row.pk for row in rows])
+
+    def keyset_url(self, keyset, row, reverse):
+        if not (keyset.has_previous if reverse else keyset.has_next):
+            return None
+        value, pk = keyset.edge(row)
+        return self.get_query_string({CURSOR_VAR: encode_cursor(value, pk, reverse)}, [PAGE_VAR, ALL_VAR])
+
+    @property
+    def keyset_first_url(self):
+        return self.get_query_string(remove=[CURSOR_VAR, PAGE_VAR, ALL_VAR])
+
+
+class HighVolumeAdminMixin:
+    """ModelAdmin mixin for tables with up to millions of rows (see module docstring)
+
+    ``keyset_ordering`` is the default ordering field ('-field' or 'field',
+    with an index on (field, id)) that keyset pages follow.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    keyset_ordering = None
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_ordering(self, request):
+        if self.keyset_ordering:
+            return [self.keyset_ordering]
+        return super().get_ordering(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term:
+            terms = [
+                unescape_string_literal(bit) if bit[0] in {'"', "'"} and bit[-1] == bit[0] else bit
+                for bit in smart_split(search_term)
+            ]
+            matches = full_text_search(queryset, search_term, terms)
+            if matches is not None:
+                return matches, False
+        return super().get_search_results(request, queryset, search_term)
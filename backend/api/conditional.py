@@ -0,0 +1,112 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304) for public endpoints.
+
+Validators are computed without serializing any rows: one aggregate query
+(count and latest timestamp) over the queryset the action would return, plus
+the ``ContentVersion`` counters of the models involved. The counters catch
+edits and deletes on models that only carry ``created_at``, the aggregate
+catches time-dependent querysets such as upcoming events.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import APIException
+
+from .cache import normalize_query, request_versions
+
+DEFAULT_CACHE_CONTROL = getattr(settings, 'API_CACHE_CONTROL', 'no-cache')
+
+
+def timestamp_field(model):
+    """Name of the field that best tracks when a row last changed"""
+    names = {field.name for field in model._meta.get_fields()}
+    for name in ('updated_at', 'created_at', 'submitted_at'):
+        if name in names:
+            return name
+    return None
+
+
+def queryset_validators(queryset):
+    """Return (count, latest timestamp) for ``queryset`` in one query"""
+    field = timestamp_field(queryset.model)
+    aggregates = {'count': Count('pk')}
+    if field:
+        aggregates['last'] = Max(field)
+    if not queryset.query.is_sliced:
+        queryset = queryset.order_by()
+    result = queryset.aggregate(**aggregates)
+    return result['count'], result.get('last')
+
+
+def conditional_view(func):
+    """Answer If-None-Match/If-Modified-Since for a viewset action"""
+    @functools.wraps(func)
+    def wrapper(self, request, *args, **kwargs):
+        return self.conditional_response(func, request, *args, **kwargs)
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """Emit ETag/Last-Modified on read-only actions and short-circuit with 304
+
+    Expects ``get_cache_models()`` from CachedViewMixin. Actions whose
+    data does not come from ``filter_queryset(get_queryset())`` override
+    ``get_validator_queryset``. Keyset-paginated lists only aggregate the rows
+    of the requested page, so deep pages stay as cheap as the first.
+    """
+    cache_control = DEFAULT_CACHE_CONTROL
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        elif self.action == 'list' and hasattr(self.paginator, 'validator_queryset'):
+            queryset = self.paginator.validator_queryset(queryset, self.request, self)
+        return queryset
+
+    def get_validators(self, request, kwargs):
+        count, last = queryset_validators(self.get_validator_queryset())
+        versions = request_versions(request, self.get_cache_models())
+        timestamps = [ts for ts in [last] + [updated_at for _, updated_at in versions.values()] if ts]
+        raw = '|'.join(str(part) for part in (
+            self.__class__.__name__, self.action, sorted(kwargs.items()),
+            normalize_query(request.query_params), request.build_absolute_uri('/'),
+            request.accepted_media_type, count, last,
+            sorted((label, version) for label, (version, _) in versions.items()),
+        ))
+        etag = quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(self, request, *args, **kwargs)
+        try:
+            etag, last_modified = self.get_validators(request, kwargs)
+        except (ValueError, TypeError, DjangoValidationError, APIException):
+            # Invalid lookups/filters: let the action produce its usual error
+            return handler(self, request, *args, **kwargs)
+
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(self, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = self.cache_control
+        return response
+
+    @conditional_view
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_view
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,235 @@
+"""
+Streaming CSV and XLSX exports of querysets, for staff.
+
+Rows are read with ``values_list().iterator(chunk_size)`` (a server-side
+cursor on PostgreSQL) and encoded as they are fetched, and the encoded bytes
+go straight to a ``StreamingHttpResponse``. The first bytes reach the client
+immediately, and memory stays flat however many rows are exported. XLSX is
+written as a zip stream with the worksheet in inline-string form, so it
+needs no spreadsheet library and no temporary file.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import capfirst
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from .models import Admission, Inquiry
+
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Text a spreadsheet would run as a formula (phone numbers like "+91 ..." are left alone)
+FORMULA_PREFIX = re.compile(r'^(?:[=@\t\r]|[+-](?![\d\s(]))')
+# Characters XML 1.0 does not allow, e.g. control characters pasted into a message
+XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def model_columns(model, exclude=('idempotency_key', 'idempotency_fingerprint'), related=None):
+    """(header, field path) pairs for the concrete fields of ``model``
+
+    ``related`` maps a foreign key to the (header, path) exported in its place,
+    e.g. the branch name instead of its id.
+    """
+    related = related or {}
+    columns = []
+    for field in model._meta.concrete_fields:
+        if field.name in exclude:
+            continue
+        if field.name in related:
+            columns.append(related[field.name])
+        else:
+            columns.append((capfirst(str(field.verbose_name)), field.attname))
+    return columns
+
+
+ADMISSION_COLUMNS = model_columns(Admission)
+INQUIRY_COLUMNS = model_columns(Inquiry, related={'branch': ('Branch', 'branch__name')})
+
+
+def column_values(queryset, columns):
+    """Yield one tuple per row for ``columns`` ((header, field path) pairs)
+
+    Choice fields are exported with their labels.
+    """
+    paths = [path for _, path in columns]
+    labels = []
+    for path in paths:
+        field = queryset.model._meta.get_field(path) if '__' not in path else None
+        labels.append(dict(field.flatchoices) if field is not None and field.choices else None)
+    for row in queryset.values_list(*paths).iterator(chunk_size=CHUNK_SIZE):
+        yield tuple(
+            choices.get(value, value) if choices else value
+            for value, choices in zip(row, labels)
+        )
+
+
+def cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if timezone.is_aware(value) else value.isoformat(' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_cell(value):
+    text = cell_text(value)
+    return "'" + text if FORMULA_PREFIX.match(text) else text
+
+
+class Echo:
+    """File-like object whose ``write`` returns what was written (for csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(header, rows):
+    writer = csv.writer(Echo())
+    # Byte order mark, so spreadsheet programs read the file as UTF-8
+    yield '\ufeff'.encode()
+    yield writer.writerow(header).encode()
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row]).encode()
+
+
+class ChunkSink:
+    """Write-only stream that hands the bytes written so far to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def xlsx_cell(value):
+    if isinstance(value, bool) or value is None or not isinstance(value, (int, float, Decimal)):
+        text = XML_ILLEGAL.sub('', cell_text(value))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+    return f'<c><v>{value}</v></c>'
+
+
+def xlsx_stream(header, rows, sheet='Export'):
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content.replace('{sheet}', escape(sheet[:31])))
+        yield sink.take()
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet_file:
+            sheet_file.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet_file.write(f'<row r="1">{"".join(map(xlsx_cell, header))}</row>'.encode())
+            for number, row in enumerate(rows, start=2):
+                sheet_file.write(f'<row r="{number}">{"".join(map(xlsx_cell, row))}</row>'.encode())
+                if number % CHUNK_SIZE == 0:
+                    data = sink.take()
+                    if data:
+                        yield data
+            sheet_file.write(b'</sheetData></worksheet>')
+    yield sink.take()
+
+
+def export_response(queryset, columns, filename, file_format='csv'):
+    """StreamingHttpResponse with ``queryset`` as a CSV or XLSX download"""
+    header = [title for title, _ in columns]
+    rows = column_values(queryset, columns)
+    if file_format == 'xlsx':
+        content = xlsx_stream(header, rows, sheet=filename)
+    else:
+        content = csv_stream(header, rows)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[file_format])
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{file_format}"'
+    response['Cache-Control'] = 'no-store'
+    # Tell nginx-style proxies not to buffer the whole download
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_admin_action(columns, filename, file_format):
+    """Admin action downloading the selected rows"""
+    def export(modeladmin, request, queryset):
+        return export_response(queryset, columns, filename, file_format)
+    export.short_description = f'Export selected {filename} ({file_format.upper()})'
+    export.__name__ = f'export_{file_format}'
+    return export
+
+
+class ExportMixin:
+    """``export`` list action: the filtered queryset as a streaming download
+
+    ``?export_format=csv`` (default) or ``xlsx``; the other query parameters
+    filter and order the rows like the list endpoint, without pagination.
+    """
+    export_columns = None
+    export_filename = 'export'
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        file_format = request.query_params.get('export_format', 'csv')
+        if file_format not in CONTENT_TYPES:
+            raise ValidationError({'export_format': [f'Choose one of: {", ".join(CONTENT_TYPES)}.']})
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, self.export_columns, self.export_filename, file_format)
@@ -0,0 +1,472 @@
+"""
+Write-behind ingestion of public form submissions (Inquiry and Admission POSTs).
+
+With ``SUBMISSION_INGEST_MODE = 'queue'`` a submission is validated in the
+request and then appended to a local journal instead of being inserted, and
+the client gets ``202 Accepted`` straight away. ``manage.py drain_submissions``
+inserts the journaled rows in batches through api/batch.py. In the default
+``'sync'`` mode submissions are inserted in the request as before.
+
+The journal is a directory of append-only NDJSON segments, one per process
+(``<host>-<pid>-<time>-<n>.ndjson``), so writers never contend for a file. Each
+record is flushed and fsynced before the request is acknowledged. The drainer
+runs under an exclusive lock. It keeps the byte offset it has consumed in
+each segment in ``drain-state.json`` and deletes segments that are consumed
+and no longer written to. Like the video staging directory, the journal is
+local: the drainer must run on the same host as the web processes
+(see start.sh).
+
+Every journaled submission carries an ``idempotency_key``: the client's
+``Idempotency-Key`` header if it sent one, otherwise a generated id. The key
+is stored in a unique column with a hash of the validated submission. A
+client retry with the same body is answered from the cache or the existing
+row instead of creating a duplicate, without returning the stored row; a key
+reused with a different body gets 422. While a submission is queued that
+check goes through the default cache, so queue mode needs a cache the web
+processes share (REDIS_URL); with a per-process cache submissions are
+inserted synchronously instead. The drainer checks again against the table:
+a replayed drain skips rows that are already inserted, and a key that arrives
+with a different submission is rejected and reported, not dropped.
+"""
+import fcntl
+import functools
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from . import analytics
+from .batch import bulk_import
+from .models import Admission
+from .serializers import AdmissionSerializer, InquirySerializer
+
+logger = logging.getLogger(__name__)
+
+INGEST_MODE = getattr(settings, 'SUBMISSION_INGEST_MODE', 'sync')
+QUEUE_DIR = getattr(settings, 'SUBMISSION_QUEUE_DIR', os.path.join(settings.BASE_DIR, 'submission_queue'))
+# Start a new segment once the current one is this large
+SEGMENT_BYTES = getattr(settings, 'SUBMISSION_QUEUE_SEGMENT_BYTES', 4 * 1024 * 1024)
+FSYNC = getattr(settings, 'SUBMISSION_QUEUE_FSYNC', True)
+# How long a retried Idempotency-Key is answered from the cache
+IDEMPOTENCY_TTL = getattr(settings, 'SUBMISSION_IDEMPOTENCY_TTL', 24 * 60 * 60)
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+STATE_FILE = 'drain-state.json'
+REJECTED_FILE = 'rejected.ndjson'
+LOCK_FILE = '.drain.lock'
+SEGMENT_SUFFIX = '.ndjson'
+# Cache backends whose entries only the current process sees
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@functools.lru_cache(maxsize=None)
+def shared_cache():
+    """Whether every web process sees the same default cache"""
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return True
+    if INGEST_MODE == 'queue':
+        logger.warning(
+            'SUBMISSION_INGEST_MODE=queue needs a cache shared by the web processes (set REDIS_URL) '
+            'to detect reused Idempotency-Keys; inserting submissions synchronously'
+        )
+    return False
+
+
+def queue_enabled():
+    return INGEST_MODE == 'queue' and shared_cache()
+
+
+def idempotency_key(request):
+    key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({IDEMPOTENCY_HEADER: f'At most {MAX_KEY_LENGTH} characters.'})
+    return key or None
+
+
+def cache_key(model, key):
+    return f'api:idempotency:{model._meta.label_lower}:{key}'
+
+
+class Journal:
+    """Append-only segment of the current process, reopened after a fork"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+        self._sequence = 0
+
+    def segment_path(self):
+        self._sequence += 1
+        name = f'{socket.gethostname()}-{os.getpid()}-{int(time.time())}-{self._sequence}{SEGMENT_SUFFIX}'
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.segment_path(), 'ab')
+        self._pid = os.getpid()
+
+    def append(self, record):
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            if self._file is None or self._pid != os.getpid() or self._file.tell() >= SEGMENT_BYTES:
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+            if FSYNC:
+                os.fsync(self._file.fileno())
+
+
+journal = Journal(QUEUE_DIR)
+
+
+def primitive_data(serializer):
+    """``validated_data`` as JSON-ready input the serializer accepts again"""
+    return {
+        name: serializer.fields[name].to_representation(value) if value is not None else None
+        for name, value in serializer.validated_data.items()
+    }
+
+
+def submission_fingerprint(serializer):
+    """SHA-256 of the validated submission, independent of how the body was encoded"""
+    data = json.dumps(primitive_data(serializer), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def enqueue(serializer, key=None, fingerprint=None):
+    """Journal a validated submission; returns its idempotency key"""
+    key = key or uuid.uuid4().hex
+    journal.append({
+        'model': serializer.Meta.model._meta.label_lower,
+        'key': key,
+        'fingerprint': fingerprint,
+        'data': primitive_data(serializer),
+        'queued_at': timezone.now().isoformat(),
+    })
+    return key
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = f'This {IDEMPOTENCY_HEADER} was already used for a different submission.'
+    default_code = 'idempotency_key_reused'
+
+
+class IngestCreateMixin:
+    """``create`` that honours Idempotency-Key and can defer the insert to the journal
+
+    Views override ``created_response(instance)`` to shape the 201 body. A
+    retried key is answered by ``replayed_response(instance)``, which names the
+    existing row but does not echo it back, and only when the retry carries
+    the same submission: a key reused with a different body is refused.
+    """
+
+    def create(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        key = idempotency_key(request)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        fingerprint = submission_fingerprint(serializer)
+
+        if key:
+            existing = model.objects.filter(idempotency_key=key).only('pk', 'idempotency_fingerprint').first()
+            if existing is not None:
+                return self.replay(existing, fingerprint)
+
+        if queue_enabled():
+            if key and not cache.add(cache_key(model, key), fingerprint, IDEMPOTENCY_TTL):
+                # A retry of a submission that is still queued
+                if cache.get(cache_key(model, key)) != fingerprint:
+                    raise IdempotencyKeyReused
+                return self.queued_response(key)
+            try:
+                return self.queued_response(enqueue(serializer, key, fingerprint))
+            except OSError:
+                if key:
+                    cache.delete(cache_key(model, key))
+                raise
+
+        try:
+            with transaction.atomic():
+                serializer.save(idempotency_key=key, idempotency_fingerprint=fingerprint if key else None)
+        except IntegrityError:
+            # A concurrent retry with the same key won the insert
+            existing = model.objects.filter(idempotency_key=key).first() if key else None
+            if existing is None:
+                raise
+            return self.replay(existing, fingerprint)
+        return self.created_response(serializer.instance)
+
+    def replay(self, instance, fingerprint):
+        if instance.idempotency_fingerprint != fingerprint:
+            raise IdempotencyKeyReused
+        return self.replayed_response(instance)
+
+    def created_response(self, instance):
+        data = self.get_serializer(instance).data
+        return Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(data))
+
+    def replayed_response(self, instance):
+        return Response(
+            {'message': 'Submission already received.', 'id': instance.pk},
+            status=status.HTTP_201_CREATED,
+        )
+
+    def queued_response(self, key):
+        return Response(
+            {'message': 'Submission received and queued for processing.', 'submission_id': key},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+# Drainer
+
+SERIALIZERS = {
+    serializer.Meta.model._meta.label_lower: serializer for serializer in (InquirySerializer, AdmissionSerializer)
+}
+
+
+def segment_owner(name):
+    """(host, pid) that writes the segment ``name``"""
+    host, pid = name[:-len(SEGMENT_SUFFIX)].rsplit('-', 3)[:2]
+    return host, int(pid)
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def list_segments(directory=QUEUE_DIR):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    segments = [name for name in names if name.endswith(SEGMENT_SUFFIX) and name != REJECTED_FILE]
+    return sorted(segments, key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+
+
+def load_state(directory=QUEUE_DIR):
+    try:
+        with open(os.path.join(directory, STATE_FILE)) as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {'offsets': {}, 'drained': 0, 'rejected': 0, 'duplicates': 0, 'conflicts': 0, 'last_drain_at': None}
+
+
+def save_state(state, directory=QUEUE_DIR):
+    path = os.path.join(directory, STATE_FILE)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(state, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+def read_records(path, offset, limit):
+    """Up to ``limit`` complete records after ``offset``; returns (records, new offset)"""
+    records = []
+    with open(path, 'rb') as handle:
+        handle.seek(offset)
+        while len(records) < limit:
+            line = handle.readline()
+            if not line.endswith(b'\n'):
+                # A record still being written; it is read on the next pass
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.error('Skipping corrupt record in %s before offset %d', path, offset)
+    return records, offset
+
+
+@contextmanager
+def drain_lock(directory=QUEUE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'w') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def insert_records(records, state, directory=QUEUE_DIR):
+    """Insert journaled ``records``; rows that fail validation go to the rejected file
+
+    A record whose key is already taken is a duplicate when it carries the
+    same submission, and a conflict, rejected like an invalid row, when not.
+    """
+    by_label = {}
+    for record in records:
+        by_label.setdefault(record['model'], []).append(record)
+    rejected = []
+    for label, group in by_label.items():
+        serializer_class = SERIALIZERS[label]
+        model = serializer_class.Meta.model
+        # Rows of a drain that was interrupted after its insert committed
+        taken = dict(model.objects.filter(
+            idempotency_key__in=[record['key'] for record in group],
+        ).values_list('idempotency_key', 'idempotency_fingerprint'))
+        fresh = []
+        for record in group:
+            fingerprint = record.get('fingerprint')
+            if record['key'] not in taken:
+                taken[record['key']] = fingerprint
+                fresh.append(record)
+            elif fingerprint is None or taken[record['key']] in (None, fingerprint):
+                state['duplicates'] += 1
+            else:
+                state['conflicts'] = state.get('conflicts', 0) + 1
+                rejected.append({**record, 'errors': {IDEMPOTENCY_HEADER: [IdempotencyKeyReused.default_detail]}})
+        result = bulk_import(
+            serializer_class, [record['data'] for record in fresh],
+            extra=[
+                {'idempotency_key': record['key'], 'idempotency_fingerprint': record.get('fingerprint')}
+                for record in fresh
+            ],
+        )
+        state['drained'] += result.created
+        if model is Admission:
+            # bulk_create sends no signals
+            analytics.record_created(result.objects)
+        for error in result.errors:
+            rejected.append({**fresh[error['row']], 'errors': error['errors']})
+    if rejected:
+        state['rejected'] += len(rejected)
+        with open(os.path.join(directory, REJECTED_FILE), 'a') as handle:
+            for record in rejected:
+                logger.warning('Rejected queued %s submission %s: %s', record['model'], record['key'], record['errors'])
+                handle.write(json.dumps(record, default=str) + '\n')
+
+
+def drain(batch_size=500, directory=QUEUE_DIR):
+    """Insert every complete journaled record; returns the number of records read"""
+    state = load_state(directory)
+    offsets = state['offsets']
+    segments = list_segments(directory)
+    host = socket.gethostname()
+    newest = {}
+    for name in segments:
+        newest[segment_owner(name)] = name
+
+    read = 0
+    for name in segments:
+        path = os.path.join(directory, name)
+        offset = offsets.get(name, 0)
+        while True:
+            started = time.monotonic()
+            records, new_offset = read_records(path, offset, batch_size)
+            if not records:
+                break
+            insert_records(records, state, directory)
+            offset = offsets[name] = new_offset
+            read += len(records)
+            state['last_drain_at'] = timezone.now().isoformat()
+            state['last_batch'] = {'records': len(records), 'seconds': round(time.monotonic() - started, 4)}
+            save_state(state, directory)
+
+        owner_host, pid = segment_owner(name)
+        finished = newest[(owner_host, pid)] != name or (owner_host == host and not process_alive(pid))
+        if finished and offset < os.path.getsize(path):
+            # No writer will complete the last line: a write torn by a crash
+            logger.error('Discarding incomplete record at the end of %s', path)
+            offset = os.path.getsize(path)
+        if finished:
+            os.remove(path)
+            offsets.pop(name, None)
+            save_state(state, directory)
+    return read
+
+
+def lag(directory=QUEUE_DIR):
+    """Backlog of the journal: pending records, bytes and age of the oldest"""
+    state = load_state(directory)
+    pending = pending_bytes = 0
+    oldest = None
+    for name in list_segments(directory):
+        path = os.path.join(directory, name)
+        offset = state['offsets'].get(name, 0)
+        size = os.path.getsize(path)
+        if size <= offset:
+            continue
+        pending_bytes += size - offset
+        with open(path, 'rb') as handle:
+            handle.seek(offset)
+            lines = [line for line in handle if line.endswith(b'\n') and line.strip()]
+        pending += len(lines)
+        if lines:
+            queued_at = parse_datetime(json.loads(lines[0])['queued_at'])
+            oldest = queued_at if oldest is None else min(oldest, queued_at)
+    return {
+        'mode': INGEST_MODE,
+        'pending': pending,
+        'pending_bytes': pending_bytes,
+        'oldest_pending_seconds': round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0,
+        'drained': state['drained'],
+        'rejected': state['rejected'],
+        'duplicates': state['duplicates'],
+        'conflicts': state.get('conflicts', 0),
+        'last_drain_at': state['last_drain_at'],
+        'last_batch': state.get('last_batch'),
+    }
+
+
+def run_drainer(once=False, interval=1, batch_size=500):
+    """Drain the journal until interrupted (or until it is empty with ``once``)
+
+    Returns the number of records read, or None if another drainer holds the lock.
+    """
+    with drain_lock() as acquired:
+        if not acquired:
+            return None
+        total = 0
+        while True:
+            try:
+                read = drain(batch_size)
+            except Exception:
+                # Database unavailable etc.: the offsets were not advanced, retry later
+                logger.exception('Draining queued submissions failed')
+                read = 0
+                if once:
+                    raise
+            total += read
+            if not read:
+                if once:
+                    return total
+                time.sleep(interval)
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import VERSIONED_MODELS, bump_version
+from api.media import compute_resolved_urls, generate_local_variants, is_image_field
+
+
+class Command(BaseCommand):
+    help = 'Store the resolved public URL of every uploaded image/video/poster in its *_resolved_url column'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--variants', action='store_true',
+            help='Also (re)generate responsive WebP variants of images on local storage',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in VERSIONED_MODELS:
+            fields = getattr(model, 'RESOLVED_MEDIA_FIELDS', None)
+            if not fields:
+                continue
+
+            columns = [f'{field}_resolved_url' for field in fields]
+            image_fields = [field for field in fields if is_image_field(model, field)]
+            changed = []
+            total = 0
+            variants = 0
+            for obj in model.objects.only('pk', *fields, *columns).iterator(chunk_size=batch_size):
+                if options['variants']:
+                    for field in image_fields:
+                        variants += generate_local_variants(getattr(obj, field))
+                urls = compute_resolved_urls(obj)
+                if any(getattr(obj, column) != url for column, url in urls.items()):
+                    for column, url in urls.items():
+                        setattr(obj, column, url)
+                    changed.append(obj)
+                if len(changed) >= batch_size:
+                    model.objects.bulk_update(changed, columns)
+                    total += len(changed)
+                    changed = []
+            if changed:
+                model.objects.bulk_update(changed, columns)
+                total += len(changed)
+
+            if total:
+                # bulk_update sends no signals; invalidate cached payloads here
+                bump_version(model)
+            self.stdout.write(f'{model.__name__}: {total} rows updated, {variants} variants generated')
+
+        self.stdout.write(self.style.SUCCESS('Media URL backfill completed!'))
@@ -0,0 +1,97 @@
+import json
+import random
+import time
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Admission
+
+FIRST_NAMES = ('Aarav', 'Diya', 'Kabir', 'Meera', 'Vihaan', 'Anaya', 'Ishaan', 'Saanvi', 'Reyansh', 'Myra')
+LAST_NAMES = ('Sharma', 'Patel', 'Iyer', 'Khan', 'Das', 'Reddy', 'Singh', 'Nair', 'Gupta', 'Joshi')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure /api/admissions/batch/ throughput (JSON and NDJSON) against one POST per admission'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--invalid', type=float, default=0.01, help='Share of rows with a validation error')
+        parser.add_argument('--single', type=int, default=200, help='Rows posted one at a time for comparison')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rows = [self.make_row(rng, index, rng.random() < options['invalid']) for index in range(options['rows'])]
+        client = APIClient()
+        client.force_authenticate(get_user_model()(username='benchmark', is_staff=True, is_superuser=True))
+        url = reverse('admission-batch')
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.measure('batch, JSON array', len(rows), lambda: client.post(
+                url, json.dumps(rows), content_type='application/json',
+            ))
+            self.measure('batch, NDJSON', len(rows), lambda: client.post(
+                url, '\n'.join(json.dumps(row) for row in rows), content_type='application/x-ndjson',
+            ))
+            single = rows[:options['single']]
+            self.measure('one POST per row', len(single), lambda: [
+                client.post(reverse('admission-list'), row, format='json') for row in single
+            ])
+
+    def measure(self, label, count, post):
+        # Rows are rolled back after each measurement
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                response = post()
+                elapsed = time.perf_counter() - started
+                created = Admission.objects.count()
+                raise Rollback
+        except Rollback:
+            pass
+        if isinstance(response, list):
+            response = response[-1]
+        detail = ''
+        if response.status_code in (200, 201) and 'failed' in response.data:
+            detail = f", {response.data['failed']} rejected"
+        self.stdout.write(
+            f'{label:<20} {count:>6} rows in {elapsed:6.2f}s = {count / elapsed:8.0f} rows/s '
+            f'({created} in table{detail})'
+        )
+
+    @staticmethod
+    def make_row(rng, index, invalid):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        row = {
+            'student_first_name': first,
+            'student_last_name': last,
+            'student_date_of_birth': date(2020 + rng.randint(0, 3), rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+            'student_gender': rng.choice(('male', 'female', 'other')),
+            'parent_first_name': rng.choice(FIRST_NAMES),
+            'parent_last_name': last,
+            'parent_email': f'parent{index}@example.com',
+            'parent_phone': f'+91 98{rng.randint(10000000, 99999999)}',
+            'emergency_contact_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'emergency_contact_phone': f'+91 97{rng.randint(10000000, 99999999)}',
+            'emergency_contact_relationship': 'Grandparent',
+            'address': f'{rng.randint(1, 500)} MG Road',
+            'city': 'Pune',
+            'state': 'Maharashtra',
+            'zip_code': f'4110{rng.randint(10, 99)}',
+            'preferred_program': rng.choice(('toddler', 'preschool', 'pre_k')),
+            'preferred_start_date': '2026-06-01',
+        }
+        if invalid:
+            row['parent_email'] = 'not-an-email'
+        return row
@@ -0,0 +1,134 @@
+import json
+import logging
+import platform
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api import sampledata
+from api.benchmark import ClientRunner, ServerRunner, compare, probes, scratch_database, staff_user
+from api.cache import response_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed every model at the given scales in a scratch database and time every route of api/urls.py '
+        'through the test client and a local WSGI server: p50/p95/p99 latency, queries and bytes per request. '
+        'Media use local file storage, so nothing is sent to Cloudinary.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=float, nargs='+', default=[1, 100],
+                            help='Data sizes as multiples of the base row counts (e.g. 1 100 10000)')
+        parser.add_argument('--requests', type=int, default=30, help='Timed requests per route')
+        parser.add_argument('--modes', nargs='+', choices=['client', 'server'], default=['client', 'server'])
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Only routes whose name contains this (repeatable), e.g. admission-')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=sampledata.BATCH_SIZE)
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', dest='baseline', help='JSON file of an earlier run to compare with')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 growth over the baseline, as a fraction')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the scratch database between runs')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be positive')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        results, counts = [], {}
+        with scratch_database(options['keepdb']):
+            for scale in options['scales']:
+                counts[scale] = self.seed(scale, options)
+                results += self.measure(scale, options)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'meta': self.meta(options, counts), 'results': results}, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(baseline['results'], results, options['tolerance'])
+            for result, problems in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f"REGRESSION {result['scale']:g}x {result['mode']} {result['method']} {result['route']}: "
+                    f"{'; '.join(problems)}"
+                ))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} routes regressed')
+
+    def seed(self, scale, options):
+        call_command('flush', interactive=False, verbosity=0)
+        started = time.perf_counter()
+        counts = sampledata.seed(scale, options['seed'], options['batch_size'])
+        self.stdout.write(
+            f'Seeded {sum(counts.values())} rows at {scale:g}x in {time.perf_counter() - started:.1f}s'
+        )
+        return {model._meta.label: count for model, count in counts.items()}
+
+    def measure(self, scale, options):
+        user = staff_user()
+        skipped = []
+        selected = [
+            probe for probe in probes(skipped)
+            if not options['routes'] or any(part in probe.name for part in options['routes'])
+        ]
+        for route in skipped:
+            if not options['routes'] or any(part in route.name for part in options['routes']):
+                self.stdout.write(self.style.WARNING(f'{scale:>7g}x skipped {route.name}: {route.reason}'))
+        results = []
+        # Staff-only routes are found by their 403 to an anonymous request; don't log those
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            for mode in options['modes']:
+                results += self.run_mode(mode, user, selected, scale, options)
+        finally:
+            request_logger.setLevel(level)
+        return results
+
+    def run_mode(self, mode, user, selected, scale, options):
+        # Every mode starts with cold caches
+        cache.clear()
+        response_cache.clear()
+        if mode == 'client':
+            return self.run_probes(ClientRunner(user, options['requests']), selected, scale)
+        with ServerRunner(user, options['requests']) as runner:
+            return self.run_probes(runner, selected, scale)
+
+    def run_probes(self, runner, selected, scale):
+        results = []
+        for probe in selected:
+            result = {'scale': scale, **runner.run(probe)}
+            style = self.style.SUCCESS if result['status'] < 400 else self.style.ERROR
+            self.stdout.write(
+                f"{scale:>7g}x {runner.mode:<6} {probe.method:<4} {probe.name:<28} {style(str(result['status']))} "
+                f"p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+                f"{result['queries']:3d} queries  {result['bytes']:>9} bytes"
+            )
+            results.append(result)
+        return results
+
+    def meta(self, options, counts):
+        return {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'seed': options['seed'],
+            'rows': {f'{scale:g}': rows for scale, rows in counts.items()},
+        }
@@ -0,0 +1,70 @@
+import time
+import tracemalloc
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Admission
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed admissions and stream /api/admissions/export/ as CSV and XLSX, reporting time to first byte, '
+        'total time and peak Python memory; the seeded rows are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[20000, 100000],
+                            help='Table sizes to measure; peak memory should not grow with them')
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        client.force_authenticate(get_user_model()(username='benchmark', is_staff=True, is_superuser=True))
+        url = reverse('admission-export')
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for rows in sorted(options['rows']):
+                try:
+                    with transaction.atomic():
+                        self.seed(rows)
+                        for file_format in ('csv', 'xlsx'):
+                            self.measure(client, url, rows, file_format)
+                        raise Rollback
+                except Rollback:
+                    pass
+
+    def measure(self, client, url, rows, file_format):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(url, {'export_format': file_format})
+        content = iter(response.streaming_content)
+        size = len(next(content))
+        first_byte = time.perf_counter() - started
+        for chunk in content:
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{rows:>8} rows {file_format:<4} first byte {first_byte * 1000:7.1f}ms, '
+            f'total {elapsed:6.2f}s, {size / 2 ** 20:7.1f} MiB, peak memory {peak / 2 ** 20:6.1f} MiB'
+        )
+
+    def seed(self, rows):
+        Admission.objects.bulk_create((Admission(
+            student_first_name=f'Student{i}', student_last_name='Export', student_date_of_birth=date(2021, 1, 1),
+            student_gender='other', parent_first_name='Parent', parent_last_name='Export',
+            parent_email=f'parent{i}@example.com', parent_phone='+91 9800000000', emergency_contact_name='Contact',
+            emergency_contact_phone='0', emergency_contact_relationship='Relative', address='12 MG Road',
+            city='Pune', state='Maharashtra', zip_code='411001', preferred_program='preschool',
+            preferred_start_date=date(2026, 6, 1), why_choose_us='Close to home and a lovely garden.',
+        ) for i in range(rows)), batch_size=2000)
@@ -0,0 +1,45 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from api.media import compute_resolved_urls
+from api.models import Gallery
+from api.serializers import GallerySerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare serializing a gallery page with stored resolved URLs against per-row storage .url() calls'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        items = options['items']
+        repeat = options['repeat']
+        request = RequestFactory().get('/api/gallery/')
+
+        # Unsaved instances: the benchmark measures URL building, not the database
+        unresolved = [
+            Gallery(pk=i, title=f'Item {i}', type='image', image=f'gallery/item_{i}.jpg', category='Activities')
+            for i in range(items)
+        ]
+        resolved = []
+        for obj in unresolved:
+            copy = Gallery(pk=obj.pk, title=obj.title, type=obj.type, image=obj.image.name, category=obj.category)
+            for column, url in compute_resolved_urls(copy).items():
+                setattr(copy, column, url)
+            resolved.append(copy)
+
+        def serialize(rows):
+            return GallerySerializer(rows, many=True, context={'request': request}).data
+
+        storage_time = min(timeit.repeat(lambda: serialize(unresolved), number=1, repeat=repeat))
+        stored_time = min(timeit.repeat(lambda: serialize(resolved), number=1, repeat=repeat))
+
+        self.stdout.write(f'{items} gallery items, best of {repeat}:')
+        self.stdout.write(f'  storage .url() per row: {storage_time * 1000:.2f} ms')
+        self.stdout.write(f'  stored resolved URLs:   {stored_time * 1000:.2f} ms')
+        if stored_time:
+            self.stdout.write(self.style.SUCCESS(f'  speedup: {storage_time / stored_time:.1f}x'))
@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import similarity
+from api.models import Blog
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time the related-posts rebuild on synthetic topical posts and check neighbour quality'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--topics', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--db', action='store_true',
+                            help='Also time the full rebuild against the database (rolled back)')
+
+    def handle(self, *args, **options):
+        if not similarity.available():
+            raise CommandError('NumPy is not installed')
+        rng = random.Random(options['seed'])
+        posts, topics = self.make_posts(rng, options['posts'], options['topics'])
+
+        started = time.perf_counter()
+        indptr, columns, values = similarity.term_frequencies(texts for _, *texts in posts)
+        tokenized = time.perf_counter()
+        idf = similarity.inverse_document_frequency(columns, len(posts))
+        vectors = similarity.project(indptr, columns, values, idf)
+        projected = time.perf_counter()
+        neighbours = list(similarity.nearest(vectors, list(range(len(posts)))))
+        finished = time.perf_counter()
+
+        same_topic = sum(topics[row] == topics[column] for row, columns_, _ in neighbours for column in columns_)
+        total = sum(len(columns_) for _, columns_, _ in neighbours)
+        self.stdout.write(f'{len(posts)} posts, {options["topics"]} topics, {len(columns)} non-zero terms:')
+        self.stdout.write(f'  tokenize + hash:    {tokenized - started:.2f}s')
+        self.stdout.write(f'  TF-IDF + project:   {projected - tokenized:.2f}s')
+        self.stdout.write(f'  top-{similarity.TOP_K} neighbours:    {finished - projected:.2f}s')
+        self.stdout.write(f'  total:              {finished - started:.2f}s')
+        self.stdout.write(f'  neighbours sharing the topic: {same_topic / max(total, 1):.1%}')
+
+        if options['db']:
+            try:
+                with transaction.atomic():
+                    Blog.objects.bulk_create(
+                        [Blog(title=title, slug=f'benchmark-related-{index}', excerpt=excerpt, content=content,
+                              image='blog/benchmark.jpg') for index, title, excerpt, content in posts],
+                        batch_size=1000,
+                    )
+                    started = time.perf_counter()
+                    count = similarity.rebuild()
+                    self.stdout.write(f'  database rebuild of {count} posts: {time.perf_counter() - started:.2f}s')
+                    Blog.objects.filter(slug='benchmark-related-0').first().save()
+                    started = time.perf_counter()
+                    similarity.process_updates()
+                    self.stdout.write(f'  worker update of one saved post: {(time.perf_counter() - started) * 1000:.0f}ms')
+                    raise Rollback
+            except Rollback:
+                pass
+
+    @staticmethod
+    def make_posts(rng, count, topic_count):
+        def words(prefix, size):
+            return [f'{prefix}{rng.randrange(10 ** 6):x}' for _ in range(size)]
+
+        shared = words('w', 3000)
+        vocabularies = [words(f't{topic}x', 40) for topic in range(topic_count)]
+        posts, topics = [], []
+        for index in range(count):
+            topic = rng.randrange(topic_count)
+
+            def text(size):
+                # A third topical words, the rest shared filler
+                return ' '.join(
+                    rng.choice(vocabularies[topic]) if rng.random() < 0.33 else rng.choice(shared)
+                    for _ in range(size)
+                )
+
+            posts.append((index, text(8), text(40), text(400)))
+            topics.append(topic)
+        return posts, topics
@@ -0,0 +1,98 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import Blog
+from api.search import FullTextSearchFilter, SearchRankOrderingFilter, has_search_index
+from api.views import BlogViewSet
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vi', 'so', 'da', 'pe', 'zu', 'bo')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare indexed full-text blog search with icontains SearchFilter as the table grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated blog row counts to measure at')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--term', default='garden curiosity')
+        parser.add_argument('--matches', type=int, default=50,
+                            help='Rows containing the term; constant so only the table size varies')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not has_search_index(Blog, connection):
+            self.stdout.write(self.style.WARNING(
+                f'No full-text index on {connection.vendor}; both columns measure icontains'
+            ))
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        # Seeded rows are rolled back at the end
+        try:
+            with transaction.atomic():
+                self.run(sizes, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, options):
+        rng = random.Random(options['seed'])
+        vocabulary = [
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(5000)
+        ]
+        # Spread the matching rows over the smallest table size
+        planted = set(rng.sample(range(sizes[0]), min(options['matches'], sizes[0])))
+        request = Request(APIRequestFactory().get('/api/blogs/', {'search': options['term']}))
+        view = BlogViewSet(request=request, format_kwarg=None)
+
+        def search(backends):
+            queryset = Blog.objects.all()
+            for backend in backends:
+                queryset = backend().filter_queryset(request, queryset, view)
+            # What a paginated list does: count plus the first page
+            return queryset.count(), list(queryset[:20])
+
+        indexed = (FullTextSearchFilter, SearchRankOrderingFilter)
+        scanning = (SearchFilter,)
+
+        self.stdout.write(f'Search for {options["term"]!r} ({connection.vendor}), best of {options["repeat"]}:')
+        self.stdout.write(f'{"rows":>8} {"matches":>8} {"full-text":>12} {"icontains":>12}')
+        created = 0
+        for size in sizes:
+            while created < size:
+                batch = min(2000, size - created)
+                Blog.objects.bulk_create([
+                    self.make_blog(rng, vocabulary, created + i, options['term'] if created + i in planted else '')
+                    for i in range(batch)
+                ])
+                created += batch
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE api_blog')
+
+            matches = search(indexed)[0]
+            fts_time = min(timeit.repeat(lambda: search(indexed), number=1, repeat=options['repeat']))
+            scan_time = min(timeit.repeat(lambda: search(scanning), number=1, repeat=options['repeat']))
+            self.stdout.write(f'{size:>8} {matches:>8} {fts_time * 1000:>9.2f} ms {scan_time * 1000:>9.2f} ms')
+
+    @staticmethod
+    def make_blog(rng, vocabulary, index, planted_term):
+        def text(words):
+            return ' '.join(rng.choice(vocabulary) for _ in range(words))
+
+        return Blog(
+            title=text(5).capitalize(),
+            slug=f'benchmark-search-{index}',
+            excerpt=text(25),
+            content='\n\n'.join([text(80), planted_term, text(80), text(80)]),
+            image='blog/benchmark.jpg',
+        )
@@ -0,0 +1,111 @@
+import statistics
+import time
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from api import sampledata
+from api.cache import API_CACHE
+from api.timing import RequestTimings, _current, timed, timing_settings
+
+DEFAULT_PATHS = (
+    '/api/programs/', '/api/gallery/', '/api/blogs/', '/api/events/upcoming/',
+    '/api/about-features/by_category/', '/api/home-slider/',
+)
+MODES = ('disabled', 'enabled', 'measured')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the overhead of Server-Timing instrumentation: the same requests with the middleware '
+        'disabled, enabled but not measuring, and measuring. The response cache is bypassed so every '
+        'request serializes and renders.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', nargs='+', default=list(DEFAULT_PATHS))
+        parser.add_argument('--requests', type=int, default=200, help='Requests per path and mode')
+        parser.add_argument('--scale', type=float, default=1,
+                            help='Sample data to add first (api/sampledata.py), rolled back at the end; 0 for none')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        cache_enabled = API_CACHE['ENABLED']
+        API_CACHE['ENABLED'] = False
+        try:
+            with transaction.atomic():
+                if options['scale'] > 0:
+                    sampledata.seed(options['scale'], options['seed'], sampledata.BATCH_SIZE)
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            API_CACHE['ENABLED'] = cache_enabled
+
+    def client(self, enabled, path):
+        # The middleware reads its settings when the handler loads it, on the first request
+        with override_settings(SERVER_TIMING={**timing_settings(), 'ENABLED': enabled, 'OPT_IN': True}):
+            client = Client()
+            client.get(path)
+        return client
+
+    def run(self, options):
+        clients = {
+            'disabled': self.client(False, options['paths'][0]),
+            'enabled': self.client(True, options['paths'][0]),
+        }
+        clients['measured'] = clients['enabled']
+        headers = {'measured': {'HTTP_X_SERVER_TIMING': '1'}}
+
+        self.stdout.write(f'Median of {options["requests"]} requests per mode, interleaved:')
+        self.stdout.write(f'{"path":<36} {"disabled":>10} {"enabled":>10} {"measured":>10} {"overhead":>9}')
+        overheads = []
+        for path in options['paths']:
+            timings = {mode: [] for mode in MODES}
+            for _ in range(options['requests']):
+                for mode in MODES:
+                    started = time.perf_counter()
+                    response = clients[mode].get(path, **headers.get(mode, {}))
+                    timings[mode].append(time.perf_counter() - started)
+            if response.status_code != 200 or not response.has_header('Server-Timing'):
+                self.stdout.write(self.style.WARNING(f'{path}: status {response.status_code}, skipped'))
+                continue
+            medians = {mode: statistics.median(values) for mode, values in timings.items()}
+            overhead = medians['measured'] / medians['disabled'] - 1
+            overheads.append(overhead)
+            self.stdout.write(
+                f'{path:<36} ' + ' '.join(f'{medians[mode] * 1000:>7.2f} ms' for mode in MODES)
+                + f' {overhead:>8.1%}'
+            )
+            self.stdout.write(f'  {response["Server-Timing"]}')
+        if overheads:
+            self.stdout.write(f'Mean overhead of measuring: {statistics.mean(overheads):.1%}')
+        self.hook_cost()
+
+    def hook_cost(self):
+        """Cost of one timed() call, outside and inside a measured request"""
+        plain = lambda: None  # noqa: E731
+        wrapped = timed('storage')(plain)
+        number = 200000
+
+        def best(func):
+            return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+        baseline = best(plain)
+        idle = best(wrapped) - baseline
+        token = _current.set(RequestTimings())
+        try:
+            active = best(wrapped) - baseline
+        finally:
+            _current.reset(token)
+        self.stdout.write(
+            f'Per timed() call: {idle * 1e9:.0f} ns when not measuring, {active * 1e9:.0f} ns when measuring'
+        )
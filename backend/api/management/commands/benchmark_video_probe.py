@@ -0,0 +1,112 @@
+import os
+import struct
+import tempfile
+import timeit
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+
+from api.mp4 import MP4Error, probe_video
+
+
+def _box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def build_mp4(duration, width=1280, height=720, mdat_size=1024 * 1024, faststart=False):
+    """Minimal but structurally valid MP4 with an H.264 video track"""
+    timescale = 1000
+    units = int(duration * timescale)
+    matrix = struct.pack('>9I', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    mvhd = _box(b'mvhd', struct.pack('>4xIIII', 0, 0, timescale, units) + struct.pack('>IH10x', 0x10000, 0x100) + matrix + bytes(24) + struct.pack('>I', 2))
+    tkhd = _box(b'tkhd', struct.pack('>4xIIII4xI8xHHH2x', 0, 0, 1, 0, units, 0, 0, 0) + matrix + struct.pack('>II', width << 16, height << 16))
+    mdhd = _box(b'mdhd', struct.pack('>4xIIIIHH', 0, 0, timescale, units, 0x55c4, 0))
+    hdlr = _box(b'hdlr', struct.pack('>4xI4s12x', 0, b'vide') + b'VideoHandler\x00')
+    avc1 = _box(b'avc1', bytes(6) + struct.pack('>H16xHH', 1, width, height) + bytes(50))
+    stsd = _box(b'stsd', struct.pack('>4xI', 1) + avc1)
+    minf = _box(b'minf', _box(b'stbl', stsd))
+    trak = _box(b'trak', tkhd + _box(b'mdia', mdhd + hdlr + minf))
+    moov = _box(b'moov', mvhd + trak)
+    ftyp = _box(b'ftyp', b'isom' + struct.pack('>I', 512) + b'isomiso2avc1mp41')
+    mdat_header = struct.pack('>I4s', 8 + mdat_size, b'mdat')
+    parts = [ftyp, moov, mdat_header] if faststart else [ftyp, mdat_header]
+    return parts, mdat_size, None if faststart else moov
+
+
+def write_mp4(path, duration, mdat_size, faststart):
+    parts, mdat_size, trailing_moov = build_mp4(duration, mdat_size=mdat_size, faststart=faststart)
+    with open(path, 'wb') as handle:
+        for part in parts:
+            handle.write(part)
+        chunk = bytes(1024 * 1024)
+        remaining = mdat_size
+        while remaining > 0:
+            handle.write(chunk[:min(remaining, len(chunk))])
+            remaining -= len(chunk)
+        if trailing_moov:
+            handle.write(trailing_moov)
+
+
+def cv2_duration(path):
+    import cv2
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+    capture.release()
+    return frame_count / fps if fps > 0 else 0
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the header-only MP4 duration probe against the OpenCV path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        try:
+            import cv2  # noqa: F401
+            have_cv2 = True
+        except ImportError:
+            have_cv2 = False
+            self.stdout.write(self.style.WARNING('OpenCV not installed: only the MP4 probe is timed'))
+
+        with tempfile.TemporaryDirectory() as directory:
+            samples = [('backend/test_video.mp4', os.path.join(settings.BASE_DIR, 'test_video.mp4'))]
+            for label, mdat_size, faststart in [
+                ('synthetic 1MB, moov first', 1024 * 1024, True),
+                ('synthetic 1MB, moov last', 1024 * 1024, False),
+                ('synthetic 50MB, moov last', 50 * 1024 * 1024, False),
+            ]:
+                path = os.path.join(directory, f'{len(samples)}.mp4')
+                write_mp4(path, 12.5, mdat_size, faststart)
+                samples.append((label, path))
+
+            for label, path in samples:
+                self.stdout.write(f'{label} ({os.path.getsize(path) / (1024 * 1024):.1f}MB):')
+                try:
+                    info = probe_video(path)
+                    self.stdout.write(f'  probe: {info.duration:.2f}s {info.width}x{info.height} {info.video_codec}')
+                except MP4Error as exc:
+                    self.stdout.write(f'  probe: not parseable ({exc})')
+
+                probe_time = min(timeit.repeat(lambda: self._try_probe(path), number=1, repeat=repeat))
+                self.stdout.write(f'  mp4 probe (path):      {probe_time * 1000:.3f} ms')
+
+                if os.path.getsize(path) <= 2 * 1024 * 1024:
+                    with open(path, 'rb') as handle:
+                        upload = SimpleUploadedFile('upload.mp4', handle.read(), content_type='video/mp4')
+                    upload_time = min(timeit.repeat(lambda: self._try_probe(upload), number=1, repeat=repeat))
+                    self.stdout.write(f'  mp4 probe (in-memory): {upload_time * 1000:.3f} ms')
+
+                if have_cv2:
+                    cv2_time = min(timeit.repeat(lambda: cv2_duration(path), number=1, repeat=max(1, repeat // 10)))
+                    self.stdout.write(f'  cv2 VideoCapture:      {cv2_time * 1000:.3f} ms')
+
+    @staticmethod
+    def _try_probe(value):
+        try:
+            return probe_video(value)
+        except MP4Error:
+            return None
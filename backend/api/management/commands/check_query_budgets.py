@@ -0,0 +1,90 @@
+import logging
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api import sampledata
+from api.benchmark import admin_probes, measure_queries, probes, scratch_database, staff_user
+from api.cache import API_CACHE
+from api.querycheck import budget_problems, query_budget
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every route of api/urls.py and every admin changelist at two data sizes in a scratch '
+        'database; fails if a query count grows with the number of rows or exceeds its budget '
+        '(api/querycheck.py)'
+    )
+
+    def add_arguments(self, parser):
+        # Small enough that no list fills a page, large enough that admin changelists do
+        parser.add_argument('--scales', type=float, nargs=2, default=[0.5, 10], metavar=('SMALL', 'LARGE'),
+                            help='Data sizes as multiples of the base row counts (api/sampledata.py)')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Only routes whose name contains this (repeatable)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keepdb', action='store_true', help='Keep the scratch database between runs')
+
+    def handle(self, *args, **options):
+        small, large = sorted(options['scales'])
+        if small == large:
+            raise CommandError('--scales must be two different sizes')
+        self.verbosity = options['verbosity']
+        self.skipped = {}
+        enabled = API_CACHE['ENABLED']
+        # Cached responses would skip the queries under test
+        API_CACHE['ENABLED'] = False
+        # Staff-only routes are found by their 403 to an anonymous request; don't log those
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            with scratch_database(options['keepdb']):
+                counts = {}
+                for scale in (small, large):
+                    call_command('flush', interactive=False, verbosity=0)
+                    sampledata.seed(scale, options['seed'], sampledata.BATCH_SIZE)
+                    counts[scale] = self.measure(options['routes'])
+        finally:
+            API_CACHE['ENABLED'] = enabled
+            request_logger.setLevel(level)
+
+        failures = self.report(counts[small], counts[large], small, large)
+        for name, reason in sorted(self.skipped.items()):
+            self.stdout.write(self.style.ERROR(f'{name:<52} not requested: {reason}'))
+            failures.append(name)
+        if failures:
+            raise CommandError(f'{len(failures)} routes unchecked, over their query budget or growing with rows: '
+                               f'{", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS(f'All {len(counts[large])} routes within their query budgets'))
+
+    def measure(self, routes):
+        skipped = []
+        selected = [
+            probe for probe in [*probes(skipped), *admin_probes()]
+            if not routes or any(part in probe.name for part in routes)
+        ]
+        self.skipped.update(
+            (route.name, route.reason) for route in skipped
+            if not routes or any(part in route.name for part in routes)
+        )
+        return measure_queries(selected, staff_user())
+
+    def report(self, small_counts, large_counts, small, large):
+        failures = []
+        self.stdout.write(f'{"route":<52} {"status":>6} {f"{small:g}x":>6} {f"{large:g}x":>6} {"budget":>6}')
+        for (method, name), (status, log) in large_counts.items():
+            before = small_counts[(method, name)][1]
+            problems = budget_problems(method, name, status, before, log)
+            label = f'{method} {name}'
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(
+                f'{label:<52} {style(str(status)):>6} {before.count:>6} {log.count:>6} '
+                f'{query_budget(method, name):>6}{"  " + "; ".join(problems) if problems else ""}'
+            )
+            if problems:
+                failures.append(label)
+                if log.count > before.count or self.verbosity >= 2:
+                    for sql, count in log.statements.most_common(3):
+                        self.stdout.write(f'    {count:>4}x {sql[:160]}')
+        return failures
@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ingest import lag, run_drainer
+
+
+class Command(BaseCommand):
+    help = 'Insert Inquiry/Admission submissions queued by SUBMISSION_INGEST_MODE=queue in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the journal is drained')
+        parser.add_argument('--interval', type=float, default=1, help='Seconds between polls when idle')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--status', action='store_true', help='Print the backlog as JSON and exit')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write(json.dumps(lag(), indent=2))
+            return
+        self.stdout.write('Starting submission drainer...')
+        drained = run_drainer(once=options['once'], interval=options['interval'], batch_size=options['batch_size'])
+        if drained is None:
+            raise CommandError('Another drainer is running')
+        self.stdout.write(self.style.SUCCESS(f'Drained {drained} queued submissions'))
@@ -1,7 +1,9 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from datetime import datetime, timedelta
 import random
+import time
+from api import sampledata
 from api.models import (
     Program, Gallery, Testimonial, Event, Branch, 
     Blog, TeamMember, FAQ, Setting
@@ -11,7 +13,20 @@ from api.models import (
 class Command(BaseCommand):
     help = 'Populate the database with sample data for Kidoo Preschool'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float,
+                            help='Generate this many times the base row counts of every model (api/sampledata.py) '
+                                 'instead of the hand-written samples, e.g. 50000 for a million admissions')
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same generated rows')
+        parser.add_argument('--batch-size', type=int, default=sampledata.BATCH_SIZE, help='Rows per INSERT batch')
+        parser.add_argument('--models', nargs='+', choices=[model._meta.model_name for model in sampledata.MODELS],
+                            help='Only generate these models, e.g. --models admission inquiry')
+
     def handle(self, *args, **options):
+        if options['scale'] is not None:
+            self.generate(options)
+            return
+
         self.stdout.write(self.style.SUCCESS('Starting to populate sample data...'))
         
         # Create sample data for each model
@@ -27,6 +42,23 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS('Successfully populated sample data!'))
 
+    def generate(self, options):
+        if options['scale'] <= 0 or options['batch_size'] < 1:
+            raise CommandError('--scale and --batch-size must be positive')
+        models = None
+        if options['models']:
+            models = [model for model in sampledata.MODELS if model._meta.model_name in options['models']]
+        started = time.perf_counter()
+        try:
+            counts = sampledata.seed(
+                options['scale'], options['seed'], options['batch_size'], models=models, log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s'
+        ))
+
     def create_programs(self):
         """Create sample programs"""
         programs_data = [
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.video_ingest import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Process queued HomeSlider video uploads (validate, extract poster, upload, publish)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls when idle')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Starting video ingest worker...')
+        processed = run_worker(once=options['once'], interval=options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} video ingest jobs'))
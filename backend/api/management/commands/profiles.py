@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import PROFILING, get_profile, list_profiles, prune, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'List the request profiles taken with ?profile=1 / ?profile=sample, summarize one, '
+        'or apply the retention limits'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Summarize this profile')
+        parser.add_argument('--view', help='Only profiles of views containing this, e.g. GalleryViewSet')
+        parser.add_argument('--limit', type=int, default=20, help='Profiles listed, or functions summarized')
+        parser.add_argument('--sort', default='cumulative', help='pstats sort key for cProfile summaries')
+        parser.add_argument('--prune', action='store_true', help='Delete profiles beyond the retention limits')
+        parser.add_argument('--keep', type=int, default=PROFILING['MAX_PROFILES'], help='With --prune')
+        parser.add_argument('--max-age-days', type=int, default=PROFILING['MAX_AGE_DAYS'], help='With --prune')
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            removed = prune(options['keep'], options['max_age_days'])
+            self.stdout.write(self.style.SUCCESS(f'Removed {removed} profiles'))
+            return
+        if options['profile_id']:
+            profile = get_profile(options['profile_id'])
+            if profile is None:
+                raise CommandError(f"No profile {options['profile_id']}")
+            self.stdout.write(self.describe(profile))
+            self.stdout.write(summarize(profile, options['limit'], options['sort']))
+            return
+
+        profiles = [
+            profile for profile in list_profiles()
+            if not options['view'] or options['view'] in profile['view']
+        ]
+        if not profiles:
+            self.stdout.write(f"No profiles in {PROFILING['DIR']}")
+            return
+        self.stdout.write(f'{"id":<31} {"mode":<8} {"ms":>9} {"status":>6}  view / path')
+        for profile in profiles[:options['limit']]:
+            self.stdout.write(
+                f"{profile['id']:<31} {profile['mode']:<8} {profile['duration_ms']:>9.1f} {profile['status']:>6}  "
+                f"{profile['view']} {profile['method']} {profile['path']}"
+            )
+        if len(profiles) > options['limit']:
+            self.stdout.write(f"... {len(profiles) - options['limit']} more")
+
+    @staticmethod
+    def describe(profile):
+        samples = f", {profile['samples']} samples" if profile.get('samples') is not None else ''
+        return (
+            f"{profile['method']} {profile['path']} ({profile['view']}) -> {profile['status']} "
+            f"in {profile['duration_ms']:.1f} ms, {profile['mode']}{samples}, by {profile['user']} at {profile['created_at']}\n"
+        )
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import similarity
+from api.cache import bump_version
+from api.models import Blog
+
+
+class Command(BaseCommand):
+    help = 'Recompute content vectors and related posts for every blog post'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not similarity.available():
+            raise CommandError('NumPy is not installed; related posts fall back to the newest posts')
+        started = time.perf_counter()
+        count = similarity.rebuild(options['batch_size'])
+        # Cached "related" responses are keyed by the Blog version
+        bump_version(Blog)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} posts in {time.perf_counter() - started:.2f}s'
+        ))
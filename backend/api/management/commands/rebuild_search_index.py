@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import bump_version
+from api.search_index import SEARCH_TYPES, TYPES_BY_NAME, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the site-wide search documents behind /api/search/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', action='append', dest='types', choices=sorted(TYPES_BY_NAME),
+                            help='Only rebuild this type (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        types = [TYPES_BY_NAME[name] for name in options['types']] if options['types'] else SEARCH_TYPES
+        counts = rebuild_index(types, options['batch_size'])
+        for search_type in types:
+            # Cached /api/search/ responses are keyed by these versions
+            bump_version(search_type.model)
+            self.stdout.write(f'{search_type.name}: {counts[search_type.name]} documents')
+        self.stdout.write(self.style.SUCCESS(f'Indexed {sum(counts.values())} documents'))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.analytics import recompute
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the AdmissionStat summary behind /api/admissions/analytics/ from the Admission table'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} admission summary rows in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.notifications import run_notifier
+
+
+class Command(BaseCommand):
+    help = 'Mail staff digests of new admissions and inquiries, retrying failed deliveries with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Collect and send one round, then exit')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between checks for due digests')
+        parser.add_argument('--backend', help='Email backend path (default STAFF_NOTIFICATION_EMAIL_BACKEND)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Starting staff notifier...')
+        sent = run_notifier(once=options['once'], interval=options['interval'], backend=options['backend'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} staff digests'))
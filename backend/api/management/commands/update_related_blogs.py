@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api import similarity
+
+
+class Command(BaseCommand):
+    help = 'Apply the related-post updates queued by saved and deleted blog posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls when idle')
+        parser.add_argument('--batch-size', type=int, default=similarity.UPDATE_BATCH)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Starting related posts worker...')
+        applied = similarity.run_updater(
+            once=options['once'], interval=options['interval'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Applied {applied} related post updates'))
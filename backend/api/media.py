@@ -0,0 +1,193 @@
+"""
+Media URL resolution.
+
+Building a public URL through cloudinary_storage is comparatively expensive,
+so each model with uploaded media stores the resolved URL of every file field
+in a ``<field>_resolved_url`` column (declared in the model's
+``RESOLVED_MEDIA_FIELDS``). The columns are refreshed after every save and can
+be backfilled with ``manage.py backfill_media_urls``; serializers read them
+instead of calling ``FieldFile.url`` per row.
+
+Images are also offered as width-bucketed variants for ``srcset``. On
+Cloudinary these are transformation URLs (``w_<width>,c_limit,f_auto,q_auto``)
+derived from the stored URL; on local storage WebP files are generated next
+to the originals when the image is saved (or by ``backfill_media_urls
+--variants``), and only the variants found on disk are offered. Both are
+memoized (local ones once all of them exist), so they add no per-request
+storage work.
+"""
+import functools
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+
+from .timing import timed
+
+IMAGE_VARIANT_WIDTHS = tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1280)))
+LOCAL_VARIANT_QUALITY = 80
+LOCAL_VARIANT_MEMO_SIZE = 4096
+CLOUDINARY_IMAGE_UPLOAD = '/image/upload/'
+
+
+def normalize_media_url(url: str) -> str:
+    """Improved URL normalization for Cloudinary storage.
+    Handles various URL formats and prevents double-prefixing issues.
+    """
+    if not url:
+        return url
+
+    # If it's already a complete Cloudinary URL, return as-is
+    if url.startswith('https://res.cloudinary.com/'):
+        return url
+
+    # If it starts with /media/, remove it
+    if url.startswith('/media/'):
+        url = url[7:]  # Remove '/media/'
+
+    # Handle cases where Cloudinary URL is embedded in path
+    cloudinary_marker = 'https://res.cloudinary.com/'
+    if cloudinary_marker in url:
+        start_idx = url.find(cloudinary_marker)
+        return url[start_idx:]
+
+    # If it's a relative path, return as-is (Cloudinary will handle it)
+    return url
+
+
+def resolve_media_url(field_file):
+    """Storage URL of ``field_file``, normalized; '' when there is no file"""
+    if not field_file:
+        return ''
+    return normalize_media_url(field_file.url)
+
+
+def resolved_url_field(field_name):
+    return f'{field_name}_resolved_url'
+
+
+@timed('storage')
+def stored_media_url(obj, field_name):
+    """Resolved URL of ``obj.<field_name>``, from the stored column when set"""
+    url = getattr(obj, resolved_url_field(field_name), '')
+    if not url:
+        # Row saved before the column existed and not backfilled yet
+        url = resolve_media_url(getattr(obj, field_name))
+    return url
+
+
+@timed('storage')
+def absolute_media_url(url, request):
+    if url and request and not url.startswith('http'):
+        return request.build_absolute_uri(url)
+    return url
+
+
+def compute_resolved_urls(obj):
+    """Return {column: url} for every media field of ``obj``"""
+    return {
+        resolved_url_field(field_name): resolve_media_url(getattr(obj, field_name))
+        for field_name in getattr(obj, 'RESOLVED_MEDIA_FIELDS', ())
+    }
+
+
+def refresh_resolved_urls(obj):
+    """Store freshly resolved URLs for ``obj``; returns {column: url} of those that changed"""
+    changed = {
+        column: url for column, url in compute_resolved_urls(obj).items()
+        if getattr(obj, column) != url
+    }
+    if changed:
+        type(obj).objects.filter(pk=obj.pk).update(**changed)
+        for column, url in changed.items():
+            setattr(obj, column, url)
+    return changed
+
+
+def is_image_field(model, field_name):
+    return isinstance(model._meta.get_field(field_name), models.ImageField)
+
+
+@functools.lru_cache(maxsize=4096)
+def cloudinary_variant_urls(url):
+    head, tail = url.split(CLOUDINARY_IMAGE_UPLOAD, 1)
+    return tuple(
+        (width, f'{head}{CLOUDINARY_IMAGE_UPLOAD}w_{width},c_limit,f_auto,q_auto/{tail}')
+        for width in IMAGE_VARIANT_WIDTHS
+    )
+
+
+def local_variant_name(name, width):
+    return f'variants/w{width}/{name}.webp'
+
+
+# Complete variant sets by (storage, name); incomplete ones are looked up again, as they may be generated later
+_local_variants = {}
+
+
+def local_variant_urls(storage, name):
+    """((width, url), ...) of the variants of ``name`` that exist on ``storage``"""
+    variants = _local_variants.get((storage, name))
+    if variants is None:
+        variants = tuple(
+            (width, storage.url(variant)) for width, variant in
+            ((width, local_variant_name(name, width)) for width in IMAGE_VARIANT_WIDTHS)
+            if storage.exists(variant)
+        )
+        if len(variants) == len(IMAGE_VARIANT_WIDTHS):
+            if len(_local_variants) >= LOCAL_VARIANT_MEMO_SIZE:
+                _local_variants.clear()
+            _local_variants[(storage, name)] = variants
+    return variants
+
+
+@timed('storage')
+def image_variants(obj, field_name, request):
+    """{width: url} of the responsive variants of an image field, or None"""
+    field_file = getattr(obj, field_name)
+    if not field_file:
+        return None
+    url = stored_media_url(obj, field_name)
+    if CLOUDINARY_IMAGE_UPLOAD in url and url.startswith('https://res.cloudinary.com/'):
+        variants = cloudinary_variant_urls(url)
+    elif isinstance(field_file.storage, FileSystemStorage):
+        variants = local_variant_urls(field_file.storage, field_file.name)
+    else:
+        return None
+    if not variants:
+        return None
+    return {width: absolute_media_url(variant_url, request) for width, variant_url in variants}
+
+
+def generate_local_variants(field_file):
+    """Write WebP variants of an image stored on the local filesystem"""
+    if not field_file or not isinstance(field_file.storage, FileSystemStorage):
+        return 0
+    from PIL import Image
+
+    storage = field_file.storage
+    try:
+        with storage.open(field_file.name, 'rb') as source:
+            image = Image.open(source)
+            image.load()
+    except (OSError, ValueError):
+        return 0
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    generated = 0
+    for width in IMAGE_VARIANT_WIDTHS:
+        variant = image.copy()
+        # c_limit semantics: shrink to fit, never upscale
+        if variant.width > width:
+            variant.thumbnail((width, variant.height * width // variant.width))
+        buffer = io.BytesIO()
+        variant.save(buffer, format='WEBP', quality=LOCAL_VARIANT_QUALITY)
+        name = local_variant_name(field_file.name, width)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+        generated += 1
+    return generated
@@ -0,0 +1,367 @@
+"""
+Prometheus metrics at /metrics, aggregated over the gunicorn workers.
+
+``MetricsMiddleware`` counts every request in memory, labelled by
+``ViewSet.action`` (``ProgramViewSet.list``, ``EventViewSet.upcoming``;
+``View.method`` for plain API views, the URL name for other views): request
+counts by method and status class, latency and response size histograms,
+and SQL queries and their time. Each process writes its totals to
+``<METRICS['DIR']>/<host>-<pid>.json`` at most every ``FLUSH_INTERVAL``
+seconds and whenever it serves /metrics, along with the response cache
+counters (api/cache.py) and its open database connections.
+
+/metrics sums the files of all processes. The counters and histograms of
+processes that have exited are folded into ``archive.json`` so totals never
+go backwards, and their gauges are dropped. The submission backlog
+(api/ingest.py) and, on PostgreSQL, the server's connections by state are
+read when scraped.
+"""
+import bisect
+import fcntl
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, connections
+
+from .cache import response_cache
+from .ingest import lag as ingest_lag, process_alive
+
+METRICS = {
+    'ENABLED': True,
+    'DIR': os.path.join(settings.BASE_DIR, 'metrics'),
+    'FLUSH_INTERVAL': 10,
+    'TOKEN': '',
+    **getattr(settings, 'METRICS', {}),
+}
+
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.collect.lock'
+SNAPSHOT_SUFFIX = '.json'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+HISTOGRAM_BUCKETS = {
+    'http_request_duration_seconds': DURATION_BUCKETS,
+    'http_response_size_bytes': SIZE_BUCKETS,
+}
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+CACHE_RESULTS = {'local_hits': 'local_hit', 'shared_hits': 'shared_hit', 'misses': 'miss'}
+
+# name: (type, help); exposition order
+DEFINITIONS = {
+    'http_requests_total': ('counter', 'Requests by view, method and status class.'),
+    'http_request_duration_seconds': ('histogram', 'Time from the first middleware to the response, by view.'),
+    'http_response_size_bytes': ('histogram', 'Response body size by view; streaming responses are not counted.'),
+    'db_queries_total': ('counter', 'SQL queries by view.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries by view.'),
+    'db_connections_open': ('gauge', 'Open database connections of the live worker processes by alias.'),
+    'db_server_connections': ('gauge', 'PostgreSQL backends connected to this database by state, all clients.'),
+    'api_cache_requests_total': ('counter', 'Response cache lookups by scope and result.'),
+    'api_cache_hit_ratio': ('gauge', 'Share of response cache lookups served from a cache tier, by scope.'),
+    'ingest_pending_submissions': ('gauge', 'Queued submissions not yet inserted.'),
+    'ingest_pending_bytes': ('gauge', 'Size of the queued submissions not yet inserted.'),
+    'ingest_oldest_pending_seconds': ('gauge', 'Age of the oldest queued submission.'),
+    'ingest_drained_total': ('counter', 'Queued submissions inserted by the drainer.'),
+    'ingest_rejected_total': ('counter', 'Queued submissions rejected by the drainer.'),
+}
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    view = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if view is None:
+        return match.view_name or match.func.__name__
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None)
+    return f'{view.__name__}.{actions.get(method, method) if actions else method}'
+
+
+class QueryStats:
+    """Connection execute wrapper counting the queries of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class Registry:
+    """Counters and histograms of this process, keyed by (name, labels)
+
+    Histograms are [per-bucket counts..., +Inf count, sum]. Reset after a
+    fork so workers don't inherit the counts of their parent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._last_flush = time.monotonic()
+        self.counters = {}
+        self.histograms = {}
+
+    def record(self, view, method, status, duration, size, queries):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            labels = (('view', view),)
+            key = ('http_requests_total', (*labels, ('method', method), ('status', status)))
+            self.counters[key] = self.counters.get(key, 0) + 1
+            self.observe('http_request_duration_seconds', labels, duration)
+            if size is not None:
+                self.observe('http_response_size_bytes', labels, size)
+            if queries.count:
+                for name, value in (('db_queries_total', queries.count),
+                                    ('db_query_duration_seconds_total', queries.seconds)):
+                    self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAM_BUCKETS[name]
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = [0] * (len(buckets) + 1) + [0.0]
+        histogram[bisect.bisect_left(buckets, value)] += 1
+        histogram[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            counters = [[name, labels, value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, labels, list(values)] for (name, labels), values in self.histograms.items()]
+        for scope, counts in response_cache.stats.snapshot().items():
+            for field, result in CACHE_RESULTS.items():
+                counters.append(['api_cache_requests_total', [['scope', scope], ['result', result]], counts[field]])
+        open_connections = {}
+        for alias_connection in connections.all(initialized_only=True):
+            if alias_connection.connection is not None:
+                open_connections[alias_connection.alias] = open_connections.get(alias_connection.alias, 0) + 1
+        gauges = [['db_connections_open', [['alias', alias]], count] for alias, count in open_connections.items()]
+        return {'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def flush(self, directory=None):
+        """Write this process's totals for /metrics"""
+        directory = directory or METRICS['DIR']
+        self._last_flush = time.monotonic()
+        snapshot = self.snapshot()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{socket.gethostname()}-{os.getpid()}{SNAPSHOT_SUFFIX}')
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(snapshot, handle, separators=(',', ':'))
+        os.replace(temporary, path)
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush > METRICS['FLUSH_INTERVAL']:
+            try:
+                self.flush()
+            except OSError:
+                # Metrics must never break a request
+                pass
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """Count requests for /metrics; goes first so latency covers every other middleware"""
+
+    def __init__(self, get_response):
+        if not METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias_connection in connections.all():
+                stack.enter_context(alias_connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        size = None if response.streaming else len(response.content)
+        registry.record(
+            view_label(request), request.method if request.method in METHODS else 'other',
+            f'{response.status_code // 100}xx', duration, size, queries,
+        )
+        registry.maybe_flush()
+        return response
+
+
+class Totals:
+    """Series summed over snapshots"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(tuple(pair) for pair in labels)
+
+    def add(self, snapshot, gauges=True):
+        for name, labels, value in snapshot.get('counters', ()):
+            key = self.key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+        for name, labels, values in snapshot.get('histograms', ()):
+            key = self.key(name, labels)
+            total = self.histograms.get(key)
+            if total is None or len(total) != len(values):
+                # New series, or its buckets changed since it was archived
+                self.histograms[key] = list(values)
+            else:
+                self.histograms[key] = [a + b for a, b in zip(total, values)]
+        if gauges:
+            for name, labels, value in snapshot.get('gauges', ()):
+                key = self.key(name, labels)
+                self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def as_snapshot(self):
+        return {
+            'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+            'histograms': [[name, labels, values] for (name, labels), values in self.histograms.items()],
+        }
+
+
+def read_json(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def snapshot_owner(name):
+    """(host, pid) of the process that wrote the snapshot ``name``"""
+    host, pid = name[:-len(SNAPSHOT_SUFFIX)].rsplit('-', 1)
+    return host, int(pid)
+
+
+def collect(directory=None):
+    """Totals of all processes, folding the snapshots of exited ones into the archive"""
+    directory = directory or METRICS['DIR']
+    registry.flush(directory)
+    hostname = socket.gethostname()
+    totals, archive = Totals(), Totals()
+    with open(os.path.join(directory, LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            archive.add(read_json(os.path.join(directory, ARCHIVE_FILE)))
+            exited = []
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(SNAPSHOT_SUFFIX) or name == ARCHIVE_FILE:
+                    continue
+                try:
+                    host, pid = snapshot_owner(name)
+                except ValueError:
+                    continue
+                snapshot = read_json(os.path.join(directory, name))
+                if host == hostname and not process_alive(pid):
+                    archive.add(snapshot, gauges=False)
+                    exited.append(name)
+                else:
+                    totals.add(snapshot)
+            if exited:
+                path = os.path.join(directory, ARCHIVE_FILE)
+                with open(f'{path}.tmp', 'w') as handle:
+                    json.dump(archive.as_snapshot(), handle, separators=(',', ':'))
+                os.replace(f'{path}.tmp', path)
+                for name in exited:
+                    os.remove(os.path.join(directory, name))
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    totals.add(archive.as_snapshot())
+    return totals
+
+
+def scrape_gauges(totals):
+    """Values read when /metrics is served"""
+    for (name, labels), value in list(totals.counters.items()):
+        if name == 'api_cache_requests_total' and dict(labels)['result'] == 'miss':
+            scope = dict(labels)['scope']
+            lookups = sum(
+                totals.counters.get(('api_cache_requests_total', (('scope', scope), ('result', result))), 0)
+                for result in CACHE_RESULTS.values()
+            )
+            if lookups:
+                totals.gauges[('api_cache_hit_ratio', (('scope', scope),))] = (lookups - value) / lookups
+
+    backlog = ingest_lag()
+    for name, field in (('ingest_pending_submissions', 'pending'), ('ingest_pending_bytes', 'pending_bytes'),
+                        ('ingest_oldest_pending_seconds', 'oldest_pending_seconds')):
+        totals.gauges[(name, ())] = backlog[field]
+    totals.counters[('ingest_drained_total', ())] = backlog['drained']
+    totals.counters[('ingest_rejected_total', ())] = backlog['rejected']
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COALESCE(state, \'unknown\'), COUNT(*) FROM pg_stat_activity '
+                'WHERE datname = current_database() GROUP BY 1'
+            )
+            for state, count in cursor.fetchall():
+                totals.gauges[('db_server_connections', (('state', state),))] = count
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition(totals):
+    """Prometheus text format (version 0.0.4) of ``totals``"""
+    series = {}
+    for kind in ('counters', 'histograms', 'gauges'):
+        for (name, labels), value in getattr(totals, kind).items():
+            series.setdefault(name, []).append((labels, value))
+    lines = []
+    for name, (kind, help_text) in DEFINITIONS.items():
+        if name not in series:
+            continue
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for labels, value in sorted(series[name]):
+            if kind != 'histogram':
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip((*HISTOGRAM_BUCKETS[name], '+Inf'), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(value[-1])}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_metrics():
+    totals = collect()
+    scrape_gauges(totals)
+    return exposition(totals)
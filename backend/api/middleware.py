@@ -0,0 +1,24 @@
+from django.http import JsonResponse
+
+
+class UploadLimitMiddleware:
+    """Answer 413/415 for uploads rejected by MediaLimitUploadHandler
+
+    Multipart POST bodies are parsed here, before the view runs, so a
+    rejected upload ends the request instead of reaching forms or
+    serializers with the file silently missing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method == 'POST' and request.content_type == 'multipart/form-data':
+            request.FILES  # noqa: B018 - triggers the upload handlers
+            rejection = getattr(request, 'upload_rejection', None)
+            if rejection is not None:
+                return JsonResponse(
+                    {'detail': rejection.message, 'field': rejection.field},
+                    status=rejection.status,
+                )
+        return self.get_response(request)
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_contentversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='image_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='image_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='gallery',
+            name='image_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='homeslider',
+            name='image_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='homeslider',
+            name='video_poster_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='homeslider',
+            name='video_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='program',
+            name='image_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='teammember',
+            name='photo_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='photo_resolved_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+    ]
@@ -0,0 +1,131 @@
+from django.db import migrations, transaction
+
+# The search index SQL as of this migration, copied here so later changes to
+# api/search.py can't change what it does.
+#
+# PostgreSQL: a nullable tsvector column (adding it rewrites nothing) set by a
+# BEFORE INSERT/UPDATE trigger, existing rows filled in short batches, and a
+# GIN index built CONCURRENTLY, so writes are never blocked for long. SQLite:
+# an external-content FTS5 table kept in sync by triggers.
+SEARCH_VECTOR_COLUMN = 'search_vector'
+FTS5_TOKENIZERS = {'english': 'porter unicode61', 'simple': 'unicode61'}
+BACKFILL_ROWS = 5000
+
+
+def vector_expression(fields, config, quote, row=''):
+    return ' || '.join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({row}{quote(name)}, '')), '{weight}')"
+        for name, weight in fields
+    )
+
+
+def fts5_triggers(table, fields, pk, quote):
+    fts = f'{table}_fts'
+    column_list = ', '.join(quote(name) for name, _ in fields)
+    old_values = ', '.join(f'old.{quote(name)}' for name, _ in fields)
+    new_values = ', '.join(f'new.{quote(name)}' for name, _ in fields)
+    delete_old = (
+        f"INSERT INTO {quote(fts)}({quote(fts)}, rowid, {column_list}) "
+        f"VALUES ('delete', old.{quote(pk)}, {old_values});"
+    )
+    insert_new = f'INSERT INTO {quote(fts)}(rowid, {column_list}) VALUES (new.{quote(pk)}, {new_values});'
+    return [
+        f'CREATE TRIGGER {quote(fts + "_ai")} AFTER INSERT ON {quote(table)} BEGIN {insert_new} END',
+        f'CREATE TRIGGER {quote(fts + "_ad")} AFTER DELETE ON {quote(table)} BEGIN {delete_old} END',
+        f'CREATE TRIGGER {quote(fts + "_au")} AFTER UPDATE OF {column_list} ON {quote(table)} '
+        f'BEGIN {delete_old} {insert_new} END',
+    ]
+
+
+def create_search_index(schema_editor, table, fields, config='english', pk='id'):
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    if connection.vendor == 'postgresql':
+        column, trigger = quote(SEARCH_VECTOR_COLUMN), quote(f'{table}_search_vector')
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute(f'ALTER TABLE {quote(table)} ADD COLUMN IF NOT EXISTS {column} tsvector')
+            schema_editor.execute(
+                f'CREATE OR REPLACE FUNCTION {trigger}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN '
+                f'NEW.{column} := {vector_expression(fields, config, quote, "NEW.")}; RETURN NEW; END $$'
+            )
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger} ON {quote(table)}')
+            schema_editor.execute(
+                f'CREATE TRIGGER {trigger} BEFORE INSERT OR UPDATE OF '
+                f'{", ".join(quote(name) for name, _ in fields)} ON {quote(table)} '
+                f'FOR EACH ROW EXECUTE FUNCTION {trigger}()'
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT max({quote(pk)}) FROM {quote(table)}')
+            last = cursor.fetchone()[0] or 0
+        for start in range(0, last + 1, BACKFILL_ROWS):
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute(
+                    f'UPDATE {quote(table)} SET {column} = {vector_expression(fields, config, quote)} '
+                    f'WHERE {quote(pk)} >= %s AND {quote(pk)} < %s AND {column} IS NULL',
+                    [start, start + BACKFILL_ROWS],
+                )
+        # A failed concurrent build leaves an INVALID index behind
+        index = quote(f'{table}_search_gin')
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index}')
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY {index} ON {quote(table)} USING GIN ({column})')
+    elif connection.vendor == 'sqlite':
+        fts = f'{table}_fts'
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {quote(fts)} USING fts5({', '.join(quote(name) for name, _ in fields)}, "
+            f"content='{table}', content_rowid='{pk}', tokenize='{FTS5_TOKENIZERS.get(config, 'unicode61')}')"
+        )
+        for statement in fts5_triggers(table, fields, pk, quote):
+            schema_editor.execute(statement)
+        schema_editor.execute(f"INSERT INTO {quote(fts)}({quote(fts)}) VALUES ('rebuild')")
+
+
+def drop_search_index(schema_editor, table):
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    if connection.vendor == 'postgresql':
+        trigger = quote(f'{table}_search_vector')
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {quote(table + "_search_gin")}')
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger} ON {quote(table)}')
+        schema_editor.execute(f'DROP FUNCTION IF EXISTS {trigger}()')
+        schema_editor.execute(f'ALTER TABLE {quote(table)} DROP COLUMN IF EXISTS {quote(SEARCH_VECTOR_COLUMN)}')
+    elif connection.vendor == 'sqlite':
+        fts = f'{table}_fts'
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {quote(fts + suffix)}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {quote(fts)}')
+
+
+# Frozen copy of the models' SEARCH_FIELDS / SEARCH_CONFIG at this migration
+SEARCH_INDEXES = [
+    ('api_program', (('name', 'A'), ('description', 'B')), 'english'),
+    ('api_event', (('title', 'A'), ('description', 'B')), 'english'),
+    ('api_blog', (('title', 'A'), ('excerpt', 'B'), ('content', 'C')), 'english'),
+    ('api_faq', (('question', 'A'), ('answer', 'B')), 'english'),
+    ('api_admission', (
+        ('student_first_name', 'A'), ('student_last_name', 'A'),
+        ('parent_first_name', 'B'), ('parent_last_name', 'B'), ('parent_email', 'B'),
+    ), 'simple'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    for table, fields, config in SEARCH_INDEXES:
+        create_search_index(schema_editor, table, fields, config)
+
+
+def drop_indexes(apps, schema_editor):
+    for table, _, _ in SEARCH_INDEXES:
+        drop_search_index(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+    # The GIN indexes are built CONCURRENTLY on PostgreSQL, which cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0015_video_duration_validator'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
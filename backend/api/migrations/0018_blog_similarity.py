@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogVector',
+            fields=[
+                ('blog', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity_vector', serialize=False, to='api.blog')),
+                ('vector', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarityIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('documents', models.PositiveIntegerField(default=0)),
+                ('idf', models.BinaryField(help_text='float32 inverse document frequency per hashed term')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Similarity Index',
+                'verbose_name_plural': 'Similarity Indexes',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedBlog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='api.blog')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='api.blog')),
+            ],
+            options={
+                'ordering': ['blog', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedblog',
+            constraint=models.UniqueConstraint(fields=('blog', 'rank'), name='unique_related_blog_rank'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+import api.operations
+
+
+class Migration(migrations.Migration):
+    # Indexes are built CONCURRENTLY on PostgreSQL, which cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0018_blog_similarity'),
+    ]
+
+    operations = [
+        api.operations.AddIndexConcurrently(
+            model_name='admission',
+            index=models.Index(fields=['submitted_at', 'id'], name='api_admission_submitted_id_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='blog',
+            index=models.Index(fields=['created_at', 'id'], name='api_blog_created_id_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['created_at', 'id'], name='api_event_created_id_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='gallery',
+            index=models.Index(fields=['created_at', 'id'], name='api_gallery_created_id_idx'),
+        ),
+    ]
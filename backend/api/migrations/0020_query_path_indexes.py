@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+import api.operations
+
+
+class Migration(migrations.Migration):
+    # Indexes are built CONCURRENTLY on PostgreSQL, which cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0019_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        api.operations.AddIndexConcurrently(
+            model_name='aboutfeature',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'order', 'title'], name='api_feature_active_order_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='admission',
+            index=models.Index(fields=['status', 'submitted_at'], name='api_admission_status_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='admission',
+            index=models.Index(fields=['preferred_program', 'submitted_at'], name='api_admission_program_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['date'], name='api_event_date_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='gallery',
+            index=models.Index(fields=['type', 'category', 'created_at'], name='api_gallery_type_cat_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='homeslider',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'title'], name='api_slider_active_order_idx'),
+        ),
+        api.operations.AddIndexConcurrently(
+            model_name='homestats',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'stat_type'], name='api_homestats_active_order_idx'),
+        ),
+    ]
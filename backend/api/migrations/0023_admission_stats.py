@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_staff_notification_digests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month the application was submitted (local time)')),
+                ('status', models.CharField(max_length=20)),
+                ('preferred_program', models.CharField(max_length=20)),
+                ('student_gender', models.CharField(max_length=10)),
+                ('age_months', models.SmallIntegerField(help_text='Age of the child at the preferred start date, in whole months')),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='admissionstat',
+            constraint=models.UniqueConstraint(fields=('month', 'status', 'preferred_program', 'student_gender', 'age_months'), name='unique_admission_stat'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_inquiry_search_and_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='admission',
+            name='idempotency_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='idempotency_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+# similarity.TOP_K when this migration was written
+TOP_K = 3
+
+
+def store_weakest_scores(apps, schema_editor):
+    BlogVector = apps.get_model('api', 'BlogVector')
+    RelatedBlog = apps.get_model('api', 'RelatedBlog')
+    vectors = [
+        BlogVector(blog_id=blog_id, weakest_score=score)
+        for blog_id, score in RelatedBlog.objects.filter(rank=TOP_K - 1).values_list('blog_id', 'score')
+    ]
+    BlogVector.objects.bulk_update(vectors, ['weakest_score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_submission_idempotency_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogvector',
+            name='weakest_score',
+            field=models.FloatField(default=0.0, help_text="Score another post must beat to enter this post's related list (0 while the list is short)"),
+        ),
+        migrations.RunPython(store_weakest_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_blogvector_weakest_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedBlogUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reproject', models.BooleanField(default=False, help_text='The post was saved: recompute its vector, not only its related list')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_related_updates', to='api.blog')),
+            ],
+        ),
+    ]
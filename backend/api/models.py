@@ -3,33 +3,31 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 import os
+import struct
+
+from .mp4 import MP4Error, probe_video
+
+MAX_VIDEO_SIZE = 50 * 1024 * 1024  # 50MB
 
 
 def validate_video_duration(value):
     """Validate that video is not longer than 15 seconds"""
+    if getattr(value, '_committed', False):
+        # Already stored (and validated on upload); don't fetch it back from storage
+        return
     try:
-        import cv2
-        cap = cv2.VideoCapture(value.path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-        duration = frame_count / fps if fps > 0 else 0
-        cap.release()
-        
-        if duration > 15:
-            raise ValidationError(f'Video duration is {duration:.1f} seconds. Maximum allowed duration is 15 seconds.')
-    except ImportError:
-        # If OpenCV is not available, skip duration validation
-        pass
-    except Exception as e:
-        # If there's any error reading the video, allow it to pass
-        # The file format validation will catch invalid files
-        pass
+        info = probe_video(value)
+    except (MP4Error, OSError, struct.error):
+        # Unreadable headers: the file format validation will catch invalid files
+        return
+
+    if info.duration > 15:
+        raise ValidationError(f'Video duration is {info.duration:.1f} seconds. Maximum allowed duration is 15 seconds.')
 
 
 def validate_video_file_size(value):
     """Validate that video file is not larger than 50MB"""
-    max_size = 50 * 1024 * 1024  # 50MB
-    if value.size > max_size:
+    if value.size > MAX_VIDEO_SIZE:
         raise ValidationError(f'Video file size is {value.size / (1024*1024):.1f}MB. Maximum allowed size is 50MB.')
 
 
@@ -38,9 +36,13 @@ class Program(models.Model):
     age_group = models.CharField(max_length=50)
     description = models.TextField()
     image = models.ImageField(upload_to='programs/')
+    image_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RESOLVED_MEDIA_FIELDS = ('image',)
+    SEARCH_FIELDS = (('name', 'A'), ('description', 'B'))
+
     class Meta:
         ordering = ['name']
 
@@ -67,14 +69,23 @@ class Gallery(models.Model):
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     image = models.ImageField(upload_to='gallery/', blank=True, null=True)
     video_url = models.URLField(blank=True, null=True)
+    image_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
     # image = models.ImageField(upload_to='gallery/', blank=True, null=True)
     # video_url = models.URLField(blank=True, null=True, help_text="URL for video (YouTube, Vimeo, etc.)")
     category = models.CharField(max_length=100, choices=CATEGORY_CHOICES, default='Activities')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    RESOLVED_MEDIA_FIELDS = ('image',)
+
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Gallery Items'
+        indexes = [
+            # Keyset pagination (api/pagination.py)
+            models.Index(fields=['created_at', 'id'], name='api_gallery_created_id_idx'),
+            # ?type=&category= filters, newest first
+            models.Index(fields=['type', 'category', 'created_at'], name='api_gallery_type_cat_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -95,8 +106,11 @@ class Testimonial(models.Model):
     rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])
     message = models.TextField()
     photo = models.ImageField(upload_to='testimonials/', blank=True, null=True)
+    photo_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    RESOLVED_MEDIA_FIELDS = ('photo',)
+
     class Meta:
         ordering = ['-created_at']
 
@@ -109,10 +123,19 @@ class Event(models.Model):
     description = models.TextField()
     date = models.DateTimeField()
     image = models.ImageField(upload_to='events/', blank=True, null=True)
+    image_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    RESOLVED_MEDIA_FIELDS = ('image',)
+    SEARCH_FIELDS = (('title', 'A'), ('description', 'B'))
+
     class Meta:
         ordering = ['date']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='api_event_created_id_idx'),
+            # Default ordering and upcoming events (date >= now)
+            models.Index(fields=['date'], name='api_event_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -123,6 +146,10 @@ class Branch(models.Model):
     address = models.TextField()
     phone = models.CharField(max_length=20)
     map_url = models.URLField(blank=True, null=True)
+    notification_emails = models.CharField(
+        max_length=500, blank=True, default='',
+        help_text="Comma-separated staff addresses for digests of this branch's inquiries (not public)",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -139,10 +166,21 @@ class Inquiry(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE)
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Idempotency-Key of the POST, or the journal id of a queued submission (api/ingest.py)
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True, editable=False)
+    # Hash of the validated submission, so a reused key with a different body is refused
+    idempotency_fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    SEARCH_FIELDS = (('parent_name', 'A'), ('phone', 'B'), ('message', 'C'))
 
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Inquiries'
+        indexes = [
+            # Keyset pages of the admin changelist, overall and per branch
+            models.Index(fields=['created_at', 'id'], name='api_inquiry_created_id_idx'),
+            models.Index(fields=['branch', 'created_at'], name='api_inquiry_branch_idx'),
+        ]
 
     def __str__(self):
         return f"Inquiry from {self.parent_name}"
@@ -154,11 +192,16 @@ class Blog(models.Model):
     excerpt = models.TextField()
     content = models.TextField()
     image = models.ImageField(upload_to='blog/')
+    image_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RESOLVED_MEDIA_FIELDS = ('image',)
+    SEARCH_FIELDS = (('title', 'A'), ('excerpt', 'B'), ('content', 'C'))
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at', 'id'], name='api_blog_created_id_idx')]
 
     def __str__(self):
         return self.title
@@ -168,9 +211,12 @@ class TeamMember(models.Model):
     name = models.CharField(max_length=150)
     role = models.CharField(max_length=150)
     photo = models.ImageField(upload_to='team/', max_length=500)
+    photo_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
     bio = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    RESOLVED_MEDIA_FIELDS = ('photo',)
+
     class Meta:
         ordering = ['name']
 
@@ -184,6 +230,8 @@ class FAQ(models.Model):
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    SEARCH_FIELDS = (('question', 'A'), ('answer', 'B'))
+
     class Meta:
         ordering = ['order', 'question']
 
@@ -247,6 +295,13 @@ class AboutFeature(models.Model):
 
     class Meta:
         ordering = ['category', 'order', 'title']
+        # The API only lists active features
+        indexes = [
+            models.Index(
+                fields=['category', 'order', 'title'], condition=models.Q(is_active=True),
+                name='api_feature_active_order_idx',
+            ),
+        ]
         verbose_name = "About Feature"
         verbose_name_plural = "About Features"
 
@@ -260,6 +315,13 @@ class HomeSlider(models.Model):
         ('video', 'Video'),
     ]
     
+    INGEST_STATUS_CHOICES = [
+        ('ready', 'Ready'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('failed', 'Failed'),
+    ]
+    
     title = models.CharField(max_length=200, help_text="Main heading for the slide")
     subtitle = models.TextField(help_text="Subtitle or description text")
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES, default='image', help_text="Type of media for the slide")
@@ -271,19 +333,33 @@ class HomeSlider(models.Model):
         help_text="Background video for the slide (max 15 seconds, MP4 format, max 50MB)",
         validators=[
             FileExtensionValidator(allowed_extensions=['mp4']),
-            validate_video_file_size
+            validate_video_file_size,
+            validate_video_duration
         ]
     )
     video_poster = models.ImageField(upload_to='home_slider/posters/', blank=True, null=True, help_text="Poster image for video (shown before video loads)")
+    image_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
+    video_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
+    video_poster_resolved_url = models.CharField(max_length=1000, blank=True, default='', editable=False)
     button_text = models.CharField(max_length=100, default="Learn More", help_text="Text for the call-to-action button")
     button_url = models.CharField(max_length=200, default="/programs", help_text="URL to redirect when button is clicked")
     order = models.IntegerField(default=0, help_text="Order of display (lower numbers appear first)")
     is_active = models.BooleanField(default=True, help_text="Whether this slide is active and should be displayed")
+    ingest_status = models.CharField(max_length=20, choices=INGEST_STATUS_CHOICES, default='ready', help_text="Processing state of the last uploaded video")
+    ingest_error = models.TextField(blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RESOLVED_MEDIA_FIELDS = ('image', 'video', 'video_poster')
+
     class Meta:
         ordering = ['order', 'title']
+        indexes = [
+            models.Index(
+                fields=['order', 'title'], condition=models.Q(is_active=True),
+                name='api_slider_active_order_idx',
+            ),
+        ]
         verbose_name = "Home Slider"
         verbose_name_plural = "Home Sliders"
 
@@ -330,6 +406,12 @@ class HomeStats(models.Model):
 
     class Meta:
         ordering = ['order', 'stat_type']
+        indexes = [
+            models.Index(
+                fields=['order', 'stat_type'], condition=models.Q(is_active=True),
+                name='api_homestats_active_order_idx',
+            ),
+        ]
         verbose_name = "Home Stat"
         verbose_name_plural = "Home Stats"
 
@@ -400,9 +482,24 @@ class Admission(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     reviewed_at = models.DateTimeField(blank=True, null=True)
     reviewed_by = models.CharField(max_length=100, blank=True, null=True)
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True, editable=False)
+    idempotency_fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    SEARCH_FIELDS = (
+        ('student_first_name', 'A'), ('student_last_name', 'A'),
+        ('parent_first_name', 'B'), ('parent_last_name', 'B'), ('parent_email', 'B'),
+    )
+    # Names and emails: no stemming or stop words
+    SEARCH_CONFIG = 'simple'
 
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['submitted_at', 'id'], name='api_admission_submitted_id_idx'),
+            # ?status= and ?preferred_program= filters, newest first
+            models.Index(fields=['status', 'submitted_at'], name='api_admission_status_idx'),
+            models.Index(fields=['preferred_program', 'submitted_at'], name='api_admission_program_idx'),
+        ]
         verbose_name = "Admission Application"
         verbose_name_plural = "Admission Applications"
 
@@ -415,4 +512,181 @@ class Admission(models.Model):
     
     @property
     def parent_full_name(self):
-        return f"{self.parent_first_name} {self.parent_last_name}"
\ No newline at end of file
+        return f"{self.parent_first_name} {self.parent_last_name}"
+
+
+class ContentVersion(models.Model):
+    """Per-model change counter used to invalidate cached API payloads"""
+    label = models.CharField(max_length=100, unique=True, help_text="app_label.model_name of the tracked model")
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['label']
+        verbose_name = "Content Version"
+        verbose_name_plural = "Content Versions"
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+class VideoIngestJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('superseded', 'Superseded'),
+    ]
+
+    slider = models.ForeignKey(HomeSlider, on_delete=models.CASCADE, related_name='ingest_jobs')
+    staged_path = models.CharField(max_length=500, help_text="Local path of the uploaded file awaiting processing")
+    original_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = "Video Ingest Job"
+        verbose_name_plural = "Video Ingest Jobs"
+
+    def __str__(self):
+        return f"{self.original_name} for slide {self.slider_id} ({self.get_status_display()})"
+
+
+class SearchDocument(models.Model):
+    """One row per public object in the site-wide search index (see api/search_index.py)"""
+    doc_type = models.CharField(max_length=30, help_text="Search type name, e.g. 'program' or 'blog'")
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=300)
+    body = models.TextField(blank=True, default='')
+    image_url = models.CharField(max_length=1000, blank=True, default='')
+    date = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SEARCH_FIELDS = (('title', 'A'), ('body', 'B'))
+
+    class Meta:
+        ordering = ['doc_type', 'object_id']
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'object_id'], name='unique_search_document'),
+        ]
+        verbose_name = "Search Document"
+        verbose_name_plural = "Search Documents"
+
+    def __str__(self):
+        return f"{self.doc_type}: {self.title}"
+
+
+class RelatedBlog(models.Model):
+    """Precomputed most similar posts of a blog post (see api/similarity.py)"""
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='neighbour_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['blog', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['blog', 'rank'], name='unique_related_blog_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.blog_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class BlogVector(models.Model):
+    """Unit-length content vector of a blog post, kept for incremental neighbour updates"""
+    blog = models.OneToOneField(Blog, on_delete=models.CASCADE, primary_key=True, related_name='similarity_vector')
+    vector = models.BinaryField()
+    weakest_score = models.FloatField(
+        default=0.0, help_text="Score another post must beat to enter this post's related list (0 while the list is short)"
+    )
+
+
+class RelatedBlogUpdate(models.Model):
+    """A post whose related lists the similarity worker must refresh (api/similarity.py)"""
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='pending_related_updates')
+    reproject = models.BooleanField(
+        default=False, help_text="The post was saved: recompute its vector, not only its related list"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.blog_id} ({'saved' if self.reproject else 'refresh'})"
+
+
+class SimilarityIndex(models.Model):
+    """Corpus statistics frozen at the last full rebuild of a similarity index"""
+    name = models.CharField(max_length=50, unique=True)
+    documents = models.PositiveIntegerField(default=0)
+    idf = models.BinaryField(help_text="float32 inverse document frequency per hashed term")
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Similarity Index"
+        verbose_name_plural = "Similarity Indexes"
+
+    def __str__(self):
+        return f"{self.name} ({self.documents} documents)"
+
+
+class AdmissionStat(models.Model):
+    """Number of admissions per month and funnel dimensions (see api/analytics.py)"""
+    month = models.DateField(help_text="First day of the month the application was submitted (local time)")
+    status = models.CharField(max_length=20)
+    preferred_program = models.CharField(max_length=20)
+    student_gender = models.CharField(max_length=10)
+    age_months = models.SmallIntegerField(help_text="Age of the child at the preferred start date, in whole months")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'status', 'preferred_program', 'student_gender', 'age_months'],
+                name='unique_admission_stat',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.status}/{self.preferred_program}/{self.student_gender}/{self.age_months}m: {self.count}"
+
+
+class NotificationDigest(models.Model):
+    """New admissions or inquiries of one branch, mailed to staff as one message (api/notifications.py)"""
+    KIND_CHOICES = [
+        ('admission', 'Admissions'),
+        ('inquiry', 'Inquiries'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name='notification_digests')
+    object_ids = models.JSONField(default=list)
+    # Highest Admission/Inquiry id covered; the next digest starts after it
+    last_object_id = models.BigIntegerField()
+    recipients = models.JSONField(default=list)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='api_digest_due_idx')]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} digest ({len(self.object_ids)}) - {self.get_status_display()}"
@@ -0,0 +1,173 @@
+"""
+Header-only MP4/MOV probe.
+
+Reads just enough of an ISO base media file (MP4, MOV, M4V) to report its
+duration, video resolution and codecs: top-level boxes are skipped by seeking
+over them until ``moov`` is found, and only ``moov`` is read into memory
+(``mvhd`` plus each ``trak``'s ``tkhd``/``mdhd``/``hdlr``/``stsd``). The media
+data itself is never read, so probing costs a few small reads regardless of
+file size and works on any seekable file object: in-memory and temporary
+uploads, local files and opened storage files.
+"""
+import struct
+from collections import namedtuple
+
+# moov is normally well under 1MB for short clips; refuse pathological files
+MAX_MOOV_SIZE = 16 * 1024 * 1024
+
+MP4Info = namedtuple('MP4Info', ['duration', 'width', 'height', 'video_codec', 'audio_codec', 'brand'])
+
+
+class MP4Error(ValueError):
+    """The stream is not a parseable MP4/MOV file"""
+
+
+def _read_header(stream):
+    """Read a box header; returns (type, header_size, box_size) or None at EOF"""
+    header = stream.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack('>I4s', header)
+    header_size = 8
+    if size == 1:
+        large = stream.read(8)
+        if len(large) < 8:
+            raise MP4Error('Truncated 64-bit box header')
+        size = struct.unpack('>Q', large)[0]
+        header_size = 16
+    elif size == 0:
+        size = None  # box extends to the end of the file
+    if size is not None and size < header_size:
+        raise MP4Error(f'Invalid size {size} for box {box_type!r}')
+    return box_type, header_size, size
+
+
+def _iter_boxes(data, offset=0, end=None):
+    """Yield (type, payload_start, payload_end) for boxes in ``data``"""
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if size == 1:
+            if offset + 16 > end:
+                raise MP4Error('Truncated 64-bit box header')
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size or offset + size > end:
+            raise MP4Error(f'Invalid size {size} for box {box_type!r}')
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def _find_moov(stream):
+    """Seek through top-level boxes and return (brand, moov payload bytes)"""
+    brand = None
+    while True:
+        header = _read_header(stream)
+        if header is None:
+            raise MP4Error('No moov box found')
+        box_type, header_size, size = header
+        if box_type == b'ftyp' and size and size >= header_size + 4:
+            brand = stream.read(4).decode('latin-1').strip()
+            stream.seek(size - header_size - 4, 1)
+        elif box_type == b'moov':
+            if size is None:
+                payload = stream.read(MAX_MOOV_SIZE + 1)
+            else:
+                payload = stream.read(size - header_size)
+            if len(payload) > MAX_MOOV_SIZE:
+                raise MP4Error('moov box too large')
+            return brand, payload
+        elif size is None:
+            raise MP4Error('No moov box found')
+        else:
+            stream.seek(size - header_size, 1)
+
+
+def _parse_mvhd(data, start):
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack_from('>IQ', data, start + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', data, start + 12)
+    return timescale, duration
+
+
+def _parse_trak(data, start, end):
+    """Return (handler, codec, width, height, duration seconds) for a track"""
+    handler = codec = None
+    width = height = 0
+    duration = None
+    for box_type, box_start, box_end in _iter_boxes(data, start, end):
+        if box_type == b'tkhd':
+            # Width/height are the last two 16.16 fixed-point fields
+            width, height = struct.unpack_from('>II', data, box_end - 8)
+            width, height = width >> 16, height >> 16
+        elif box_type == b'mdia':
+            for mdia_type, mdia_start, mdia_end in _iter_boxes(data, box_start, box_end):
+                if mdia_type == b'mdhd':
+                    timescale, units = _parse_mvhd(data, mdia_start)
+                    duration = units / timescale if timescale else None
+                elif mdia_type == b'hdlr':
+                    handler = data[mdia_start + 8:mdia_start + 12]
+                elif mdia_type == b'minf':
+                    codec = _find_codec(data, mdia_start, mdia_end) or codec
+    return handler, codec, width, height, duration
+
+
+def _find_codec(data, start, end):
+    for box_type, box_start, box_end in _iter_boxes(data, start, end):
+        if box_type == b'stbl':
+            for stbl_type, stbl_start, stbl_end in _iter_boxes(data, box_start, box_end):
+                if stbl_type == b'stsd' and stbl_start + 16 <= stbl_end:
+                    # version/flags(4) + entry_count(4), then the first sample entry
+                    return data[stbl_start + 12:stbl_start + 16].decode('latin-1')
+    return None
+
+
+def probe_mp4(stream):
+    """Parse the headers of the MP4/MOV file in ``stream`` (read from its start)"""
+    stream.seek(0)
+    brand, moov = _find_moov(stream)
+
+    duration = None
+    width = height = 0
+    video_codec = audio_codec = None
+    track_durations = []
+    for box_type, start, end in _iter_boxes(moov):
+        if box_type == b'mvhd':
+            timescale, units = _parse_mvhd(moov, start)
+            if timescale:
+                duration = units / timescale
+        elif box_type == b'trak':
+            handler, codec, track_width, track_height, track_duration = _parse_trak(moov, start, end)
+            if track_duration is not None:
+                track_durations.append(track_duration)
+            if handler == b'vide' and video_codec is None:
+                video_codec = codec
+                width, height = track_width, track_height
+            elif handler == b'soun' and audio_codec is None:
+                audio_codec = codec
+
+    if not duration and track_durations:
+        # Fragmented files can leave the movie duration at zero
+        duration = max(track_durations)
+    if duration is None:
+        raise MP4Error('No mvhd box found')
+    return MP4Info(duration, width, height, video_codec, audio_codec, brand)
+
+
+def probe_video(value):
+    """Probe an uploaded file, FieldFile or path without moving its read position"""
+    if isinstance(value, str):
+        with open(value, 'rb') as stream:
+            return probe_mp4(stream)
+
+    stream = getattr(value, 'file', None) or value
+    position = stream.tell()
+    try:
+        return probe_mp4(stream)
+    finally:
+        stream.seek(position)
@@ -0,0 +1,230 @@
+"""
+Staff digests of new admissions and inquiries, sent off the request path.
+
+Submitting a form never touches mail: ``manage.py send_staff_notifications``
+periodically reads the Admission and Inquiry rows created since the last
+digest (so rows inserted by the batch endpoint or the submission drainer are
+covered too), records them as ``NotificationDigest`` rows - inquiries one per
+branch, admissions one overall - and mails every due digest over a single
+connection. A digest that cannot be sent stays pending and is retried with
+exponential backoff, so an SMTP outage only delays the digests.
+
+Each kind keeps a watermark: the highest object id already covered by a
+digest. Rows younger than ``SETTLE`` are left for the next round, so a row
+whose transaction commits late is not skipped. Run one notifier (see
+start.sh); concurrent senders are kept apart by a lease on each digest.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Admission, Branch, Inquiry, NotificationDigest
+
+logger = logging.getLogger(__name__)
+
+RECIPIENTS = getattr(settings, 'STAFF_NOTIFICATION_RECIPIENTS', [])
+INTERVAL = timedelta(minutes=getattr(settings, 'STAFF_NOTIFICATION_INTERVAL', 15))
+EMAIL_BACKEND = getattr(settings, 'STAFF_NOTIFICATION_EMAIL_BACKEND', settings.EMAIL_BACKEND)
+MAX_ATTEMPTS = getattr(settings, 'STAFF_NOTIFICATION_MAX_ATTEMPTS', 8)
+RETRY_BASE = timedelta(minutes=getattr(settings, 'STAFF_NOTIFICATION_RETRY_MINUTES', 1))
+RETRY_MAX = timedelta(hours=6)
+SETTLE = timedelta(seconds=30)
+# A sender claims a digest for this long; a crashed sender's digests are retried after it
+LEASE = timedelta(minutes=5)
+LISTED_ITEMS = 50
+
+
+def split_emails(value):
+    return [email.strip() for email in value.split(',') if email.strip()]
+
+
+def branch_recipients(branch):
+    if branch is None:
+        return list(RECIPIENTS)
+    return list(dict.fromkeys([*RECIPIENTS, *split_emails(branch.notification_emails)]))
+
+
+def watermark(kind):
+    return NotificationDigest.objects.filter(kind=kind).aggregate(last=Max('last_object_id'))['last']
+
+
+def new_rows(model, kind, time_field, fields, now):
+    """Rows of ``model`` not covered by a digest yet, oldest first"""
+    rows = model.objects.filter(**{f'{time_field}__lte': now - SETTLE})
+    last = watermark(kind)
+    if last is None:
+        # First run: only announce what arrived during the last interval
+        rows = rows.filter(**{f'{time_field}__gt': now - INTERVAL})
+    else:
+        rows = rows.filter(pk__gt=last)
+    return rows.order_by('pk').values('pk', time_field, *fields)
+
+
+def format_admission(row):
+    return (
+        f"- {row['student_first_name']} {row['student_last_name']} ({row['preferred_program']}), "
+        f"parent {row['parent_first_name']} {row['parent_last_name']} <{row['parent_email']}>, "
+        f"submitted {timezone.localtime(row['submitted_at']):%Y-%m-%d %H:%M}"
+    )
+
+
+def format_inquiry(row):
+    message = ' '.join(row['message'].split())
+    if len(message) > 120:
+        message = message[:117] + '...'
+    return (
+        f"- {row['parent_name']} ({row['phone']}), child age {row['child_age']}, "
+        f"{timezone.localtime(row['created_at']):%Y-%m-%d %H:%M}: {message}"
+    )
+
+
+def digest_text(title, rows, format_row):
+    lines = [f'{title}:', ''] + [format_row(row) for row in rows[:LISTED_ITEMS]]
+    if len(rows) > LISTED_ITEMS:
+        lines.append(f'... and {len(rows) - LISTED_ITEMS} more')
+    lines += ['', 'Open the admin panel for details.']
+    return '\n'.join(lines)
+
+
+def record_digest(kind, branch, rows, subject, body, last_object_id):
+    recipients = branch_recipients(branch)
+    return NotificationDigest.objects.create(
+        kind=kind, branch=branch, object_ids=[row['pk'] for row in rows], last_object_id=last_object_id,
+        recipients=recipients, subject=subject, body=body,
+        status='pending' if recipients else 'failed',
+        last_error='' if recipients else 'No recipients configured',
+    )
+
+
+def collect(now=None):
+    """Record digests for the admissions and inquiries created since the last ones"""
+    now = now or timezone.now()
+    digests = []
+
+    admissions = list(new_rows(Admission, 'admission', 'submitted_at', [
+        'student_first_name', 'student_last_name', 'preferred_program',
+        'parent_first_name', 'parent_last_name', 'parent_email',
+    ], now))
+    if admissions:
+        count = len(admissions)
+        digests.append(record_digest(
+            'admission', None, admissions,
+            f"{count} new admission application{'s' if count != 1 else ''}",
+            digest_text('New admission applications', admissions, format_admission),
+            admissions[-1]['pk'],
+        ))
+
+    inquiries = list(new_rows(Inquiry, 'inquiry', 'created_at', [
+        'branch_id', 'parent_name', 'phone', 'child_age', 'message',
+    ], now))
+    if inquiries:
+        by_branch = {}
+        for row in inquiries:
+            by_branch.setdefault(row['branch_id'], []).append(row)
+        branches = Branch.objects.in_bulk(by_branch)
+        # Every digest of the round carries the round's highest id, the next watermark
+        last_object_id = inquiries[-1]['pk']
+        for branch_id, rows in by_branch.items():
+            branch = branches.get(branch_id)
+            name = branch.name if branch else 'unknown branch'
+            count = len(rows)
+            digests.append(record_digest(
+                'inquiry', branch, rows,
+                f"{count} new inquir{'ies' if count != 1 else 'y'} for {name}",
+                digest_text(f'New inquiries for {name}', rows, format_inquiry),
+                last_object_id,
+            ))
+    return digests
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** max(attempts - 1, 0), RETRY_MAX)
+
+
+def claim_due(now, limit):
+    """Lease the due pending digests to this sender and return them"""
+    claimed = []
+    for digest in NotificationDigest.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at')[:limit]:
+        leased = NotificationDigest.objects.filter(
+            pk=digest.pk, status='pending', next_attempt_at=digest.next_attempt_at,
+        ).update(next_attempt_at=now + LEASE, attempts=digest.attempts + 1)
+        if leased:
+            digest.attempts += 1
+            claimed.append(digest)
+    return claimed
+
+
+def mark_failed_attempt(digest, error):
+    if digest.attempts >= MAX_ATTEMPTS:
+        digest.status = 'failed'
+        logger.error('Giving up on staff digest %s after %d attempts: %s', digest.pk, digest.attempts, error)
+    else:
+        digest.next_attempt_at = timezone.now() + retry_delay(digest.attempts)
+        logger.warning('Staff digest %s not sent (attempt %d), retrying: %s', digest.pk, digest.attempts, error)
+    digest.last_error = str(error)
+    digest.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def send_due(backend=None, limit=100):
+    """Send the due digests over one mail connection; returns how many were sent"""
+    digests = claim_due(timezone.now(), limit)
+    if not digests:
+        return 0
+    connection = get_connection(backend or EMAIL_BACKEND, fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        for digest in digests:
+            mark_failed_attempt(digest, exc)
+        return 0
+
+    sent = 0
+    try:
+        for digest in digests:
+            message = EmailMessage(
+                digest.subject, digest.body, settings.DEFAULT_FROM_EMAIL, digest.recipients, connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as exc:
+                mark_failed_attempt(digest, exc)
+                continue
+            digest.status = 'sent'
+            digest.sent_at = timezone.now()
+            digest.last_error = ''
+            digest.save(update_fields=['status', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            logger.exception('Closing the staff notification mail connection failed')
+    return sent
+
+
+def run_notifier(once=False, interval=60, backend=None):
+    """Collect and send digests until interrupted (or one round with ``once``)
+
+    New rows are collected every STAFF_NOTIFICATION_INTERVAL; pending retries
+    are checked every ``interval`` seconds. Returns the number of digests sent.
+    """
+    total = 0
+    next_collect = timezone.now()
+    while True:
+        try:
+            if timezone.now() >= next_collect:
+                collect()
+                next_collect = timezone.now() + INTERVAL
+            total += send_due(backend)
+        except Exception:
+            logger.exception('Sending staff notifications failed')
+            if once:
+                raise
+        if once:
+            return total
+        time.sleep(interval)
@@ -0,0 +1,46 @@
+"""
+Migration operations for the api app.
+
+``AddIndexConcurrently`` builds an index with ``CREATE INDEX CONCURRENTLY``
+on PostgreSQL, so a deploy never holds a write lock on a busy table while the
+index is built. Other databases get a plain ``CREATE INDEX``. Unlike
+``django.contrib.postgres.operations.AddIndexConcurrently`` it can be used in
+migrations that also run on SQLite. PostgreSQL refuses to build indexes
+concurrently inside a transaction, so migrations using it must set
+``atomic = False``.
+"""
+from django.db import NotSupportedError, migrations
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """AddIndex that does not block writes on PostgreSQL"""
+
+    def describe(self):
+        return 'Concurrently create index %s on field(s) %s of model %s' % (
+            self.index.name, ', '.join(self.index.fields), self.model_name,
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            ensure_not_in_transaction(schema_editor)
+            # A failed concurrent build leaves an INVALID index behind; drop it before retrying
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(self.index.name)}')
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            ensure_not_in_transaction(schema_editor)
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+def ensure_not_in_transaction(schema_editor):
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            'Concurrent index operations cannot run inside a transaction; set atomic = False on the migration.'
+        )
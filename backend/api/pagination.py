@@ -0,0 +1,277 @@
+"""
+Pagination for the growing collections (gallery, blogs, events, admissions).
+
+Page numbers stay the default, so existing clients keep working. Adding
+``?cursor`` (empty for the first page) switches a request to keyset
+pagination. Rows are ordered by the view's ``cursor_ordering`` field with the
+primary key as tie-breaker, and each page continues strictly after the last
+row of the previous one::
+
+    WHERE created_at <= %s AND (created_at < %s OR (created_at = %s AND id < %s))
+    ORDER BY created_at DESC, id DESC LIMIT page_size + 1
+
+The (field, id) index satisfies this query, so any page costs the same as the
+first. Rows inserted while a client is scrolling never shift or repeat the
+rows it has already seen. Keyset pages carry no total. ``?count=exact`` adds a
+COUNT that is cached briefly. ``?count=estimate`` adds the planner's row
+estimate on PostgreSQL, falling back to the cached count for small results
+and other databases.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import VERSIONED_MODELS, version_token
+
+COUNT_CHOICES = ('exact', 'estimate')
+
+
+def encode_cursor(value, pk, reverse=False):
+    value = value.isoformat() if hasattr(value, 'isoformat') else value
+    raw = json.dumps([value, pk, int(reverse)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """Return (value, pk, reverse) of ``cursor`` for the key ``field``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk, reverse = json.loads(raw)
+        return field.to_python(value), int(pk), bool(reverse)
+    except (TypeError, ValueError, binascii.Error, DjangoValidationError) as exc:
+        raise NotFound('Invalid cursor.') from exc
+
+
+def estimated_count(queryset):
+    """The planner's row estimate for ``queryset`` (PostgreSQL only, else None)"""
+    connection = connections[router.db_for_read(queryset.model)]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cached_count(queryset, timeout):
+    """COUNT(*) of ``queryset``, shared for ``timeout`` seconds
+
+    Counts of versioned content models are also keyed by their content
+    version, so an edit is reflected immediately.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    parts = [queryset.db, sql, repr(params)]
+    if queryset.model in VERSIONED_MODELS:
+        parts.append(version_token([queryset.model]))
+    key = 'api:count:' + hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class KeysetPagination:
+    """Keyset page of ``queryset`` ordered by ``ordering`` ('-field' or 'field') then pk"""
+
+    def __init__(self, request, ordering, page_size, cursor_query_param='cursor'):
+        self.request = request
+        self.descending = ordering.startswith('-')
+        self.field_name = ordering.lstrip('-')
+        self.page_size = page_size
+        self.cursor_query_param = cursor_query_param
+        self.has_next = self.has_previous = False
+        self.page = []
+        self.cursor = None
+
+    def key_field(self, queryset):
+        return queryset.model._meta.get_field(self.field_name)
+
+    def position(self, queryset):
+        # A DRF request, or a plain HttpRequest (the admin changelist)
+        params = getattr(self.request, 'query_params', self.request.GET)
+        cursor = params.get(self.cursor_query_param)
+        if not cursor:
+            return None, None, False
+        return decode_cursor(cursor, self.key_field(queryset))
+
+    def window(self, queryset):
+        """The (at most page_size + 1) rows of the requested page, in query order"""
+        value, pk, reverse = self.position(queryset)
+        # Walking back to the previous page scans the index the other way
+        descending = self.descending != reverse
+        name = self.field_name
+        if value is not None:
+            if descending:
+                after = Q(**{f'{name}__lt': value}) | Q(**{name: value, 'pk__lt': pk})
+                bound = {f'{name}__lte': value}
+            else:
+                after = Q(**{f'{name}__gt': value}) | Q(**{name: value, 'pk__gt': pk})
+                bound = {f'{name}__gte': value}
+            # The redundant range bound lets the index scan start at the cursor
+            queryset = queryset.filter(after, **bound)
+        sign = '-' if descending else ''
+        return queryset.order_by(f'{sign}{name}', f'{sign}pk')[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset):
+        value, pk, reverse = self.position(queryset)
+        if value is not None:
+            self.cursor = (value, pk)
+        rows = list(self.window(queryset))
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = more, True
+        else:
+            self.has_next, self.has_previous = more, value is not None
+        self.page = rows
+        return rows
+
+    def cursor_link(self, value, pk, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(value, pk, reverse))
+
+    def edge(self, row):
+        # An empty page (past either end) continues from the cursor itself
+        if row is None:
+            return self.cursor
+        return getattr(row, self.field_name), row.pk
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.cursor_link(*self.edge(self.page[-1] if self.page else None), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.cursor_link(*self.edge(self.page[0] if self.page else None), reverse=True)
+
+
+class FlexiblePagination(PageNumberPagination):
+    """Page numbers by default, keyset pages with ``?cursor``
+
+    Views opt in to keyset pagination with ``cursor_ordering`` (e.g.
+    ``'-created_at'``); ``cursor_fields`` lists other fields a client may
+    order by with ``?ordering=`` in cursor mode. The key fields must be
+    non-null and should be indexed together with the primary key.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    count_query_param = 'count'
+    count_cache_timeout = 60
+    # Below this many estimated rows an exact count is cheap and more useful
+    estimate_exact_below = 10000
+
+    keyset = None
+
+    def keyset_requested(self, request, view):
+        return (
+            getattr(view, 'cursor_ordering', None) is not None
+            and self.cursor_query_param in request.query_params
+            and self.get_page_size(request) is not None
+        )
+
+    def get_cursor_ordering(self, request, view):
+        requested = request.query_params.get(self.ordering_query_param, '').strip()
+        allowed = {view.cursor_ordering.lstrip('-'), *getattr(view, 'cursor_fields', ())}
+        if requested.lstrip('-') in allowed:
+            return requested
+        return view.cursor_ordering
+
+    def make_keyset(self, request, view):
+        return KeysetPagination(
+            request, self.get_cursor_ordering(request, view), self.get_page_size(request), self.cursor_query_param,
+        )
+
+    def validator_queryset(self, queryset, request, view):
+        """Rows a response will contain, for conditional GET validators"""
+        if self.keyset_requested(request, view):
+            return self.make_keyset(request, view).window(queryset)
+        return queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.keyset_requested(request, view):
+            self.keyset = None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.display_page_controls = False
+        self.keyset = self.make_keyset(request, view)
+        self.total = self.get_total(queryset, request)
+        return self.keyset.paginate_queryset(queryset)
+
+    def get_total(self, queryset, request):
+        """(count, estimated) requested with ``?count=``, or None"""
+        mode = request.query_params.get(self.count_query_param)
+        if not mode:
+            return None
+        if mode not in COUNT_CHOICES:
+            raise ValidationError({self.count_query_param: f"Choose from {', '.join(COUNT_CHOICES)}."})
+        if mode == 'estimate':
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate >= self.estimate_exact_below:
+                return estimate, True
+        return cached_count(queryset, self.count_cache_timeout), False
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        payload = OrderedDict()
+        if self.total is not None:
+            payload['count'], payload['count_estimated'] = self.total
+        payload['next'] = self.keyset.get_next_link()
+        payload['previous'] = self.keyset.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_previous_link()
+        return super().get_previous_link()
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['count_estimated'] = {'type': 'boolean', 'example': False}
+        return response
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        if getattr(view, 'cursor_ordering', None) is None:
+            return parameters
+        return parameters + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset pagination cursor; pass it empty for the first page.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Include a total with keyset pages: exact (cached) or estimate.',
+                'schema': {'type': 'string', 'enum': list(COUNT_CHOICES)},
+            },
+        ]
@@ -0,0 +1,40 @@
+"""
+Request parsers for the api app.
+
+``NDJSONParser`` accepts newline-delimited JSON (one object per line) and
+parses lazily: ``request.data`` is an iterator that decodes a line only when
+the view asks for the next row, so a large upload is processed as it streams
+in instead of being decoded into one big list first. A line that is not
+valid JSON yields a ``MalformedRow`` so the view can report it against its
+row number and carry on with the rest.
+"""
+import codecs
+from collections import namedtuple
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+from rest_framework.settings import api_settings
+from rest_framework.utils import json
+
+MalformedRow = namedtuple('MalformedRow', ['error'])
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+    strict = api_settings.STRICT_JSON
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self.rows(codecs.getreader(encoding)(stream))
+
+    def rows(self, lines):
+        parse_constant = json.strict_constant if self.strict else None
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line, parse_constant=parse_constant)
+            except ValueError as exc:
+                yield MalformedRow(f'JSON parse error - {exc}')
@@ -0,0 +1,239 @@
+"""
+On-demand profiles of real requests, for staff.
+
+A staff user adds ``?profile=1`` (or ``?profile=sample``) to a request, or
+sends ``X-Profile: cprofile`` / ``X-Profile: sample``, and
+``ProfilingMiddleware`` runs the rest of the request under a profiler:
+
+* ``cprofile``: the deterministic profiler; saved as a pstats file
+  (``python -m pstats``, snakeviz);
+* ``sample``: a thread that records the request thread's stack every
+  ``SAMPLE_INTERVAL`` seconds, for much lower overhead on slow requests;
+  saved as collapsed stacks (flamegraph.pl, speedscope).
+
+Profiles are stored in ``PROFILING['DIR']`` with a JSON description, and the
+response names them in ``X-Profile-Id`` and ``X-Profile-Url``
+(/api/profiles/<id>/ downloads one). Saving a profile removes those beyond
+``MAX_PROFILES`` and older than ``MAX_AGE_DAYS``, so the feature can stay
+enabled. ``manage.py profiles`` lists and summarizes them.
+"""
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from django.utils import timezone
+
+from .metrics import view_label
+
+PROFILING = {
+    'ENABLED': True,
+    'DIR': os.path.join(settings.BASE_DIR, 'profiles'),
+    'MAX_PROFILES': 200,
+    'MAX_AGE_DAYS': 7,
+    'SAMPLE_INTERVAL': 0.005,
+    **getattr(settings, 'PROFILING', {}),
+}
+
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+MODES = {'1': 'cprofile', 'cprofile': 'cprofile', 'sample': 'sample'}
+SUFFIXES = {'cprofile': '.pstats', 'sample': '.collapsed'}
+PROFILE_ID = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+ID_TIME_FORMAT = '%Y%m%dT%H%M%S%f'
+
+
+def requested_mode(request):
+    value = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+    return MODES.get(value.lower()) if value else None
+
+
+def frame_name(code):
+    path = code.co_filename.replace(os.sep, '/').split('/')
+    return f"{'/'.join(path[-2:])}:{code.co_name}".replace(';', ',')
+
+
+class StackSampler:
+    """Collapsed stacks of one thread, sampled from a background thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def profile_path(profile_id, suffix, directory=None):
+    return os.path.join(directory or PROFILING['DIR'], f'{profile_id}{suffix}')
+
+
+def new_profile_id():
+    return f'{timezone.now().strftime(ID_TIME_FORMAT)}-{secrets.token_hex(4)}'
+
+
+def save_profile(mode, content, description, directory=None):
+    """Store a profile and its description; returns the description with its id"""
+    directory = directory or PROFILING['DIR']
+    os.makedirs(directory, exist_ok=True)
+    profile_id = new_profile_id()
+    description = {'id': profile_id, 'mode': mode, 'file': f'{profile_id}{SUFFIXES[mode]}', **description}
+    with open(profile_path(profile_id, SUFFIXES[mode], directory), 'wb') as handle:
+        handle.write(content)
+    # The description is written last: listed profiles are complete
+    with open(profile_path(profile_id, '.json', directory), 'w') as handle:
+        json.dump(description, handle)
+    prune(directory=directory)
+    return description
+
+
+def list_profiles(directory=None):
+    """Descriptions of the stored profiles, newest first"""
+    directory = directory or PROFILING['DIR']
+    try:
+        names = sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name)) as handle:
+                profiles.append(json.load(handle))
+        except (FileNotFoundError, ValueError):
+            continue
+    return profiles
+
+
+def get_profile(profile_id, directory=None):
+    if not PROFILE_ID.match(profile_id):
+        return None
+    for profile in list_profiles(directory):
+        if profile['id'] == profile_id:
+            return profile
+    return None
+
+
+def delete_profile(profile, directory=None):
+    for name in (profile['file'], f"{profile['id']}.json"):
+        try:
+            os.remove(os.path.join(directory or PROFILING['DIR'], name))
+        except FileNotFoundError:
+            pass
+
+
+def prune(max_profiles=None, max_age_days=None, directory=None):
+    """Delete profiles beyond the newest ``max_profiles`` or older than ``max_age_days``; returns how many"""
+    max_profiles = PROFILING['MAX_PROFILES'] if max_profiles is None else max_profiles
+    max_age_days = PROFILING['MAX_AGE_DAYS'] if max_age_days is None else max_age_days
+    oldest = (timezone.now() - timedelta(days=max_age_days)).strftime(ID_TIME_FORMAT)
+    expired = [
+        profile for index, profile in enumerate(list_profiles(directory))
+        if index >= max_profiles or profile['id'] < oldest
+    ]
+    for profile in expired:
+        delete_profile(profile, directory)
+    return len(expired)
+
+
+class ProfilingMiddleware:
+    """Profile staff requests that ask for it (see module docstring); goes after AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        if not PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        user = getattr(request, 'user', None)
+        if mode is None or user is None or not user.is_staff:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            duration = time.perf_counter() - started
+            # What Profile.dump_stats writes, without going through a path
+            profiler.create_stats()
+            content = marshal.dumps(profiler.stats)
+            samples = None
+        else:
+            with StackSampler(threading.get_ident(), PROFILING['SAMPLE_INTERVAL']) as sampler:
+                response = self.get_response(request)
+            duration = time.perf_counter() - started
+            content = sampler.collapsed().encode('utf-8')
+            samples = sampler.samples
+
+        profile = save_profile(mode, content, {
+            'created_at': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view_label(request),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'samples': samples,
+            'user': user.get_username(),
+        })
+        response['X-Profile-Id'] = profile['id']
+        response['X-Profile-Url'] = reverse('profile-detail', kwargs={'profile_id': profile['id']})
+        return response
+
+
+def summarize(profile, limit=20, sort='cumulative', directory=None):
+    """Text summary of a stored profile: the top functions, or the hottest frames of sampled stacks"""
+    path = os.path.join(directory or PROFILING['DIR'], profile['file'])
+    if profile['mode'] == 'cprofile':
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    own, total, samples = Counter(), Counter(), 0
+    with open(path) as handle:
+        for line in handle:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            frames, count = stack.split(';'), int(count)
+            samples += count
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+    lines = [f'{samples} samples', f'{"self":>7} {"total":>7}  frame']
+    for frame, count in own.most_common(limit):
+        lines.append(f'{count / samples:>7.1%} {total[frame] / samples:>7.1%}  {frame}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,117 @@
+"""
+Query budgets and repeated-query detection.
+
+``manage.py check_query_budgets`` requests every route of api/urls.py and
+every admin changelist at two data sizes and fails when a route makes more
+queries with more rows (a query per row, e.g. a related field read without
+``select_related``) or more than its budget in ``QUERY_BUDGETS``.
+
+``RepeatedQueryMiddleware`` (DEBUG only) logs a warning when one request
+runs ``REPEATED_QUERY_THRESHOLD`` or more queries that differ only in their
+parameters, naming the statement.
+"""
+import logging
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .metrics import view_label
+
+logger = logging.getLogger(__name__)
+
+REPEATED_QUERY_THRESHOLD = getattr(settings, 'REPEATED_QUERY_THRESHOLD', 5)
+
+# Most queries a cold request (empty caches) may make, by '<METHOD> <URL name>'.
+# Staff requests include loading the session and the user.
+DEFAULT_QUERY_BUDGET = 4
+# Session, user, the filtered and total counts, the page, list_filter choices, and
+# on PostgreSQL the planner's estimate before a small count (api/changelist.py)
+ADMIN_CHANGELIST_BUDGET = 8
+QUERY_BUDGETS = {
+    # Insert, then the analytics summary upsert (api/analytics.py)
+    'POST admission-list': 7,
+    'POST admission-batch': 9,
+    # Versions and validators of every payload in the bundle (api/bundles.py)
+    'GET bundle-detail': 7,
+}
+# Queries a route may add at the larger data size without making one per row
+QUERY_GROWTH_ALLOWED = {
+    # The summary upsert adds an UPDATE once some of the summary rows exist
+    'POST admission-batch': 1,
+}
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+def normalize_sql(sql):
+    """``sql`` with its literals and parameter lists replaced, so similar statements compare equal"""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    return PLACEHOLDER_LIST.sub('(...)', sql.replace('%s', '?'))
+
+
+class QueryLog:
+    """Connection execute wrapper counting statements by their normalized SQL"""
+
+    def __init__(self):
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements[normalize_sql(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    def repeated(self, threshold=REPEATED_QUERY_THRESHOLD):
+        """[(statement, count)] run at least ``threshold`` times, most frequent first"""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+def query_budget(method, name):
+    default = ADMIN_CHANGELIST_BUDGET if name.startswith('admin:') else DEFAULT_QUERY_BUDGET
+    return QUERY_BUDGETS.get(f'{method} {name}', default)
+
+
+def allowed_growth(method, name):
+    return QUERY_GROWTH_ALLOWED.get(f'{method} {name}', 0)
+
+
+def budget_problems(method, name, status, small, large):
+    """Why a route fails the check, given its status and QueryLogs at the smaller and larger data size"""
+    problems = []
+    if status >= 400:
+        problems.append(f'HTTP {status}')
+    growth = large.count - small.count
+    if growth > allowed_growth(method, name):
+        problems.append(f'{growth} more queries with more rows')
+    budget = query_budget(method, name)
+    if max(small.count, large.count) > budget:
+        problems.append(f'over budget of {budget}')
+    return problems
+
+
+class RepeatedQueryMiddleware:
+    """Warn about similar queries repeated within one request; development only"""
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            response = self.get_response(request)
+        for sql, count in log.repeated():
+            logger.warning(
+                '%s %s (%s) ran %d similar queries: %s',
+                request.method, request.path, view_label(request), count, sql[:300],
+            )
+        return response
@@ -0,0 +1,149 @@
+"""
+EXPLAIN checks of the filtered/ordered list query paths.
+
+Each ``PlanCheck`` requests one list endpoint; every SELECT it runs against
+the check's table is EXPLAINed, and a full scan (a ``Seq Scan`` on
+PostgreSQL, planned with sequential scans disabled, so that one is chosen
+only where no index applies whatever the table's size) or a sort of every
+matching row is a problem. Used by
+``manage.py check_query_plans`` and api/tests/test_query_plans.py, on rows
+from ``seed()``.
+"""
+import json
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import AboutFeature, Admission, Blog, Event, Gallery, HomeSlider, HomeStats
+
+# ``route`` is a URL name, ``params`` the query string of the request
+PlanCheck = namedtuple('PlanCheck', ['label', 'route', 'params', 'model', 'staff'])
+
+CHECKS = [
+    PlanCheck('home slider', 'homeslider-list', {}, HomeSlider, False),
+    PlanCheck('home stats', 'homestats-list', {}, HomeStats, False),
+    PlanCheck('about features', 'aboutfeature-list', {}, AboutFeature, False),
+    PlanCheck('about features by category', 'aboutfeature-list', {'category': 'curriculum'}, AboutFeature, False),
+    PlanCheck('events', 'event-list', {}, Event, False),
+    PlanCheck('upcoming events', 'event-upcoming', {}, Event, False),
+    PlanCheck('gallery by type and category', 'gallery-list', {'type': 'image', 'category': 'Music'}, Gallery, False),
+    PlanCheck('gallery infinite scroll', 'gallery-list', {'cursor': ''}, Gallery, False),
+    PlanCheck('blogs infinite scroll', 'blog-list', {'cursor': ''}, Blog, False),
+    PlanCheck('admissions by status', 'admission-list', {'status': 'under_review'}, Admission, True),
+    PlanCheck('admissions by program', 'admission-list', {'preferred_program': 'pre_k'}, Admission, True),
+    PlanCheck('admissions newest first', 'admission-list', {'cursor': ''}, Admission, True),
+]
+
+# A row scan of the whole table, or a sort of every matching row
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+PlanResult = namedtuple('PlanResult', ['status', 'plans', 'problems'])
+
+
+def supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def explain(sql, table):
+    """Return (plan summary, problem or None) for one query"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.execute('RESET enable_seqscan')
+            nodes = list(plan_nodes((json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']))
+            summary = ' > '.join(
+                f"{node['Node Type']}({node.get('Index Name') or node.get('Relation Name', '')})" for node in nodes
+            )
+            if any(node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table for node in nodes):
+                return summary, f'sequential scan of {table}'
+            return summary, None
+
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    summary = ' > '.join(details)
+    for detail in details:
+        match = SQLITE_FULL_SCAN.match(detail)
+        if match and match.group(1) == table:
+            return summary, f'full scan of {table}'
+        if detail.startswith(SQLITE_SORT):
+            return summary, 'sorts every matching row'
+    return summary, None
+
+
+def check_plans(client, check):
+    """Request ``check`` with ``client`` and EXPLAIN the queries it runs on its table"""
+    table = check.model._meta.db_table
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse(check.route), check.params)
+    plans, problems = [], []
+    for query in queries.captured_queries:
+        sql = query['sql']
+        if not sql.startswith('SELECT') or connection.ops.quote_name(table) not in sql:
+            continue
+        plan, problem = explain(sql, table)
+        plans.append((sql, plan))
+        if problem:
+            problems.append(problem)
+    return PlanResult(response.status_code, plans, problems)
+
+
+def seed(rng, rows, active_ratio):
+    """``rows`` rows of every checked model; ``active_ratio`` of the slides/stats/features are active"""
+    now = timezone.now()
+
+    def active():
+        return rng.random() < active_ratio
+
+    def batches(build):
+        return [build(index) for index in range(rows)]
+
+    HomeSlider.objects.bulk_create(batches(lambda i: HomeSlider(
+        title=f'Slide {i}', subtitle='Seeded slide', image='home_slider/seed.jpg',
+        order=rng.randint(0, 100), is_active=active(),
+    )), batch_size=1000)
+    HomeStats.objects.bulk_create(batches(lambda i: HomeStats(
+        stat_type=f'seed-{i}', value=i, label=f'Stat {i}', order=rng.randint(0, 100), is_active=active(),
+    )), batch_size=1000)
+    AboutFeature.objects.bulk_create(batches(lambda i: AboutFeature(
+        category=rng.choice(AboutFeature.CATEGORY_CHOICES)[0], icon='*', title=f'Feature {i}',
+        description='Seeded feature', order=rng.randint(0, 100), is_active=active(),
+    )), batch_size=1000)
+    Event.objects.bulk_create(batches(lambda i: Event(
+        title=f'Event {i}', description='Seeded event', image='events/seed.jpg',
+        date=now + timedelta(days=rng.randint(-3650, 60)),
+    )), batch_size=1000)
+    Gallery.objects.bulk_create(batches(lambda i: Gallery(
+        title=f'Photo {i}', type=rng.choice(Gallery.TYPE_CHOICES)[0],
+        category=rng.choice(Gallery.CATEGORY_CHOICES)[0], image='gallery/seed.jpg',
+    )), batch_size=1000)
+    Blog.objects.bulk_create(batches(lambda i: Blog(
+        title=f'Post {i}', slug=f'query-plan-check-{i}', excerpt='Seeded post', content='Seeded post',
+        image='blog/seed.jpg',
+    )), batch_size=1000)
+    Admission.objects.bulk_create(batches(lambda i: Admission(
+        student_first_name=f'Student{i}', student_last_name='Seed', student_date_of_birth=date(2021, 1, 1),
+        student_gender='other', parent_first_name='Parent', parent_last_name='Seed',
+        parent_email=f'parent{i}@example.com', parent_phone='0', emergency_contact_name='Contact',
+        emergency_contact_phone='0', emergency_contact_relationship='Relative', address='-', city='-',
+        state='-', zip_code='0', preferred_program=rng.choice(Admission.PROGRAM_CHOICES)[0],
+        preferred_start_date=date(2026, 6, 1), status=rng.choice(Admission.STATUS_CHOICES)[0],
+    )), batch_size=1000)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
@@ -0,0 +1,718 @@
+"""
+Synthetic rows for every model, at any scale, for benchmarks and load tests.
+
+``seed(scale)`` inserts ``BASE_COUNTS[model] * scale`` rows of each model
+(``FIXED_COUNTS`` for the singletons) and then updates what the signals
+would have: search documents, related blog posts, the admission summary
+and the content versions. The same ``seed`` always
+generates the same rows, apart from timestamps, which are spread backwards
+from ``now`` so date-based endpoints (upcoming events, the analytics window)
+have data.
+
+Rows are produced one at a time by generators and inserted in batches, so
+memory stays flat whatever the scale: content models with ``bulk_create``,
+the submission tables (millions of rows) as plain field values through one
+prepared INSERT per batch, or COPY on PostgreSQL (``insert_rows``). A load
+that at least doubles a table builds its secondary indexes once at the end.
+Neither sends signals; media fields point at placeholder names, with their
+resolved URL columns filled from the configured storage.
+"""
+import io
+import random
+import time
+from bisect import bisect
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import date, timedelta
+from itertools import accumulate, chain, islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import analytics, similarity
+from .cache import bump_version
+from .media import resolve_media_url, resolved_url_field
+from .models import (
+    AboutFeature, AboutPage, Admission, Blog, Branch, Event, FAQ, Gallery, HomeSlider, HomeStats, Inquiry,
+    NotificationDigest, Program, Setting, TeamMember, Testimonial, VideoIngestJob,
+)
+from .search import fts_table, has_search_index, restore_search_triggers
+from .search_index import SEARCH_TYPES, rebuild_index
+
+# Rows per model at scale 1; everything else is derived from these
+BASE_COUNTS = {
+    Branch: 3,
+    Program: 4,
+    Gallery: 12,
+    Testimonial: 6,
+    Event: 6,
+    Blog: 6,
+    TeamMember: 6,
+    FAQ: 8,
+    Setting: 10,
+    AboutFeature: 12,
+    HomeSlider: 4,
+    VideoIngestJob: 2,
+    Inquiry: 20,
+    Admission: 20,
+    NotificationDigest: 2,
+}
+# One row whatever the scale (unique per type)
+FIXED_COUNTS = {
+    AboutPage: 1,
+    HomeStats: len(HomeStats.STAT_TYPE_CHOICES),
+}
+BATCH_SIZE = 1000
+# Distinct generated texts per field of the high-volume tables
+TEXT_POOL = 512
+# How far back generated timestamps go
+HISTORY = timedelta(days=730)
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Ayaan', 'Krishna', 'Ishaan',
+    'Ananya', 'Diya', 'Saanvi', 'Aadhya', 'Pari', 'Anika', 'Navya', 'Myra', 'Sara', 'Ira',
+    'Rohan', 'Kabir', 'Meera', 'Tara', 'Nisha', 'Priya', 'Rahul', 'Neha', 'Vikram', 'Kavya',
+]
+LAST_NAMES = [
+    'Sharma', 'Patel', 'Iyer', 'Reddy', 'Nair', 'Gupta', 'Joshi', 'Kulkarni', 'Deshmukh', 'Rao',
+    'Mehta', 'Shah', 'Menon', 'Pillai', 'Chopra', 'Kapoor', 'Singh', 'Das', 'Bose', 'Verma',
+]
+CITIES = [
+    ('Pune', 'Maharashtra', '411'), ('Mumbai', 'Maharashtra', '400'), ('Bengaluru', 'Karnataka', '560'),
+    ('Hyderabad', 'Telangana', '500'), ('Chennai', 'Tamil Nadu', '600'), ('Nagpur', 'Maharashtra', '440'),
+    ('Ahmedabad', 'Gujarat', '380'), ('Kochi', 'Kerala', '682'),
+]
+STREETS = ['MG Road', 'FC Road', 'Baner Road', 'Link Road', 'Station Road', 'Park Street', 'Lake View Road', 'Hill Road']
+WORDS = (
+    'play learning children garden music reading science art craft story friends teacher classroom outdoor '
+    'curiosity discovery colours shapes numbers letters songs dance nature safety care nutrition healthy '
+    'creative confidence social emotional growth language motor skills puzzle blocks sand water painting '
+    'library field trip festival celebration parents community kindness sharing routine rest snack '
+    'phonics counting rhymes theatre yoga sports swimming cooking gardening animals planets experiment'
+).split()
+ROLES = ['Principal', 'Lead Teacher', 'Assistant Teacher', 'Music Teacher', 'Art Teacher', 'Counsellor', 'Nurse', 'Coordinator']
+RELATIONS = ['Mother', 'Father', 'Grandmother', 'Grandfather', 'Guardian']
+FEATURE_ICONS = ['🏫', '📚', '🎨', '🎵', '🌱', '🧩', '⚽', '🔬', '🍎', '🛡']
+STAT_VALUES = {
+    'students': (500, '+', 'FaUsers'), 'branches': (8, '', 'FaBuilding'), 'awards': (25, '+', 'FaTrophy'),
+    'teachers': (60, '+', 'FaChalkboardTeacher'), 'years': (12, '+', 'FaCalendar'), 'satisfaction': (98, '%', 'FaSmile'),
+}
+ADMISSION_STATUS_WEIGHTS = [50, 15, 20, 10, 5]
+# Age in months at the preferred start date, per program
+PROGRAM_AGES = {'toddler': (24, 36), 'preschool': (36, 48), 'pre_k': (48, 60)}
+
+
+def words(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def sentence(rng, low=6, high=14):
+    return words(rng, low, high).capitalize() + '.'
+
+
+def paragraph(rng, sentences=4):
+    return ' '.join(sentence(rng) for _ in range(sentences))
+
+
+def person(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def phone(rng):
+    return f'+91 {rng.randint(70000, 99999)} {rng.randint(0, 99999):05d}'
+
+
+def moment(rng, context, spread=HISTORY):
+    """A timestamp within ``spread`` before ``now``"""
+    return context['now'] - timedelta(seconds=rng.randrange(int(spread.total_seconds())))
+
+
+def with_media(obj, context, **names):
+    """Set media fields to placeholder names and their resolved URL columns"""
+    urls = context['urls']
+    for field_name, name in names.items():
+        setattr(obj, field_name, name)
+        if name:
+            if name not in urls:
+                urls[name] = resolve_media_url(getattr(obj, field_name))
+            setattr(obj, resolved_url_field(field_name), urls[name])
+    return obj
+
+
+def placeholder(rng, folder, extension='jpg', variety=24):
+    return f'{folder}/sample-{rng.randrange(variety)}.{extension}'
+
+
+def build_branch(rng, index, context):
+    city, state, pin = CITIES[index % len(CITIES)]
+    created = moment(rng, context)
+    return Branch(
+        name=f'Kiddoo {city} {rng.choice(STREETS)} {index + 1}',
+        address=f'{rng.randint(1, 250)} {rng.choice(STREETS)}, {city}, {state} {pin}{rng.randint(0, 999):03d}',
+        phone=phone(rng), map_url=f'https://maps.example.com/?q=kiddoo+{slugify(city)}+{index + 1}',
+        created_at=created,
+    )
+
+
+def build_program(rng, index, context):
+    low = rng.randint(2, 5)
+    created = moment(rng, context)
+    return with_media(Program(
+        name=f'{rng.choice(["Little", "Bright", "Happy", "Curious", "Tiny"])} {rng.choice(WORDS).capitalize()} Program {index + 1}',
+        age_group=f'{low}-{low + 1}', description=paragraph(rng, 3),
+        created_at=created, updated_at=created,
+    ), context, image=placeholder(rng, 'programs'))
+
+
+def build_gallery(rng, index, context):
+    item = Gallery(
+        title=sentence(rng, 3, 6)[:-1], category=rng.choice(Gallery.CATEGORY_CHOICES)[0], created_at=moment(rng, context),
+    )
+    if rng.random() < 0.2:
+        item.type = 'video'
+        item.video_url = f'https://www.youtube.com/watch?v=sample{index}'
+        return item
+    item.type = 'image'
+    return with_media(item, context, image=placeholder(rng, 'gallery'))
+
+
+def build_testimonial(rng, index, context):
+    first, last = person(rng)
+    child, _ = person(rng)
+    return with_media(Testimonial(
+        parent_name=f'{first} {last}', relation=f'{rng.choice(RELATIONS)} of {child}',
+        rating=rng.choices([3, 4, 5], [1, 3, 6])[0], message=paragraph(rng, 2), created_at=moment(rng, context),
+    ), context, photo=placeholder(rng, 'testimonials') if rng.random() < 0.5 else None)
+
+
+def build_event(rng, index, context):
+    # Half in the past, half upcoming
+    when = context['now'] + timedelta(days=rng.uniform(-180, 180))
+    return with_media(Event(
+        title=f'{rng.choice(WORDS).capitalize()} {rng.choice(["Day", "Fair", "Week", "Workshop", "Show"])}',
+        description=paragraph(rng, 2), date=when, created_at=min(when, context['now']) - timedelta(days=30),
+    ), context, image=placeholder(rng, 'events') if rng.random() < 0.8 else None)
+
+
+def build_blog(rng, index, context):
+    title = sentence(rng, 4, 8)[:-1]
+    created = moment(rng, context)
+    return with_media(Blog(
+        title=title, slug=f'{slugify(title)[:40]}-{index + 1}', excerpt=sentence(rng, 12, 20),
+        content='\n\n'.join(paragraph(rng, rng.randint(3, 6)) for _ in range(rng.randint(3, 6))),
+        created_at=created, updated_at=created,
+    ), context, image=placeholder(rng, 'blog'))
+
+
+def build_team_member(rng, index, context):
+    first, last = person(rng)
+    return with_media(TeamMember(
+        name=f'{first} {last}', role=rng.choice(ROLES), bio=paragraph(rng, 2), created_at=moment(rng, context),
+    ), context, photo=placeholder(rng, 'team'))
+
+
+def build_faq(rng, index, context):
+    return FAQ(
+        question=f'{sentence(rng, 5, 10)[:-1]}?', answer=paragraph(rng, 2), order=index, created_at=moment(rng, context),
+    )
+
+
+def build_setting(rng, index, context):
+    created = moment(rng, context)
+    return Setting(
+        key=f'sample_setting_{index + 1}', value=words(rng, 1, 6), description=sentence(rng, 4, 8)[:200],
+        created_at=created, updated_at=created,
+    )
+
+
+def build_about_page(rng, index, context):
+    created = moment(rng, context)
+    return AboutPage(
+        mission_content=paragraph(rng, 3), vision_content=paragraph(rng, 3), cta_content=sentence(rng),
+        created_at=created, updated_at=created,
+    )
+
+
+def build_about_feature(rng, index, context):
+    created = moment(rng, context)
+    return AboutFeature(
+        category=rng.choice(AboutFeature.CATEGORY_CHOICES)[0], icon=rng.choice(FEATURE_ICONS),
+        title=sentence(rng, 2, 5)[:-1], description=sentence(rng, 10, 20), order=index % 10,
+        is_active=rng.random() < 0.9, created_at=created, updated_at=created,
+    )
+
+
+def build_home_slider(rng, index, context):
+    created = moment(rng, context)
+    slide = HomeSlider(
+        title=sentence(rng, 3, 6)[:-1], subtitle=sentence(rng, 8, 14), order=index, is_active=rng.random() < 0.8,
+        created_at=created, updated_at=created,
+    )
+    if rng.random() < 0.25:
+        slide.media_type = 'video'
+        return with_media(
+            slide, context, video=placeholder(rng, 'home_slider/videos', 'mp4', 6),
+            video_poster=placeholder(rng, 'home_slider/posters'),
+        )
+    slide.media_type = 'image'
+    return with_media(slide, context, image=placeholder(rng, 'home_slider'))
+
+
+def build_home_stats(rng, index, context):
+    stat_type, label = HomeStats.STAT_TYPE_CHOICES[index]
+    value, suffix, icon = STAT_VALUES.get(stat_type, (10, '', 'FaStar'))
+    created = moment(rng, context)
+    return HomeStats(
+        stat_type=stat_type, value=value, label=label, suffix=suffix, icon=icon, order=index,
+        created_at=created, updated_at=created,
+    )
+
+
+def build_video_ingest_job(rng, index, context):
+    started = moment(rng, context)
+    return VideoIngestJob(
+        slider_id=rng.choice(context['ids'][HomeSlider]), staged_path=f'/tmp/video-ingest/sample-{index}.mp4',
+        original_name=f'slide-{index + 1}.mp4', status='done', attempts=1,
+        created_at=started - timedelta(seconds=5), started_at=started, finished_at=started + timedelta(seconds=rng.randint(2, 40)),
+    )
+
+
+def inquiry_rows(rng, start, count, context):
+    """Inquiry field values (dicts) for rows ``start`` to ``start + count``"""
+    now, branches, random = context['now'], context['ids'][Branch], rng.random
+    spread = int(timedelta(days=365).total_seconds())
+    names = [' '.join(person(rng)) for _ in range(TEXT_POOL)]
+    phones = [phone(rng) for _ in range(TEXT_POOL)]
+    messages = [paragraph(rng, rng.randint(1, 3)) for _ in range(TEXT_POOL)]
+    for _ in range(start, start + count):
+        yield {
+            'parent_name': names[int(random() * TEXT_POOL)], 'phone': phones[int(random() * TEXT_POOL)],
+            'child_age': 2 + int(random() * 5), 'branch_id': branches[int(random() * len(branches))],
+            'message': messages[int(random() * TEXT_POOL)],
+            'created_at': now - timedelta(seconds=int(random() * spread)),
+        }
+
+
+def admission_rows(rng, start, count, context):
+    """Admission field values (dicts) for rows ``start`` to ``start + count``"""
+    now, random = context['now'], rng.random
+    spread = int(HISTORY.total_seconds())
+    programs = [(value, *PROGRAM_AGES[value]) for value, _ in Admission.PROGRAM_CHOICES]
+    statuses = [value for value, _ in Admission.STATUS_CHOICES]
+    status_weights = list(accumulate(ADMISSION_STATUS_WEIGHTS))
+    genders = ['male', 'female', 'female', 'male', 'other']
+    phones = [phone(rng) for _ in range(TEXT_POOL)]
+    contacts = [' '.join(person(rng)) for _ in range(TEXT_POOL)]
+    streets = [f'{rng.randint(1, 250)} {rng.choice(STREETS)}' for _ in range(TEXT_POOL)]
+    reasons = [sentence(rng, 8, 16) if rng.random() < 0.6 else None for _ in range(TEXT_POOL)]
+    conditions = [None, None, None, 'Peanut allergy', 'Asthma']
+    kin = ['Aunt', 'Uncle', 'Grandparent', 'Neighbour']
+    for index in range(start, start + count):
+        submitted = now - timedelta(seconds=int(random() * spread))
+        program, low, high = programs[int(random() * len(programs))]
+        preferred_start = date(submitted.year + 1, 1 if random() < 0.5 else 6, 1)
+        born = preferred_start - timedelta(days=int((low + random() * (high - low)) * 30.44))
+        child = FIRST_NAMES[int(random() * len(FIRST_NAMES))]
+        surname = LAST_NAMES[int(random() * len(LAST_NAMES))]
+        parent = FIRST_NAMES[int(random() * len(FIRST_NAMES))]
+        city, state, pin = CITIES[int(random() * len(CITIES))]
+        status = statuses[bisect(status_weights, random() * status_weights[-1])]
+        reviewed = status != 'pending'
+        yield {
+            'student_first_name': child, 'student_last_name': surname, 'student_date_of_birth': born,
+            'student_gender': genders[int(random() * len(genders))],
+            'parent_first_name': parent, 'parent_last_name': surname,
+            'parent_email': f'{parent.lower()}.{surname.lower()}{index}@example.com',
+            'parent_phone': phones[int(random() * TEXT_POOL)],
+            'parent_relationship': RELATIONS[int(random() * len(RELATIONS))],
+            'emergency_contact_name': contacts[int(random() * TEXT_POOL)],
+            'emergency_contact_phone': phones[int(random() * TEXT_POOL)],
+            'emergency_contact_relationship': kin[int(random() * len(kin))],
+            'address': streets[int(random() * TEXT_POOL)], 'city': city, 'state': state,
+            'zip_code': f'{pin}{int(random() * 1000):03d}',
+            'preferred_program': program, 'preferred_start_date': preferred_start,
+            'medical_conditions': conditions[int(random() * len(conditions))],
+            'why_choose_us': reasons[int(random() * TEXT_POOL)],
+            'status': status, 'submitted_at': submitted, 'updated_at': submitted,
+            'reviewed_at': submitted + timedelta(days=1 + int(random() * 20)) if reviewed else None,
+            'reviewed_by': 'Admissions Office' if reviewed else None,
+        }
+
+
+def build_inquiry(rng, index, context):
+    return Inquiry(**next(inquiry_rows(rng, index, 1, context)))
+
+
+def build_admission(rng, index, context):
+    return Admission(**next(admission_rows(rng, index, 1, context)))
+
+
+def build_notification_digest(rng, index, context):
+    kind = 'inquiry' if index % 2 else 'admission'
+    low, high = context['ranges'][Inquiry if kind == 'inquiry' else Admission]
+    ids = sorted(rng.sample(range(low, high + 1), min(5, high - low + 1))) if high else []
+    created = moment(rng, context)
+    return NotificationDigest(
+        kind=kind, object_ids=ids, last_object_id=ids[-1] if ids else 0, recipients=['office@example.com'],
+        subject=f'{len(ids)} new {kind} notifications', body=paragraph(rng, 2), status='sent', attempts=1,
+        next_attempt_at=created, created_at=created, sent_at=created + timedelta(seconds=rng.randint(1, 60)),
+    )
+
+
+# Insertion order: parents before the rows referencing them. Builders make
+# one model instance per call; the high-volume tables use row generators
+# (see ROW_GENERATORS) instead.
+GENERATORS = [
+    (Branch, build_branch),
+    (Program, build_program),
+    (Gallery, build_gallery),
+    (Testimonial, build_testimonial),
+    (Event, build_event),
+    (Blog, build_blog),
+    (TeamMember, build_team_member),
+    (FAQ, build_faq),
+    (Setting, build_setting),
+    (AboutPage, build_about_page),
+    (AboutFeature, build_about_feature),
+    (HomeSlider, build_home_slider),
+    (HomeStats, build_home_stats),
+    (VideoIngestJob, build_video_ingest_job),
+    (Inquiry, inquiry_rows),
+    (Admission, admission_rows),
+    (NotificationDigest, build_notification_digest),
+]
+MODELS = [model for model, _ in GENERATORS]
+# Generators of field values rather than instances, inserted with insert_rows
+ROW_GENERATORS = (Inquiry, Admission)
+# Rows of these must exist before the model is generated
+PARENTS = {Inquiry: Branch, VideoIngestJob: HomeSlider}
+# Models whose primary keys later generators pick from
+REFERENCED = (Branch, HomeSlider)
+# Models whose id range later generators use
+RANGED = (Inquiry, Admission)
+# PostgreSQL accepts at most this many parameters per statement
+MAX_QUERY_PARAMS = 65535
+# Characters psycopg2 asks a COPY stream for at a time
+COPY_READ_SIZE = 1 << 20
+# Backslash escapes of COPY's text format
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+# Column types passed to the driver as they are
+PLAIN_TYPES = {
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'BooleanField', 'CharField', 'ForeignKey', 'IntegerField',
+    'PositiveBigIntegerField', 'PositiveIntegerField', 'PositiveSmallIntegerField', 'SlugField',
+    'SmallIntegerField', 'TextField',
+}
+
+
+def row_count(model, scale):
+    if model in FIXED_COUNTS:
+        return FIXED_COUNTS[model]
+    return max(1, round(BASE_COUNTS[model] * scale))
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Keep the generated values of auto_now/auto_now_add fields on insert"""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def deferred_search_index(model, connection):
+    """On SQLite, fill the model's FTS5 index once after loading instead of row by row
+
+    The insert trigger is dropped for the duration and recreated by
+    ``restore_search_triggers``, which also rebuilds the index.
+    """
+    if connection.vendor != 'sqlite' or not has_search_index(model, connection):
+        yield
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {quote(fts_table(model._meta.db_table) + "_ai")}')
+    try:
+        yield
+    finally:
+        restore_search_triggers([model], connection)
+
+
+def secondary_indexes(model, connection):
+    """[(name, CREATE INDEX statement)] of the non-unique indexes of the model's table"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s',
+                [table],
+            )
+        else:
+            return []
+        return [(name, sql) for name, sql in cursor.fetchall() if not sql.upper().startswith('CREATE UNIQUE')]
+
+
+@contextmanager
+def deferred_indexes(model, connection):
+    """Drop the table's secondary indexes for a bulk load and build each once afterwards
+
+    Use inside the load's transaction: if it fails, the drop is rolled back too.
+    """
+    indexes = secondary_indexes(model, connection)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+    yield
+    if indexes and connection.vendor == 'postgresql':
+        # PostgreSQL won't build an index while the load's deferred foreign key checks are pending
+        connection.check_constraints(table_names=[model._meta.db_table])
+    with connection.cursor() as cursor:
+        for _, sql in indexes:
+            cursor.execute(sql)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert(model, objects, batch_size=BATCH_SIZE):
+    """bulk_create ``objects`` (any iterable) ``batch_size`` at a time; returns the number inserted"""
+    count = 0
+    with explicit_timestamps(model), transaction.atomic():
+        for batch in batches(objects, batch_size):
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+    return count
+
+
+def db_adapter(field, connection):
+    """Function converting a value of ``field`` for the driver, or None when it needs no conversion"""
+    internal_type = field.get_internal_type()
+    if internal_type in PLAIN_TYPES:
+        return None
+    if internal_type == 'DateTimeField':
+        if connection.vendor == 'sqlite' and settings.USE_TZ:
+            # adapt_datetimefield_value for aware values, without its per-call checks: str() less its '+HH:MM'
+            tz = connection.timezone
+            return lambda value: None if value is None else str(value.astimezone(tz))[:-6]
+        return connection.ops.adapt_datetimefield_value
+    if internal_type == 'DateField':
+        if connection.vendor == 'sqlite':
+            # What adapt_datefield_value returns, without the call
+            return lambda value: None if value is None else value.isoformat()
+        return connection.ops.adapt_datefield_value
+    return lambda value: field.get_db_prep_save(value, connection)
+
+
+def copy_text(params):
+    """Rows of COPY's text format, one per list of values in ``params``"""
+    text = ''.join(['\t'.join(['\\N' if value is None else str(value) for value in values]) + '\n' for values in params])
+    # Escaping each value costs more than writing it: write the values as they are unless the
+    # counts of separators and backslashes (beyond the NULL markers) show one needs escaping
+    nulls = sum(values.count(None) for values in params)
+    columns = len(params[0]) if params else 0
+    if (text.count('\\') == nulls and text.count('\t') == len(params) * (columns - 1)
+            and text.count('\n') == len(params) and '\r' not in text):
+        return text
+    return ''.join([
+        '\t'.join([
+            '\\N' if value is None else str(value).translate(COPY_ESCAPES) for value in values
+        ]) + '\n'
+        for values in params
+    ])
+
+
+class CopyStream(io.TextIOBase):
+    """Readable COPY text of the lists of values in ``params``, produced ``batch_size`` rows per refill
+
+    Feeding one COPY from a stream lets the server store a batch while the
+    next one is generated.
+    """
+
+    def __init__(self, params, batch_size):
+        self.batches = batches(params, batch_size)
+        self.text, self.position, self.count = '', 0, 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if self.position >= len(self.text):
+            batch = next(self.batches, None)
+            if batch is None:
+                return ''
+            self.text, self.position = copy_text(batch), 0
+            self.count += len(batch)
+        end = len(self.text) if size is None or size < 0 else self.position + size
+        chunk = self.text[self.position:end]
+        self.position = end
+        return chunk
+
+
+def copy_rows(cursor, table, columns, params, batch_size=BATCH_SIZE):
+    """COPY ``params`` (lists of values in ``columns`` order) into ``table``; returns the number of rows. PostgreSQL only"""
+    sql = f'COPY {table} ({columns}) FROM STDIN'
+    raw = cursor.cursor
+    if hasattr(raw, 'copy_expert'):
+        # psycopg2 reads a text-format stream
+        stream = CopyStream(params, batch_size)
+        raw.copy_expert(sql, stream, size=COPY_READ_SIZE)
+        return stream.count
+    # psycopg 3 adapts the values itself
+    count = 0
+    with raw.copy(sql) as copy:
+        for values in params:
+            copy.write_row(values)
+            count += 1
+    return count
+
+
+def insert_rows(model, rows, batch_size=BATCH_SIZE, using='default', defer_indexes=False):
+    """Insert ``rows`` (dicts of field values by attname) ``batch_size`` at a time; returns the number inserted
+
+    Does what bulk_create does for these rows without building model
+    instances or compiling every value through the ORM, which dominates
+    bulk_create's cost at millions of rows: one streamed COPY on PostgreSQL,
+    elsewhere a prepared INSERT per batch (executemany on SQLite, a
+    multi-row VALUES list otherwise). Every row has the keys of the first
+    one; other fields get their default, evaluated once. No signals are sent.
+    With ``defer_indexes`` the secondary indexes are built after the load.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    connection = connections[using]
+    copy = connection.vendor == 'postgresql'
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    given = [field for field in fields if field.attname in first]
+    defaulted = [field for field in fields if field.attname not in first]
+    get_values = itemgetter(*[field.attname for field in given])
+    conversions = [
+        (position, adapt) for position, (field, adapt) in enumerate((field, db_adapter(field, connection)) for field in given)
+        # COPY's text format takes dates and datetimes as str() writes them
+        if adapt and not (copy and field.get_internal_type() in ('DateField', 'DateTimeField'))
+    ]
+    constants = [field.get_db_prep_save(field.get_default(), connection) for field in defaulted]
+
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in given + defaulted)
+    insert_sql = f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES '
+    placeholders = f'({", ".join(["%s"] * len(fields))})'
+    statement_rows = max(1, MAX_QUERY_PARAMS // len(fields))
+
+    def values(row):
+        params = list(get_values(row)) if len(given) > 1 else [get_values(row)]
+        for position, adapt in conversions:
+            params[position] = adapt(params[position])
+        return params + constants
+
+    count = 0
+    with deferred_search_index(model, connection), transaction.atomic(using=using), \
+            deferred_indexes(model, connection) if defer_indexes else nullcontext(), connection.cursor() as cursor:
+        if copy:
+            return copy_rows(cursor, quote(model._meta.db_table), columns, map(values, chain([first], rows)), batch_size)
+        for batch in batches(chain([first], rows), batch_size):
+            params = [values(row) for row in batch]
+            if connection.vendor == 'sqlite':
+                cursor.executemany(insert_sql + placeholders, params)
+            else:
+                for offset in range(0, len(params), statement_rows):
+                    chunk = params[offset:offset + statement_rows]
+                    cursor.execute(insert_sql + ', '.join([placeholders] * len(chunk)), list(chain.from_iterable(chunk)))
+            count += len(batch)
+    return count
+
+
+def generate(model, build, start, count, seed, context):
+    # One stream per model, so changing one model's count leaves the others' rows as they were
+    rng = random.Random(f'{seed}:{model._meta.label}')
+    if model in ROW_GENERATORS:
+        return build(rng, start, count, context)
+    return (build(rng, index, context) for index in range(start, start + count))
+
+
+def counting_stats(rows, counts):
+    """Pass admission rows through, adding their summary keys to ``counts``"""
+    tz = timezone.get_current_timezone()
+    for row in rows:
+        counts[analytics.stat_key(row, tz)] += 1
+        yield row
+
+
+def rebuild_derived(models):
+    """Recompute the search documents and related posts for ``models``"""
+    types = [search_type for search_type in SEARCH_TYPES if search_type.model in models]
+    if types:
+        rebuild_index(types)
+    if Blog in models:
+        similarity.rebuild()
+
+
+def seed(scale=1, seed=0, batch_size=BATCH_SIZE, models=None, now=None, log=None):
+    """Insert generated rows for ``models`` (all by default); returns {model: rows inserted}
+
+    Rows are numbered after the ones already in each table, so unique fields
+    (blog slugs, setting keys) stay unique when seeding more than once; the
+    fixed-count tables are only seeded when empty. Inquiries and video ingest
+    jobs reference existing branches and slides.
+    """
+    models = set(models or MODELS)
+    context = {'now': now or timezone.now(), 'urls': {}, 'ids': {}, 'ranges': {}}
+    counts = {}
+    for model, build in GENERATORS:
+        if model in models:
+            parent = PARENTS.get(model)
+            if parent is not None and not context['ids'].get(parent):
+                raise ValueError(f'{model._meta.verbose_name_plural} need {parent._meta.verbose_name_plural} to refer to')
+            started = time.perf_counter()
+            existing = model.objects.count()
+            if model in FIXED_COUNTS and existing:
+                count = 0
+            else:
+                count = row_count(model, scale)
+            rows = generate(model, build, existing, count, seed, context)
+            if model is Admission:
+                # Counted on the way in: cheaper than regrouping the table afterwards
+                stats = Counter()
+                rows = counting_stats(rows, stats)
+            if model in ROW_GENERATORS:
+                counts[model] = insert_rows(model, rows, batch_size, defer_indexes=count >= existing)
+            else:
+                counts[model] = insert(model, rows, batch_size)
+            if model is Admission:
+                analytics.apply(stats)
+            if log:
+                log(f'{model._meta.verbose_name_plural}: {counts[model]} rows in {time.perf_counter() - started:.1f}s')
+        if model in REFERENCED:
+            context['ids'][model] = list(model.objects.values_list('pk', flat=True))
+        if model in RANGED:
+            bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+            context['ranges'][model] = (bounds['low'] or 0, bounds['high'] or 0)
+    rebuild_derived(counts)
+    for model in counts:
+        bump_version(model)
+    return counts
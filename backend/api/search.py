@@ -0,0 +1,205 @@
+"""
+Indexed full-text search for the content models.
+
+Models opt in with ``SEARCH_FIELDS``: (field, weight) pairs with weights
+'A' (most important) to 'D', and optionally ``SEARCH_CONFIG``, the text search
+configuration ('english' by default, 'simple' for names and emails). The
+index is maintained by the database itself, so every write path including
+``bulk_create`` and ``QuerySet.update`` keeps it current:
+
+* PostgreSQL: a ``search_vector`` tsvector column set by a trigger, with a
+  GIN index
+* SQLite: an external-content FTS5 table ``<table>_fts`` kept in sync by
+  triggers
+
+Both are created by migrations (0016, 0017, 0024), each holding its own copy
+of the SQL.
+
+``FullTextSearchFilter`` is a drop-in replacement for DRF's SearchFilter that
+ranks matches (``ts_rank_cd`` / ``bm25``) and annotates ``search_rank`` and
+``search_highlight``; on other databases, or before the migration has run,
+it falls back to SearchFilter's ``icontains`` lookups.
+"""
+from django.db import connections, router
+from django.db.models import BooleanField, FloatField, TextField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+DEFAULT_CONFIG = 'english'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+# bm25 column weights standing in for PostgreSQL's setweight() classes
+FTS5_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 1.0, 'D': 0.5}
+FTS5_TOKENIZERS = {'english': 'porter unicode61', 'simple': 'unicode61'}
+HIGHLIGHT_START, HIGHLIGHT_STOP = '<mark>', '</mark>'
+HEADLINE_OPTIONS = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MaxWords=24, MinWords=8'
+
+# (connection alias, table) -> whether the index exists
+_index_cache = {}
+
+
+def fts_table(table):
+    return f'{table}_fts'
+
+
+def search_fields(model):
+    return getattr(model, 'SEARCH_FIELDS', ())
+
+
+def search_config(model):
+    return getattr(model, 'SEARCH_CONFIG', DEFAULT_CONFIG)
+
+
+def highlight_field(model):
+    """The last long-text field of the index, shown as the highlighted excerpt"""
+    text_fields = [
+        name for name, _ in search_fields(model)
+        if isinstance(model._meta.get_field(name), TextField)
+    ]
+    return text_fields[-1] if text_fields else None
+
+
+def fts5_trigger_statements(table, fields, pk, quote):
+    """Triggers keeping the FTS5 table of ``table`` in sync with its rows"""
+    fts = fts_table(table)
+    columns = [name for name, _ in fields]
+    column_list = ', '.join(quote(name) for name in columns)
+    old_values = ', '.join(f'old.{quote(name)}' for name in columns)
+    new_values = ', '.join(f'new.{quote(name)}' for name in columns)
+    delete_old = (
+        f"INSERT INTO {quote(fts)}({quote(fts)}, rowid, {column_list}) "
+        f"VALUES ('delete', old.{quote(pk)}, {old_values});"
+    )
+    insert_new = f'INSERT INTO {quote(fts)}(rowid, {column_list}) VALUES (new.{quote(pk)}, {new_values});'
+    return [
+        f'CREATE TRIGGER {quote(fts + "_ai")} AFTER INSERT ON {quote(table)} BEGIN {insert_new} END',
+        f'CREATE TRIGGER {quote(fts + "_ad")} AFTER DELETE ON {quote(table)} BEGIN {delete_old} END',
+        f'CREATE TRIGGER {quote(fts + "_au")} AFTER UPDATE OF {column_list} ON {quote(table)} '
+        f'BEGIN {delete_old} {insert_new} END',
+    ]
+
+
+def forget_search_indexes():
+    """Look the indexes up again, e.g. after migrations created them"""
+    _index_cache.clear()
+
+
+def restore_search_triggers(models, connection):
+    """Recreate FTS5 triggers dropped by SQLite table rebuilds; returns the tables fixed
+
+    Django's SQLite schema editor alters a table by copying it into a new one,
+    which discards its triggers. Run after migrations (see signals.py).
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    quote = connection.ops.quote_name
+    tables = set(connection.introspection.table_names())
+    restored = []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row[0] for row in cursor.fetchall()}
+        for model in models:
+            table = model._meta.db_table
+            fts = fts_table(table)
+            if not search_fields(model) or fts not in tables:
+                continue
+            if {fts + suffix for suffix in ('_ai', '_ad', '_au')} <= triggers:
+                continue
+            for suffix in ('_ai', '_ad', '_au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {quote(fts + suffix)}')
+            for statement in fts5_trigger_statements(table, search_fields(model), model._meta.pk.column, quote):
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {quote(fts)}({quote(fts)}) VALUES ('rebuild')")
+            restored.append(table)
+    return restored
+
+
+def has_search_index(model, connection):
+    table = model._meta.db_table
+    key = (connection.alias, table)
+    if key not in _index_cache:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                columns = connection.introspection.get_table_description(cursor, table)
+            _index_cache[key] = any(column.name == SEARCH_VECTOR_COLUMN for column in columns)
+        elif connection.vendor == 'sqlite':
+            _index_cache[key] = fts_table(table) in connection.introspection.table_names()
+        else:
+            _index_cache[key] = False
+    return _index_cache[key]
+
+
+def fts5_query(terms):
+    """All ``terms`` as quoted FTS5 strings, so user input is never parsed as syntax"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def full_text_search(queryset, text, terms):
+    """Matches of ``text`` in ``queryset`` ordered by relevance, or None if not indexed"""
+    model = queryset.model
+    connection = connections[router.db_for_read(model)]
+    if not search_fields(model) or not has_search_index(model, connection):
+        return None
+
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    headline = highlight_field(model)
+    pk = model._meta.pk.column
+
+    if connection.vendor == 'postgresql':
+        config = search_config(model)
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        vector = f'{quote(table)}.{quote(SEARCH_VECTOR_COLUMN)}'
+        queryset = queryset.filter(
+            RawSQL(f'{vector} @@ {tsquery}', [config, text], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank_cd({vector}, {tsquery})', [config, text], output_field=FloatField()),
+        )
+        if headline:
+            queryset = queryset.annotate(search_highlight=RawSQL(
+                f"ts_headline(%s::regconfig, coalesce({quote(table)}.{quote(headline)}, ''), {tsquery}, %s)",
+                [config, config, text, HEADLINE_OPTIONS], output_field=TextField(),
+            ))
+    else:
+        fts = quote(fts_table(table))
+        fields = search_fields(model)
+        weights = ', '.join(str(FTS5_WEIGHTS[weight]) for _, weight in fields)
+        select = {'search_rank': f'-bm25({fts}, {weights})'}
+        if headline:
+            column = [name for name, _ in fields].index(headline)
+            select['search_highlight'] = (
+                f"snippet({fts}, {column}, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '…', 24)"
+            )
+        queryset = queryset.extra(
+            select=select,
+            tables=[fts_table(table)],
+            where=[f'{fts}.rowid = {quote(table)}.{quote(pk)}', f'{fts} MATCH %s'],
+            params=[fts5_query(terms)],
+        )
+    return queryset.order_by('-search_rank', '-pk')
+
+
+class FullTextSearchFilter(SearchFilter):
+    """SearchFilter backed by the database's full-text index, ranked by relevance"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        ranked = full_text_search(queryset, request.query_params.get(self.search_param, ''), terms)
+        if ranked is None:
+            return super().filter_queryset(request, queryset, view)
+        return ranked
+
+
+class SearchRankOrderingFilter(OrderingFilter):
+    """OrderingFilter whose default ordering yields to search relevance
+
+    An explicit ``?ordering=`` still wins; without one, ranked search results
+    keep the order set by FullTextSearchFilter instead of the view's default.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        explicit = request.query_params.get(self.ordering_param)
+        if not explicit and '-search_rank' in queryset.query.order_by:
+            return None
+        return super().get_ordering(request, queryset, view)
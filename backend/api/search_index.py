@@ -0,0 +1,156 @@
+"""
+Site-wide search over the public content models.
+
+Every public object is mirrored into one ``SearchDocument`` row (type, id,
+title, body, image, date), and that table carries the same database
+full-text index as the per-model search in api/search.py. ``/api/search/``
+therefore answers a query with a single statement: match, rank, cap the hits
+per type with ``ROW_NUMBER() OVER (PARTITION BY doc_type ...)`` and order the
+remainder by relevance.
+
+Documents are refreshed from post_save/post_delete (see signals.py). Bulk
+writes bypass those signals; ``manage.py rebuild_search_index`` recreates the
+index from scratch.
+"""
+from collections import namedtuple
+
+from django.db import connections, router, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .media import stored_media_url
+from .models import AboutFeature, Blog, Branch, Event, FAQ, Gallery, Program, SearchDocument, TeamMember, Testimonial
+from .search import (
+    FTS5_WEIGHTS, HEADLINE_OPTIONS, HIGHLIGHT_START, HIGHLIGHT_STOP, fts5_query, fts_table, has_search_index,
+)
+
+# ``route`` is the router basename of the model's detail endpoint
+SearchType = namedtuple('SearchType', ['name', 'model', 'title', 'body', 'image', 'date', 'route'])
+
+SEARCH_TYPES = [
+    SearchType('program', Program, 'name', ('age_group', 'description'), 'image', 'created_at', 'program'),
+    SearchType('blog', Blog, 'title', ('excerpt', 'content'), 'image', 'created_at', 'blog'),
+    SearchType('event', Event, 'title', ('description',), 'image', 'date', 'event'),
+    SearchType('faq', FAQ, 'question', ('answer',), None, 'created_at', 'faq'),
+    SearchType('gallery', Gallery, 'title', ('category',), 'image', 'created_at', 'gallery'),
+    SearchType('team', TeamMember, 'name', ('role', 'bio'), 'photo', 'created_at', 'teammember'),
+    SearchType('testimonial', Testimonial, 'parent_name', ('relation', 'message'), 'photo', 'created_at', 'testimonial'),
+    SearchType('branch', Branch, 'name', ('address',), None, 'created_at', 'branch'),
+    SearchType('feature', AboutFeature, 'title', ('description',), None, 'created_at', 'aboutfeature'),
+]
+TYPES_BY_NAME = {search_type.name: search_type for search_type in SEARCH_TYPES}
+TYPES_BY_MODEL = {search_type.model: search_type for search_type in SEARCH_TYPES}
+
+
+def is_searchable(instance):
+    return getattr(instance, 'is_active', True)
+
+
+def document_fields(search_type, instance):
+    image = ''
+    if search_type.image and getattr(instance, search_type.image):
+        image = stored_media_url(instance, search_type.image)
+    return {
+        'title': str(getattr(instance, search_type.title))[:300],
+        'body': '\n\n'.join(str(value) for value in (getattr(instance, name) for name in search_type.body) if value),
+        'image_url': image,
+        'date': getattr(instance, search_type.date),
+    }
+
+
+def index_object(instance):
+    """Create, refresh or drop the search document of ``instance``"""
+    search_type = TYPES_BY_MODEL.get(type(instance))
+    if search_type is None:
+        return
+    if not is_searchable(instance):
+        remove_object(instance)
+        return
+    SearchDocument.objects.update_or_create(
+        doc_type=search_type.name, object_id=instance.pk,
+        defaults=document_fields(search_type, instance),
+    )
+
+
+def remove_object(instance):
+    search_type = TYPES_BY_MODEL.get(type(instance))
+    if search_type is not None:
+        SearchDocument.objects.filter(doc_type=search_type.name, object_id=instance.pk).delete()
+
+
+def rebuild_index(types=None, batch_size=500):
+    """Recreate the documents of ``types`` (all by default); returns {type: count}"""
+    counts = {}
+    for search_type in types or SEARCH_TYPES:
+        documents = [
+            SearchDocument(doc_type=search_type.name, object_id=instance.pk, **document_fields(search_type, instance))
+            for instance in search_type.model.objects.iterator(chunk_size=batch_size)
+            if is_searchable(instance)
+        ]
+        with transaction.atomic():
+            SearchDocument.objects.filter(doc_type=search_type.name).delete()
+            SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+        counts[search_type.name] = len(documents)
+    return counts
+
+
+def search(text, terms, types=None, per_type=5, limit=20):
+    """Ranked SearchDocuments matching ``text``, at most ``per_type`` of each type
+
+    Each returned document has ``rank`` and ``snippet`` attributes. ``terms``
+    is ``text`` split into words, as used for the SQLite FTS5 query.
+    """
+    connection = connections[router.db_for_read(SearchDocument)]
+    types = list(types or TYPES_BY_NAME)
+    if not has_search_index(SearchDocument, connection):
+        return _search_unindexed(text, types, per_type, limit)
+
+    quote = connection.ops.quote_name
+    table = quote(SearchDocument._meta.db_table)
+    type_clause = f'AND d.doc_type IN ({", ".join(["%s"] * len(types))})'
+
+    # Innermost: match and rank; middle: number the hits of each type by rank
+    if connection.vendor == 'postgresql':
+        matched = f'''
+            SELECT d.id, d.doc_type, d.object_id, d.title, d.image_url, d.date, d.body, q.query,
+                   ts_rank_cd(d.search_vector, q.query) AS rank
+            FROM {table} d, websearch_to_tsquery('english', %s) AS q(query)
+            WHERE d.search_vector @@ q.query {type_clause}
+        '''
+        snippet = "ts_headline('english', body, query, %s)"
+        params = [HEADLINE_OPTIONS, text, *types]
+    else:
+        fts = quote(fts_table(SearchDocument._meta.db_table))
+        matched = f'''
+            SELECT d.id, d.doc_type, d.object_id, d.title, d.image_url, d.date,
+                   -bm25({fts}, {FTS5_WEIGHTS["A"]}, {FTS5_WEIGHTS["B"]}) AS rank,
+                   snippet({fts}, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '…', 24) AS snippet
+            FROM {fts} JOIN {table} d ON d.id = {fts}.rowid
+            WHERE {fts} MATCH %s {type_clause}
+        '''
+        snippet = 'snippet'
+        params = [fts5_query(terms), *types]
+    sql = f'''
+        SELECT id, doc_type, object_id, title, image_url, date, rank, {snippet} AS snippet
+        FROM (
+            SELECT matched.*, ROW_NUMBER() OVER (PARTITION BY doc_type ORDER BY rank DESC, id) AS type_rank
+            FROM ({matched}) matched
+        ) ranked
+        WHERE type_rank <= %s
+        ORDER BY rank DESC, id
+        LIMIT %s
+    '''
+    return list(SearchDocument.objects.raw(sql, [*params, per_type, limit]))
+
+
+def _search_unindexed(text, types, per_type, limit):
+    documents = SearchDocument.objects.filter(
+        Q(title__icontains=text) | Q(body__icontains=text), doc_type__in=types,
+    ).annotate(
+        type_rank=Window(RowNumber(), partition_by=[F('doc_type')], order_by=[F('date').desc(nulls_last=True), 'id']),
+    ).filter(type_rank__lte=per_type).order_by(F('date').desc(nulls_last=True), 'id')[:limit]
+    documents = list(documents)
+    for document in documents:
+        document.rank = None
+        document.snippet = None
+    return documents
@@ -3,45 +3,40 @@ from django.conf import settings
 from .models import (
     Program, Gallery, Testimonial, Event, Branch, 
     Inquiry, Blog, TeamMember, FAQ, Setting,
-    AboutPage, AboutFeature, HomeSlider, HomeStats, Admission
+    AboutPage, AboutFeature, HomeSlider, HomeStats, Admission, SearchDocument
 )
-def _normalize_media_url(url: str) -> str:
-    """Improved URL normalization for Cloudinary storage.
-    Handles various URL formats and prevents double-prefixing issues.
-    """
-    if not url:
-        return url
-    
-    # If it's already a complete Cloudinary URL, return as-is
-    if url.startswith('https://res.cloudinary.com/'):
-        return url
-    
-    # If it starts with /media/, remove it
-    if url.startswith('/media/'):
-        url = url[7:]  # Remove '/media/'
-    
-    # Handle cases where Cloudinary URL is embedded in path
-    cloudinary_marker = 'https://res.cloudinary.com/'
-    if cloudinary_marker in url:
-        start_idx = url.find(cloudinary_marker)
-        return url[start_idx:]
-    
-    # If it's a relative path, return as-is (Cloudinary will handle it)
-    return url
+from rest_framework.reverse import reverse
+from .media import absolute_media_url, image_variants, stored_media_url
+from .search_index import TYPES_BY_NAME
+from .timing import TimedModelSerializer
+
+
+def _media_url(obj, field_name, request):
+    """Public URL of a media field, served from its stored resolved URL"""
+    return absolute_media_url(stored_media_url(obj, field_name), request)
 
-class ProgramSerializer(serializers.ModelSerializer):
+class SearchResultMixin:
+    """Include relevance and highlighted excerpt for FullTextSearchFilter results"""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'search_rank'):
+            data['search_rank'] = instance.search_rank
+            data['search_highlight'] = getattr(instance, 'search_highlight', None)
+        return data
+
+
+class ProgramSerializer(SearchResultMixin, TimedModelSerializer):
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Program
-        fields = '__all__'
+        exclude = ['image_resolved_url']
 
     def get_image(self, obj):
         if obj.image:
-            request = self.context.get('request')
-            url = obj.image.url
-            url = _normalize_media_url(url)
-            return request.build_absolute_uri(url) if request and not url.startswith('http') else url
+            return _media_url(obj, 'image', self.context.get('request'))
         # Cloudinary placeholder (configurable)
         placeholder = getattr(settings, 'CLOUDINARY_PLACEHOLDER_URL', None)
         if placeholder:
@@ -49,22 +44,23 @@ class ProgramSerializer(serializers.ModelSerializer):
         # Final fallback
         return f"https://via.placeholder.com/400x300?text={obj.name.replace(' ', '+')}"
 
+    def get_image_variants(self, obj):
+        return image_variants(obj, 'image', self.context.get('request'))
+
 
-class GallerySerializer(serializers.ModelSerializer):
+class GallerySerializer(TimedModelSerializer):
     url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Gallery
-        fields = ['id', 'title', 'type', 'url', 'category', 'created_at']
+        fields = ['id', 'title', 'type', 'url', 'image_variants', 'category', 'created_at']
     
     def get_url(self, obj):
         """Return the appropriate URL based on type"""
         request = self.context.get('request')
         if obj.type == 'image' and obj.image:
-            url = _normalize_media_url(obj.image.url)
-            if request and not url.startswith('http'):
-                return request.build_absolute_uri(url)
-            return url
+            return _media_url(obj, 'image', request)
         elif obj.type == 'video' and obj.video_url:
             return obj.video_url
         elif obj.type == 'image':
@@ -76,162 +72,191 @@ class GallerySerializer(serializers.ModelSerializer):
             return f"https://via.placeholder.com/800x600?text={obj.title.replace(' ', '+')}"
         return None
 
+    def get_image_variants(self, obj):
+        if obj.type != 'image':
+            return None
+        return image_variants(obj, 'image', self.context.get('request'))
 
-class TestimonialSerializer(serializers.ModelSerializer):
+
+class TestimonialSerializer(TimedModelSerializer):
     photo = serializers.SerializerMethodField()
+    photo_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Testimonial
-        fields = '__all__'
+        exclude = ['photo_resolved_url']
 
     def get_photo(self, obj):
         if not obj.photo:
             return None
-        request = self.context.get('request')
-        url = _normalize_media_url(obj.photo.url)
-        return request.build_absolute_uri(url) if request and not url.startswith('http') else url
+        return _media_url(obj, 'photo', self.context.get('request'))
 
+    def get_photo_variants(self, obj):
+        return image_variants(obj, 'photo', self.context.get('request'))
 
-class EventSerializer(serializers.ModelSerializer):
+
+class EventSerializer(SearchResultMixin, TimedModelSerializer):
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
-        fields = '__all__'
+        exclude = ['image_resolved_url']
 
     def get_image(self, obj):
         if not obj.image:
             return None
-        request = self.context.get('request')
-        url = _normalize_media_url(obj.image.url)
-        return request.build_absolute_uri(url) if request and not url.startswith('http') else url
+        return _media_url(obj, 'image', self.context.get('request'))
 
+    def get_image_variants(self, obj):
+        return image_variants(obj, 'image', self.context.get('request'))
 
-class BranchSerializer(serializers.ModelSerializer):
+
+class BranchSerializer(TimedModelSerializer):
     class Meta:
         model = Branch
-        fields = '__all__'
+        exclude = ['notification_emails']
 
 
-class InquirySerializer(serializers.ModelSerializer):
+class InquirySerializer(TimedModelSerializer):
     class Meta:
         model = Inquiry
-        fields = '__all__'
+        exclude = ['idempotency_key', 'idempotency_fingerprint']
 
     def create(self, validated_data):
         return Inquiry.objects.create(**validated_data)
 
 
-class BlogSerializer(serializers.ModelSerializer):
+class BlogSerializer(SearchResultMixin, TimedModelSerializer):
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Blog
-        fields = '__all__'
+        exclude = ['image_resolved_url']
 
     def get_image(self, obj):
         if not obj.image:
             return None
-        request = self.context.get('request')
-        url = _normalize_media_url(obj.image.url)
-        return request.build_absolute_uri(url) if request and not url.startswith('http') else url
+        return _media_url(obj, 'image', self.context.get('request'))
 
+    def get_image_variants(self, obj):
+        return image_variants(obj, 'image', self.context.get('request'))
 
-class TeamMemberSerializer(serializers.ModelSerializer):
+
+class TeamMemberSerializer(TimedModelSerializer):
     photo = serializers.SerializerMethodField()
+    photo_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = TeamMember
-        fields = '__all__'
+        exclude = ['photo_resolved_url']
 
     def get_photo(self, obj):
         if not obj.photo:
             return None
-        request = self.context.get('request')
-        url = _normalize_media_url(obj.photo.url)
-        return request.build_absolute_uri(url) if request and not url.startswith('http') else url
+        return _media_url(obj, 'photo', self.context.get('request'))
 
+    def get_photo_variants(self, obj):
+        return image_variants(obj, 'photo', self.context.get('request'))
 
-class FAQSerializer(serializers.ModelSerializer):
+
+class FAQSerializer(SearchResultMixin, TimedModelSerializer):
     class Meta:
         model = FAQ
         fields = '__all__'
 
 
-class SettingSerializer(serializers.ModelSerializer):
+class SettingSerializer(TimedModelSerializer):
     class Meta:
         model = Setting
         fields = '__all__'
 
 
-class AboutPageSerializer(serializers.ModelSerializer):
+class AboutPageSerializer(TimedModelSerializer):
     class Meta:
         model = AboutPage
         fields = '__all__'
 
 
-class AboutFeatureSerializer(serializers.ModelSerializer):
+class AboutFeatureSerializer(TimedModelSerializer):
     class Meta:
         model = AboutFeature
         fields = '__all__'
 
 
-class HomeSliderSerializer(serializers.ModelSerializer):
+class HomeSliderSerializer(TimedModelSerializer):
     media_url = serializers.SerializerMethodField()
     poster_url = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    poster_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = HomeSlider
-        fields = '__all__'
+        exclude = ['image_resolved_url', 'video_resolved_url', 'video_poster_resolved_url', 'ingest_error']
     
     def get_media_url(self, obj):
         """Return the appropriate media URL based on media type"""
         request = self.context.get('request')
         if obj.media_type == 'image' and obj.image:
-            url = _normalize_media_url(obj.image.url)
-            if request and not url.startswith('http'):
-                return request.build_absolute_uri(url)
-            return url
+            return _media_url(obj, 'image', request)
         elif obj.media_type == 'video' and obj.video:
-            url = _normalize_media_url(obj.video.url)
-            if request and not url.startswith('http'):
-                return request.build_absolute_uri(url)
-            return url
+            return _media_url(obj, 'video', request)
         return None
     
     def get_poster_url(self, obj):
         """Return poster image URL for videos"""
-        request = self.context.get('request')
         if obj.media_type == 'video' and obj.video_poster:
-            url = _normalize_media_url(obj.video_poster.url)
-            if request and not url.startswith('http'):
-                return request.build_absolute_uri(url)
-            return url
+            return _media_url(obj, 'video_poster', self.context.get('request'))
         return None
 
     def get_image(self, obj):
         if not obj.image:
             return None
-        request = self.context.get('request')
-        url = _normalize_media_url(obj.image.url)
-        if request and not url.startswith('http'):
-            return request.build_absolute_uri(url)
-        return url
-        return None
+        return _media_url(obj, 'image', self.context.get('request'))
+
+    def get_image_variants(self, obj):
+        return image_variants(obj, 'image', self.context.get('request'))
+
+    def get_poster_variants(self, obj):
+        if obj.media_type != 'video':
+            return None
+        return image_variants(obj, 'video_poster', self.context.get('request'))
 
 
-class HomeStatsSerializer(serializers.ModelSerializer):
+class HomeStatsSerializer(TimedModelSerializer):
     class Meta:
         model = HomeStats
         fields = '__all__'
 
 
-class AdmissionSerializer(serializers.ModelSerializer):
+class AdmissionSerializer(SearchResultMixin, TimedModelSerializer):
     student_full_name = serializers.ReadOnlyField()
     parent_full_name = serializers.ReadOnlyField()
     
     class Meta:
         model = Admission
-        fields = '__all__'
+        exclude = ['idempotency_key', 'idempotency_fingerprint']
         read_only_fields = ['submitted_at', 'updated_at', 'reviewed_at', 'reviewed_by']
+
+
+class SearchDocumentSerializer(TimedModelSerializer):
+    """A typed /api/search/ hit pointing at the object's detail endpoint"""
+    type = serializers.CharField(source='doc_type')
+    id = serializers.IntegerField(source='object_id')
+    snippet = serializers.CharField(allow_null=True)
+    rank = serializers.FloatField(allow_null=True)
+    image = serializers.SerializerMethodField()
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SearchDocument
+        fields = ['type', 'id', 'title', 'snippet', 'rank', 'image', 'date', 'url']
+
+    def get_image(self, obj):
+        return absolute_media_url(obj.image_url, self.context.get('request')) or None
+
+    def get_url(self, obj):
+        route = TYPES_BY_NAME[obj.doc_type].route
+        return reverse(f'{route}-detail', kwargs={'pk': obj.object_id}, request=self.context.get('request'))
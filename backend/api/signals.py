@@ -0,0 +1,89 @@
+from django.apps import apps
+from django.db import connections
+from django.db.models.signals import post_migrate, post_save, post_delete, pre_delete, pre_save
+
+from . import analytics, similarity
+from .cache import VERSIONED_MODELS, bump_version
+from .media import generate_local_variants, is_image_field, refresh_resolved_urls, resolved_url_field
+from .search import forget_search_indexes, restore_search_triggers
+from .models import Admission, Blog
+from .search_index import TYPES_BY_MODEL, index_object, remove_object
+
+
+def store_resolved_media_urls(sender, instance, raw=False, **kwargs):
+    """Persist the public URL of each media field after the file is stored"""
+    if raw:
+        return
+    changed = refresh_resolved_urls(instance)
+    for field_name in sender.RESOLVED_MEDIA_FIELDS:
+        if resolved_url_field(field_name) in changed and is_image_field(sender, field_name):
+            # No-op unless the file lives on local storage
+            generate_local_variants(getattr(instance, field_name))
+
+
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object(instance)
+
+
+def delete_search_document(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+def queue_related_blogs(sender, instance, raw=False, **kwargs):
+    if not raw:
+        similarity.queue_saved(instance)
+
+
+def collect_related_referrers(sender, instance, **kwargs):
+    instance._related_referrers = similarity.referencing_posts(instance)
+
+
+def refresh_related_referrers(sender, instance, **kwargs):
+    similarity.queue_refresh(getattr(instance, '_related_referrers', ()))
+
+
+def remember_admission_stat(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        analytics.remember_previous(instance, update_fields)
+
+
+def update_admission_stats(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        analytics.record_saved(instance, update_fields)
+
+
+def remove_admission_stat(sender, instance, **kwargs):
+    analytics.record_deleted(instance)
+
+
+def invalidate_cached_content(sender, **kwargs):
+    """Bump the content version of the saved/deleted model"""
+    bump_version(sender)
+
+
+def restore_search_index(sender, using='default', **kwargs):
+    """Re-attach FTS5 triggers after migrations that rebuilt an indexed table"""
+    forget_search_indexes()
+    restore_search_triggers(sender.get_models(), connections[using])
+
+
+def connect_signals():
+    # Resolved URLs and search documents are written before the version bump
+    # so that no cached payload is built under the new version from stale data
+    for model in VERSIONED_MODELS:
+        if getattr(model, 'RESOLVED_MEDIA_FIELDS', None):
+            post_save.connect(store_resolved_media_urls, sender=model, dispatch_uid=f'media-urls-{model.__name__}')
+    for model in TYPES_BY_MODEL:
+        post_save.connect(update_search_document, sender=model, dispatch_uid=f'search-save-{model.__name__}')
+        post_delete.connect(delete_search_document, sender=model, dispatch_uid=f'search-delete-{model.__name__}')
+    post_save.connect(queue_related_blogs, sender=Blog, dispatch_uid='related-blogs-save')
+    pre_delete.connect(collect_related_referrers, sender=Blog, dispatch_uid='related-blogs-pre-delete')
+    post_delete.connect(refresh_related_referrers, sender=Blog, dispatch_uid='related-blogs-delete')
+    pre_save.connect(remember_admission_stat, sender=Admission, dispatch_uid='admission-stats-pre-save')
+    post_save.connect(update_admission_stats, sender=Admission, dispatch_uid='admission-stats-save')
+    post_delete.connect(remove_admission_stat, sender=Admission, dispatch_uid='admission-stats-delete')
+    for model in VERSIONED_MODELS:
+        post_save.connect(invalidate_cached_content, sender=model, dispatch_uid=f'version-save-{model.__name__}')
+        post_delete.connect(invalidate_cached_content, sender=model, dispatch_uid=f'version-delete-{model.__name__}')
+    post_migrate.connect(restore_search_index, sender=apps.get_app_config('api'), dispatch_uid='restore-search-index')
@@ -0,0 +1,333 @@
+"""
+Content similarity between blog posts, behind ``BlogViewSet.related``.
+
+Each post becomes a TF-IDF vector over hashed terms of its title, excerpt and
+content (title words count three times, excerpt words twice, with sublinear
+term frequency). The sparse vectors are reduced to ``DIMENSIONS`` dense
+dimensions with a fixed random ±1 projection, which preserves cosine
+similarity closely enough for ranking, and normalized; neighbours are then
+found with blocked matrix products. The top ``TOP_K`` neighbours of every
+post are stored as ``RelatedBlog`` rows, so the API reads them with one
+indexed query.
+
+``manage.py rebuild_related_blogs`` computes everything from scratch and
+freezes the IDF weights in ``SimilarityIndex``. Between rebuilds, saving or
+deleting a post (signals.py) only queues a ``RelatedBlogUpdate`` row; the
+``manage.py update_related_blogs`` worker (see start.sh) takes the queue in
+batches, re-projects the saved posts with the frozen weights and recomputes
+only the neighbour lists they can affect, using the stored ``BlogVector``
+rows: each carries the score a post must beat to enter its list, so finding
+those lists needs no pass over ``RelatedBlog``. The stored vectors are read
+once per batch, not once per save.
+
+NumPy is optional: without it nothing is indexed and ``related`` falls back
+to the newest posts.
+"""
+import functools
+import logging
+import math
+import string
+import time
+import zlib
+from array import array
+
+from django.db import transaction
+
+from .cache import bump_version
+from .models import Blog, BlogVector, RelatedBlog, RelatedBlogUpdate, SimilarityIndex
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'blog'
+HASH_DIM = 2 ** 14
+DIMENSIONS = 256
+TOP_K = 3
+PROJECTION_SEED = 20240601
+FIELD_WEIGHTS = (('title', 3.0), ('excerpt', 2.0), ('content', 1.0))
+# Rows of the similarity matrix computed per matrix product
+BLOCK_ROWS = 1024
+# Posts projected per matrix product; bounds the dense (rows x HASH_DIM) buffer
+PROJECT_ROWS = 512
+# Queued updates applied per pass of the worker
+UPDATE_BATCH = 256
+
+# Punctuation becomes whitespace, so str.split() tokenizes
+PUNCTUATION = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have he her his i in is it its of on or our she so
+    that the their them they this to was we were what when which who will with you your
+""".split())
+
+
+def available():
+    return np is not None
+
+
+def token_bucket(token):
+    """Stable hash bucket of ``token`` (the same in every process); -1 drops it"""
+    if len(token) < 2 or token in STOP_WORDS:
+        return -1
+    return zlib.crc32(token.encode('utf-8')) & (HASH_DIM - 1)
+
+
+def term_frequencies(posts):
+    """CSR arrays (indptr, columns, values) of sublinear weighted term frequencies
+
+    ``posts`` yields (title, excerpt, content). Tokens are mapped to integer
+    ids in one pass; hashing, weighting and counting then run as array
+    operations over the whole corpus.
+    """
+    vocabulary = {}
+    documents, terms, weights = array('i'), array('i'), array('f')
+    count = 0
+    for count, fields in enumerate(posts, start=1):
+        for text, (_, weight) in zip(fields, FIELD_WEIGHTS):
+            tokens = (text or '').lower().translate(PUNCTUATION).split()
+            for token in set(tokens).difference(vocabulary):
+                vocabulary[token] = len(vocabulary)
+            terms.extend(map(vocabulary.__getitem__, tokens))
+            documents.extend(array('i', [count - 1]) * len(tokens))
+            weights.extend(array('f', [weight]) * len(tokens))
+
+    buckets = np.fromiter((token_bucket(token) for token in vocabulary), dtype=np.int64, count=len(vocabulary))
+    buckets = buckets[np.frombuffer(terms, dtype=np.int32)] if terms else np.zeros(0, dtype=np.int64)
+    kept = buckets >= 0
+    keys = np.frombuffer(documents, dtype=np.int32)[kept].astype(np.int64) * HASH_DIM + buckets[kept]
+    keys, inverse = np.unique(keys, return_inverse=True)
+    frequency = np.bincount(inverse, weights=np.frombuffer(weights, dtype=np.float32)[kept], minlength=len(keys))
+
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(keys // HASH_DIM, minlength=count))
+    return indptr, keys % HASH_DIM, (1 + np.log(frequency)).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=1)
+def projection():
+    rng = np.random.default_rng(PROJECTION_SEED)
+    signs = rng.integers(0, 2, size=(HASH_DIM, DIMENSIONS), dtype=np.int8) * 2 - 1
+    return signs.astype(np.float32) / np.float32(math.sqrt(DIMENSIONS))
+
+
+def inverse_document_frequency(columns, documents):
+    frequency = np.bincount(columns, minlength=HASH_DIM)
+    return (np.log((1 + documents) / (1 + frequency)) + 1).astype(np.float32)
+
+
+def project(indptr, columns, values, idf):
+    """Unit-length dense vectors of the TF-IDF rows"""
+    matrix = projection()
+    count = len(indptr) - 1
+    vectors = np.zeros((count, DIMENSIONS), dtype=np.float32)
+    weights = values * idf[columns]
+    lengths = np.diff(indptr)
+    # Scatter a block of rows into a dense buffer and project it with one matrix product
+    dense = np.zeros((min(count, PROJECT_ROWS), HASH_DIM), dtype=np.float32)
+    for start in range(0, count, PROJECT_ROWS):
+        stop = min(count, start + PROJECT_ROWS)
+        rows = np.repeat(np.arange(stop - start), lengths[start:stop])
+        block_columns = columns[indptr[start]:indptr[stop]]
+        dense[rows, block_columns] = weights[indptr[start]:indptr[stop]]
+        vectors[start:stop] = dense[:stop - start] @ matrix
+        dense[rows, block_columns] = 0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def nearest(vectors, rows, k=TOP_K):
+    """Yield (row, neighbour rows, scores) for ``rows``, best first, positive scores only"""
+    count = len(vectors)
+    k = min(k, count - 1)
+    if k <= 0:
+        for row in rows:
+            yield row, [], []
+        return
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block = np.asarray(rows[start:start + BLOCK_ROWS])
+        scores = vectors[block] @ vectors.T
+        scores[np.arange(len(block)), block] = -np.inf
+        candidates = np.argpartition(scores, count - k, axis=1)[:, count - k:]
+        for offset, row in enumerate(block):
+            best = candidates[offset][np.argsort(-scores[offset, candidates[offset]])]
+            best = [column for column in best if scores[offset, column] > 0]
+            yield int(row), best, [float(scores[offset, column]) for column in best]
+
+
+def related_rows(ids, vectors, rows):
+    return [
+        RelatedBlog(blog_id=ids[row], related_id=ids[column], rank=rank, score=score)
+        for row, neighbours, scores in nearest(vectors, rows)
+        for rank, (column, score) in enumerate(zip(neighbours, scores))
+    ]
+
+
+def weakest_scores(pks, related):
+    """{pk: score to beat} for the lists of ``pks`` made of the RelatedBlog rows ``related``"""
+    weakest = dict.fromkeys(pks, 0.0)
+    for entry in related:
+        if entry.rank == TOP_K - 1:
+            weakest[entry.blog_id] = entry.score
+    return weakest
+
+
+def compute(posts):
+    """(ids, idf, vectors) for an iterable of (pk, title, excerpt, content)"""
+    ids = []
+
+    def fields():
+        for pk, *texts in posts:
+            ids.append(pk)
+            yield texts
+
+    indptr, columns, values = term_frequencies(fields())
+    idf = inverse_document_frequency(columns, len(ids))
+    return ids, idf, project(indptr, columns, values, idf)
+
+
+def rebuild(batch_size=1000):
+    """Recompute vectors and neighbours of every post; returns the number of posts"""
+    if not available():
+        return 0
+    # Updates queued before the posts are read are covered by the rebuild
+    queued = RelatedBlogUpdate.objects.order_by('-pk').values_list('pk', flat=True).first()
+    posts = Blog.objects.order_by('pk').values_list('pk', 'title', 'excerpt', 'content').iterator(chunk_size=batch_size)
+    ids, idf, vectors = compute(posts)
+    related = related_rows(ids, vectors, list(range(len(ids))))
+    weakest = weakest_scores(ids, related)
+    with transaction.atomic():
+        SimilarityIndex.objects.update_or_create(
+            name=INDEX_NAME, defaults={'documents': len(ids), 'idf': idf.tobytes()},
+        )
+        BlogVector.objects.all().delete()
+        BlogVector.objects.bulk_create(
+            [
+                BlogVector(blog_id=pk, vector=vector.tobytes(), weakest_score=weakest[pk])
+                for pk, vector in zip(ids, vectors)
+            ],
+            batch_size=batch_size,
+        )
+        RelatedBlog.objects.all().delete()
+        RelatedBlog.objects.bulk_create(related, batch_size=batch_size)
+        if queued is not None:
+            RelatedBlogUpdate.objects.filter(pk__lte=queued).delete()
+    return len(ids)
+
+
+def load_vectors():
+    """(ids, vectors, weakest scores) of every indexed post"""
+    ids, vectors, weakest = [], [], []
+    rows = BlogVector.objects.order_by('pk').values_list('pk', 'vector', 'weakest_score').iterator(chunk_size=2000)
+    for pk, vector, score in rows:
+        ids.append(pk)
+        vectors.append(np.frombuffer(vector, dtype=np.float32))
+        weakest.append(score)
+    if not vectors:
+        return ids, np.zeros((0, DIMENSIONS), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    return ids, np.vstack(vectors), np.array(weakest, dtype=np.float32)
+
+
+def replace_related(ids, vectors, rows):
+    pks = [ids[row] for row in rows]
+    related = related_rows(ids, vectors, rows)
+    RelatedBlog.objects.filter(blog_id__in=pks).delete()
+    RelatedBlog.objects.bulk_create(related)
+    BlogVector.objects.bulk_update(
+        [BlogVector(blog_id=pk, weakest_score=score) for pk, score in weakest_scores(pks, related).items()],
+        ['weakest_score'],
+    )
+
+
+def queue_saved(blog):
+    if available():
+        RelatedBlogUpdate.objects.create(blog=blog, reproject=True)
+
+
+def referencing_posts(blog):
+    """Posts listing ``blog`` as related; collect before it is deleted"""
+    return list(RelatedBlog.objects.filter(related=blog).values_list('blog', flat=True))
+
+
+def queue_refresh(pks):
+    """Queue the neighbour lists of ``pks`` (e.g. after a neighbour was deleted)"""
+    if available() and pks:
+        RelatedBlogUpdate.objects.bulk_create([RelatedBlogUpdate(blog_id=pk) for pk in pks])
+
+
+def store_vectors(pks, idf):
+    """Re-project the posts ``pks`` with the frozen ``idf``"""
+    posts = list(Blog.objects.filter(pk__in=pks).order_by('pk').values_list('pk', 'title', 'excerpt', 'content'))
+    if not posts:
+        return
+    indptr, columns, values = term_frequencies(texts for _, *texts in posts)
+    vectors = [
+        BlogVector(blog_id=pk, vector=vector.tobytes())
+        for (pk, *_), vector in zip(posts, project(indptr, columns, values, idf))
+    ]
+    existing = set(BlogVector.objects.filter(blog_id__in=[pk for pk, *_ in posts]).values_list('pk', flat=True))
+    BlogVector.objects.bulk_update([vector for vector in vectors if vector.blog_id in existing], ['vector'])
+    BlogVector.objects.bulk_create([vector for vector in vectors if vector.blog_id not in existing])
+
+
+def apply_updates(saved, refreshed, idf):
+    """Re-index the posts ``saved`` and refresh every neighbour list they, and ``refreshed``, can change"""
+    store_vectors(saved, idf)
+    ids, vectors, weakest = load_vectors()
+    position = {pk: row for row, pk in enumerate(ids)}
+    rows = [position[pk] for pk in saved if pk in position]
+    affected = {position[pk] for pk in refreshed if pk in position}
+    affected.update(rows)
+    # Lists whose weakest entry a saved post now beats, and the lists that contain
+    # a saved post (its score changed)
+    for start in range(0, len(rows), BLOCK_ROWS):
+        entered = (vectors[rows[start:start + BLOCK_ROWS]] @ vectors.T > weakest).any(axis=0)
+        affected.update(np.flatnonzero(entered).tolist())
+    listed = RelatedBlog.objects.filter(related__in=saved).order_by().values_list('blog', flat=True)
+    affected.update(position[pk] for pk in listed if pk in position)
+    if affected:
+        replace_related(ids, vectors, sorted(affected))
+
+
+def process_updates(limit=UPDATE_BATCH):
+    """Apply up to ``limit`` queued updates; returns the number taken off the queue"""
+    pending = list(RelatedBlogUpdate.objects.order_by('pk').values_list('pk', 'blog_id', 'reproject')[:limit])
+    if not pending:
+        return 0
+    with transaction.atomic():
+        index = SimilarityIndex.objects.filter(name=INDEX_NAME).first()
+        # Never built: rebuild_related_blogs indexes every post
+        if available() and index is not None:
+            apply_updates(
+                {pk for _, pk, reproject in pending if reproject},
+                {pk for _, pk, _ in pending},
+                np.frombuffer(index.idf, dtype=np.float32),
+            )
+            # Cached "related" responses are keyed by the Blog version
+            bump_version(Blog)
+        RelatedBlogUpdate.objects.filter(pk__in=[pk for pk, _, _ in pending]).delete()
+    return len(pending)
+
+
+def run_updater(once=False, interval=5, batch_size=UPDATE_BATCH):
+    """Apply queued updates until interrupted (or until the queue is empty with ``once``)
+
+    Returns the number of updates applied.
+    """
+    total = 0
+    while True:
+        try:
+            processed = process_updates(batch_size)
+        except Exception:
+            logger.exception('Updating related posts failed')
+            if once:
+                raise
+            processed = 0
+        total += processed
+        if processed < batch_size:
+            if once:
+                return total
+            time.sleep(interval)
@@ -0,0 +1,90 @@
+from datetime import date
+
+from django.test import TestCase
+
+from api import analytics
+from api.admin import set_admission_status
+from api.models import Admission, AdmissionStat
+
+
+def make_admission(index, **fields):
+    return Admission(**{
+        'student_first_name': f'Student{index}', 'student_last_name': 'Rao',
+        'student_date_of_birth': date(2022, 1 + index % 12, 1), 'student_gender': ('male', 'female', 'other')[index % 3],
+        'parent_first_name': 'Meera', 'parent_last_name': 'Rao', 'parent_email': f'parent{index}@example.com',
+        'parent_phone': '0', 'emergency_contact_name': 'Ravi', 'emergency_contact_phone': '0',
+        'emergency_contact_relationship': 'Grandparent', 'address': '-', 'city': 'Pune', 'state': '-',
+        'zip_code': '0', 'preferred_program': ('toddler', 'preschool', 'pre_k')[index % 3],
+        'preferred_start_date': date(2026, 6, 1), **fields,
+    })
+
+
+class AdmissionStatBookkeepingTests(TestCase):
+    """The incrementally maintained summary always equals ``recompute()`` over the Admission rows"""
+
+    def counts(self):
+        return {
+            tuple(getattr(stat, field) for field in analytics.KEY_FIELDS): stat.count
+            for stat in AdmissionStat.objects.filter(count__gt=0)
+        }
+
+    def assertMatchesRecompute(self):
+        incremental = self.counts()
+        analytics.recompute()
+        self.assertEqual(incremental, self.counts())
+
+    def create(self, count, **fields):
+        admissions = [make_admission(index, **fields) for index in range(count)]
+        for admission in admissions:
+            admission.save()
+        return admissions
+
+    def test_created_admissions_are_counted(self):
+        self.create(7)
+        self.assertEqual(sum(self.counts().values()), 7)
+        self.assertMatchesRecompute()
+
+    def test_save_moves_the_count_between_keys(self):
+        first, second, third = self.create(3)
+        first.status = 'approved'
+        first.save()
+        second.preferred_start_date = date(2027, 1, 1)
+        second.save(update_fields=['preferred_start_date'])
+        third.notes = 'Called back'
+        third.save(update_fields=['notes'])
+        self.assertMatchesRecompute()
+
+    def test_update_fields_without_the_changed_field_keep_the_count(self):
+        admission, = self.create(1)
+        admission.status = 'approved'
+        # Only notes is written: the stored status is still pending
+        admission.notes = 'Not saved with the status'
+        admission.save(update_fields=['notes'])
+        self.assertMatchesRecompute()
+
+    def test_deleted_admissions_are_uncounted(self):
+        admissions = self.create(4)
+        admissions[0].delete()
+        Admission.objects.get(pk=admissions[1].pk).delete()
+        self.assertMatchesRecompute()
+
+    def test_bulk_created_admissions_are_recorded(self):
+        self.create(2)
+        created = Admission.objects.bulk_create([make_admission(index) for index in range(10)])
+        analytics.record_created(created)
+        self.assertMatchesRecompute()
+
+    def test_bulk_status_change_is_recorded(self):
+        self.create(9)
+        set_admission_status(Admission.objects.filter(preferred_program='pre_k'), 'waitlisted', 'staff')
+        set_admission_status(Admission.objects.all(), 'waitlisted', 'staff')
+        self.assertMatchesRecompute()
+
+    def test_apply_many_updates_existing_and_creates_missing_rows(self):
+        self.create(3)
+        existing = next(iter(self.counts()))
+        missing = (existing[0], 'rejected', *existing[2:])
+        analytics.apply_many({existing: 2, missing: 5})
+        counts = self.counts()
+        self.assertEqual(counts[missing], 5)
+        self.assertEqual(counts[existing], 1 + 2)
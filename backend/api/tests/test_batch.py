@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.models import Admission
+
+from .test_ingest import ADMISSION
+
+
+class AdmissionBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user('batch-import', is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def post(self, rows):
+        return self.client.post('/api/admissions/batch/', rows, format='json')
+
+    def test_empty_list_creates_nothing_without_an_error(self):
+        response = self.post([])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'created': 0, 'failed': 0, 'ids': [], 'errors': []})
+
+    def test_valid_rows_are_created_next_to_failed_ones(self):
+        response = self.post([ADMISSION, {**ADMISSION, 'parent_email': 'not-an-email'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['ids'][0], Admission.objects.get().pk)
+        self.assertIsNone(response.data['ids'][1])
+        self.assertEqual([error['row'] for error in response.data['errors']], [1])
+
+    def test_every_row_failing_is_a_bad_request(self):
+        response = self.post([{**ADMISSION, 'parent_email': 'not-an-email'}, {}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['failed'], 2)
+        self.assertFalse(Admission.objects.exists())
@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase
+
+from api.bundles import BundlePart, get_bundle
+from api.cache import CacheStats, bump_version, get_versions, response_cache
+from api.models import FAQ, Branch, ContentVersion
+
+
+class ContentVersionTests(TestCase):
+    def test_bump_creates_then_increments_the_version(self):
+        self.assertEqual(get_versions([FAQ])['api.faq'][0], 0)
+        bump_version(FAQ)
+        bump_version(FAQ)
+        self.assertEqual(ContentVersion.objects.get(label='api.faq').version, 2)
+
+    def test_saves_and_deletes_bump_the_version(self):
+        faq = FAQ.objects.create(question='Is lunch provided?', answer='Yes.')
+        after_create = get_versions([FAQ])['api.faq'][0]
+        faq.delete()
+        self.assertGreater(get_versions([FAQ])['api.faq'][0], after_create)
+
+
+class CachedResponseTests(TestCase):
+    """Cached and 304 responses of the read-only viewsets follow the content versions"""
+
+    def setUp(self):
+        cache.clear()
+        response_cache.clear()
+        self.faq = FAQ.objects.create(question='Is lunch provided?', answer='Yes.')
+
+    def test_list_is_served_from_the_cache_until_the_model_changes(self):
+        self.assertEqual(self.client.get('/api/faqs/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/faqs/')['X-Cache'], 'HIT')
+
+        FAQ.objects.create(question='What are the hours?', answer='9 to 1.')
+        response = self.client.get('/api/faqs/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('What are the hours?', response.content.decode())
+
+    def test_detail_is_invalidated_by_an_update_and_a_delete(self):
+        path = f'/api/faqs/{self.faq.pk}/'
+        self.client.get(path)
+        self.faq.answer = 'Yes, vegetarian.'
+        self.faq.save()
+        response = self.client.get(path)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['answer'], 'Yes, vegetarian.')
+
+        self.faq.delete()
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_other_models_do_not_invalidate(self):
+        self.client.get('/api/faqs/')
+        Branch.objects.create(name='Kothrud', address='1 Main Road', phone='1')
+        self.assertEqual(self.client.get('/api/faqs/')['X-Cache'], 'HIT')
+
+    def test_etag_answers_304_until_the_model_changes(self):
+        first = self.client.get('/api/faqs/')
+        etag = first['ETag']
+        not_modified = self.client.get('/api/faqs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+        self.faq.answer = 'Yes, vegetarian.'
+        self.faq.save()
+        changed = self.client.get('/api/faqs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertIn('Yes, vegetarian.', changed.content.decode())
+
+
+class BundleTimeoutTests(TestCase):
+    def test_bundle_expires_with_its_shortest_lived_part(self):
+        # Upcoming events are cached for a minute, however long the bundle would be
+        self.assertEqual(get_bundle('home').cache_timeout, 60)
+
+    def test_parts_without_their_own_timeout_use_the_cache_default(self):
+        self.assertEqual(BundlePart('api.views.FAQViewSet').timeout, response_cache.timeout)
+        self.assertEqual(get_bundle('about').cache_timeout, min(get_bundle('about').timeout, response_cache.timeout))
+
+
+class SharedCacheStatsTests(SimpleTestCase):
+    def setUp(self):
+        self.shared = LocMemCache('cache-stats-tests', {})
+        self.addCleanup(self.shared.clear)
+
+    def test_workers_flushing_new_scopes_together_keep_every_scope(self):
+        workers = [CacheStats(self.shared), CacheStats(self.shared)]
+        for index, stats in enumerate(workers):
+            stats.record(f'BlogViewSet.list{index}', 'misses')
+            stats.record('FAQViewSet.list', 'local_hits')
+        for stats in workers:
+            stats.flush()
+        self.assertEqual(
+            workers[0].shared_snapshot(),
+            {
+                'BlogViewSet.list0': {'local_hits': 0, 'shared_hits': 0, 'misses': 1, 'hit_ratio': 0.0},
+                'BlogViewSet.list1': {'local_hits': 0, 'shared_hits': 0, 'misses': 1, 'hit_ratio': 0.0},
+                'FAQViewSet.list': {'local_hits': 2, 'shared_hits': 0, 'misses': 0, 'hit_ratio': 1.0},
+            },
+        )
+        self.assertEqual(self.shared.get('api:stats:scope-count'), 3)
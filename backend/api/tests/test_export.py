@@ -0,0 +1,87 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.export import CONTENT_TYPES, INQUIRY_COLUMNS
+from api.models import Branch, Inquiry
+
+EXPORT = '/api/inquiries/export/'
+SHEET = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+class InquiryExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user('export', is_staff=True)
+        branch = Branch.objects.create(name='North', address='1 Hill Road', phone='1')
+        for name, phone, message in [
+            ('=HYPERLINK("http://evil.example","x")', '+91 98123 45678', '@SUM(A1:A9)'),
+            ('Meera', '-2+3', '+cmd|calc'),
+            ('Ravi <& Sons>', '(020) 555', 'Line one\x0bline two'),
+        ]:
+            Inquiry.objects.create(parent_name=name, phone=phone, child_age=4, branch=branch, message=message)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def export(self, file_format):
+        response = self.client.get(EXPORT, {'export_format': file_format, 'ordering': 'created_at'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], CONTENT_TYPES[file_format])
+        return b''.join(response.streaming_content)
+
+    def test_csv_escapes_cells_a_spreadsheet_would_run_as_formulas(self):
+        content = self.export('csv').decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        reader = csv.DictReader(io.StringIO(content[1:]))
+        rows = list(reader)
+        self.assertEqual(reader.fieldnames, [title for title, _ in INQUIRY_COLUMNS])
+        self.assertEqual(
+            [(row['Parent name'], row['Phone'], row['Message']) for row in rows],
+            [
+                ('\'=HYPERLINK("http://evil.example","x")', '+91 98123 45678', "'@SUM(A1:A9)"),
+                # Numbers and phone numbers keep their sign
+                ('Meera', '-2+3', "'+cmd|calc"),
+                ('Ravi <& Sons>', '(020) 555', 'Line one\x0bline two'),
+            ],
+        )
+        self.assertEqual(rows[0]['Branch'], 'North')
+
+    def test_xlsx_is_a_valid_workbook(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export('xlsx')))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(set(archive.namelist()), {
+            '[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml', 'xl/_rels/workbook.xml.rels',
+            'xl/worksheets/sheet1.xml',
+        })
+        for name in archive.namelist():
+            ElementTree.fromstring(archive.read(name))
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        rows = [
+            [cell.findtext(f'{SHEET}is/{SHEET}t', default=cell.findtext(f'{SHEET}v')) for cell in row]
+            for row in sheet.iter(f'{SHEET}row')
+        ]
+        self.assertEqual(rows[0], [title for title, _ in INQUIRY_COLUMNS])
+        self.assertEqual(len(rows), 4)
+        by_name = {row[1]: row for row in rows[1:]}
+        # XML special characters survive, control characters XML forbids are dropped
+        self.assertIn('Line oneline two', by_name['Ravi <& Sons>'])
+        # Numbers are numeric cells
+        child_age = [title for title, _ in INQUIRY_COLUMNS].index('Child age')
+        self.assertEqual(sheet.findall(f'{SHEET}sheetData/{SHEET}row')[1][child_age].findtext(f'{SHEET}v'), '4')
+
+    def test_unknown_format_is_refused(self):
+        response = self.client.get(EXPORT, {'export_format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_staff_can_export_and_inquiries_are_not_listed(self):
+        self.assertEqual(self.client.get('/api/inquiries/').status_code, 405)
+        self.assertEqual(self.client.get(f'/api/inquiries/{Inquiry.objects.first().pk}/').status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(EXPORT).status_code, 403)
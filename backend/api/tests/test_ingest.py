@@ -0,0 +1,137 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api import ingest
+from api.models import Admission, Branch, Inquiry
+
+ADMISSION = {
+    'student_first_name': 'Asha',
+    'student_last_name': 'Rao',
+    'student_date_of_birth': '2022-03-14',
+    'student_gender': 'female',
+    'parent_first_name': 'Meera',
+    'parent_last_name': 'Rao',
+    'parent_email': 'meera@example.com',
+    'parent_phone': '+91 9812345678',
+    'emergency_contact_name': 'Ravi Rao',
+    'emergency_contact_phone': '+91 9712345678',
+    'emergency_contact_relationship': 'Grandparent',
+    'address': '12 MG Road',
+    'city': 'Pune',
+    'state': 'Maharashtra',
+    'zip_code': '411001',
+    'preferred_program': 'preschool',
+    'preferred_start_date': '2026-06-01',
+}
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def post(self, data, key):
+        return self.client.post('/api/admissions/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_returns_the_existing_row_without_its_data(self):
+        first = self.post(ADMISSION, 'order-1')
+        retry = self.post(ADMISSION, 'order-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertNotIn('parent_email', retry.data)
+        self.assertEqual(Admission.objects.count(), 1)
+
+    def test_empty_body_with_a_used_key_is_validated(self):
+        self.post(ADMISSION, 'order-1')
+        response = self.post({}, 'order-1')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(ADMISSION['parent_email'], response.content.decode())
+
+    def test_key_reused_with_a_different_body_is_refused(self):
+        self.post(ADMISSION, 'order-1')
+        response = self.post({**ADMISSION, 'student_first_name': 'Kavya'}, 'order-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Admission.objects.count(), 1)
+
+
+class QueuedIngestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for patch in (
+            mock.patch.object(ingest, 'INGEST_MODE', 'queue'),
+            mock.patch.object(ingest, 'shared_cache', lambda: True),
+            mock.patch.object(ingest, 'journal', ingest.Journal(self.directory)),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.branch = Branch.objects.create(name='Kothrud', address='1 Main Road', phone='1')
+        self.inquiry = {'parent_name': 'Meera', 'phone': '1', 'child_age': 3, 'branch': self.branch.pk, 'message': 'Hi'}
+
+    def post_inquiry(self, data, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post('/api/inquiries/', data, format='json', **headers)
+
+    def test_retries_of_a_queued_submission_are_journaled_once(self):
+        responses = [self.post_inquiry(self.inquiry, 'form-1') for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [202] * 3)
+        self.assertEqual(ingest.drain(directory=self.directory), 1)
+        self.assertEqual(Inquiry.objects.get().idempotency_key, 'form-1')
+
+    def test_queued_key_reused_with_a_different_body_is_refused(self):
+        self.post_inquiry(self.inquiry, 'form-1')
+        response = self.post_inquiry({**self.inquiry, 'message': 'Other'}, 'form-1')
+        self.assertEqual(response.status_code, 422)
+
+    def test_replayed_drain_skips_inserted_rows(self):
+        self.post_inquiry(self.inquiry, 'form-1')
+        self.post_inquiry(self.inquiry)
+        self.client.post('/api/admissions/', ADMISSION, format='json', HTTP_IDEMPOTENCY_KEY='order-1')
+        self.assertEqual(ingest.drain(directory=self.directory), 3)
+
+        # A crash after the insert committed but before the offsets were saved
+        state = ingest.load_state(self.directory)
+        state['offsets'] = {name: 0 for name in ingest.list_segments(self.directory)}
+        ingest.save_state(state, self.directory)
+        ingest.drain(directory=self.directory)
+
+        self.assertEqual(Inquiry.objects.count(), 2)
+        self.assertEqual(Admission.objects.count(), 1)
+        self.assertEqual(ingest.load_state(self.directory)['duplicates'], 3)
+
+    def test_duplicate_keys_within_one_batch_insert_one_row(self):
+        serializer = ingest.SERIALIZERS['api.inquiry'](data=self.inquiry)
+        serializer.is_valid(raise_exception=True)
+        for _ in range(2):
+            ingest.enqueue(serializer, 'form-1', ingest.submission_fingerprint(serializer))
+        ingest.drain(directory=self.directory)
+        self.assertEqual(Inquiry.objects.count(), 1)
+        self.assertEqual(ingest.load_state(self.directory)['duplicates'], 1)
+
+    def test_key_reused_behind_another_process_is_rejected_by_the_drainer(self):
+        # The cache of the process that took the first submission never saw the second
+        self.post_inquiry(self.inquiry, 'form-1')
+        cache.clear()
+        self.assertEqual(self.post_inquiry({**self.inquiry, 'message': 'Other'}, 'form-1').status_code, 202)
+        ingest.drain(directory=self.directory)
+
+        self.assertEqual(Inquiry.objects.get().message, 'Hi')
+        state = ingest.load_state(self.directory)
+        self.assertEqual((state['conflicts'], state['rejected'], state['duplicates']), (1, 1, 0))
+        with open(f'{self.directory}/{ingest.REJECTED_FILE}') as rejected:
+            self.assertIn(ingest.IDEMPOTENCY_HEADER, rejected.read())
+
+    def test_without_a_shared_cache_submissions_are_inserted_synchronously(self):
+        with mock.patch.object(ingest, 'shared_cache', lambda: False):
+            response = self.post_inquiry(self.inquiry, 'form-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Inquiry.objects.get().idempotency_key, 'form-1')
+        self.assertEqual(ingest.list_segments(self.directory), [])
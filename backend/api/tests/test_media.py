@@ -0,0 +1,50 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings as django_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from api import media
+from api.media import IMAGE_VARIANT_WIDTHS, image_variants, local_variant_name
+from api.models import Gallery
+
+
+def png(width=800, height=600):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'orange').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class LocalImageVariantTests(TestCase):
+    """Only the WebP variants written to local storage are offered"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            STORAGES={**django_settings.STORAGES, 'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'}},
+            MEDIA_ROOT=media_root,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Every test stores the same file names
+        self.addCleanup(media._local_variants.clear)
+
+    def gallery(self, content, name='photo.png'):
+        return Gallery.objects.create(title='Photo', type='image', image=SimpleUploadedFile(name, content))
+
+    def test_variants_written_on_save_are_offered(self):
+        gallery = self.gallery(png())
+        self.assertEqual(sorted(image_variants(gallery, 'image', None)), list(IMAGE_VARIANT_WIDTHS))
+
+    def test_missing_variant_files_are_not_offered(self):
+        gallery = self.gallery(png())
+        gallery.image.storage.delete(local_variant_name(gallery.image.name, IMAGE_VARIANT_WIDTHS[0]))
+        self.assertEqual(sorted(image_variants(gallery, 'image', None)), list(IMAGE_VARIANT_WIDTHS[1:]))
+
+    def test_an_image_pillow_cannot_read_has_no_variants(self):
+        gallery = self.gallery(b'not an image', name='broken.png')
+        self.assertIsNone(image_variants(gallery, 'image', None))
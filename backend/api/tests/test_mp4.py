@@ -0,0 +1,106 @@
+import io
+import struct
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+
+from api.mp4 import MP4Error, probe_mp4, probe_video
+
+
+def box(box_type, *children):
+    payload = b''.join(children)
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, version, body):
+    return box(box_type, bytes([version, 0, 0, 0]) + body)
+
+
+def time_header(box_type, version, timescale, duration):
+    """mvhd/mdhd: creation and modification times, then timescale and duration"""
+    if version == 1:
+        body = struct.pack('>QQIQ', 0, 0, timescale, duration)
+    else:
+        body = struct.pack('>IIII', 0, 0, timescale, duration)
+    return full_box(box_type, version, body + bytes(80 if box_type == b'mvhd' else 4))
+
+
+def track(handler, codec, width=0, height=0, timescale=1000, duration=0):
+    tkhd = full_box(b'tkhd', 0, bytes(72) + struct.pack('>II', width << 16, height << 16))
+    stsd = full_box(b'stsd', 0, struct.pack('>I', 1) + struct.pack('>I4s', 16, codec) + bytes(8))
+    return box(
+        b'trak', tkhd,
+        box(
+            b'mdia',
+            time_header(b'mdhd', 0, timescale, duration),
+            full_box(b'hdlr', 0, bytes(4) + handler + bytes(12)),
+            box(b'minf', box(b'stbl', stsd)),
+        ),
+    )
+
+
+def movie(mvhd_version=0, timescale=600, duration=3000):
+    return (
+        box(b'ftyp', b'isom', bytes(4), b'isommp41')
+        + box(b'mdat', bytes(64))
+        + box(
+            b'moov',
+            time_header(b'mvhd', mvhd_version, timescale, duration),
+            track(b'vide', b'avc1', 1280, 720, 600, 3000),
+            track(b'soun', b'mp4a', timescale=44100, duration=220500),
+        )
+    )
+
+
+class ProbeMP4Tests(SimpleTestCase):
+    def test_version_0_movie_header(self):
+        info = probe_mp4(io.BytesIO(movie(mvhd_version=0)))
+        self.assertEqual(info.duration, 5.0)
+        self.assertEqual((info.width, info.height), (1280, 720))
+        self.assertEqual((info.video_codec, info.audio_codec, info.brand), ('avc1', 'mp4a', 'isom'))
+
+    def test_version_1_movie_header(self):
+        # 64-bit duration: 2**32 units at 1MHz is longer than a 32-bit field holds
+        info = probe_mp4(io.BytesIO(movie(mvhd_version=1, timescale=1000000, duration=2 ** 32)))
+        self.assertAlmostEqual(info.duration, 2 ** 32 / 1000000)
+        self.assertEqual(info.video_codec, 'avc1')
+
+    def test_zero_movie_duration_falls_back_to_the_longest_track(self):
+        info = probe_mp4(io.BytesIO(movie(duration=0)))
+        self.assertEqual(info.duration, 5.0)
+
+    def test_truncated_moov_is_an_error(self):
+        data = movie()
+        with self.assertRaises(MP4Error):
+            probe_mp4(io.BytesIO(data[:-20]))
+
+    def test_truncated_large_size_header_is_an_error(self):
+        with self.assertRaises(MP4Error):
+            probe_mp4(io.BytesIO(box(b'ftyp', b'isom') + struct.pack('>I4s', 1, b'mdat') + bytes(4)))
+
+    def test_box_smaller_than_its_header_is_an_error(self):
+        with self.assertRaises(MP4Error):
+            probe_mp4(io.BytesIO(struct.pack('>I4s', 4, b'ftyp') + bytes(16)))
+
+    def test_missing_moov_is_an_error(self):
+        with self.assertRaisesMessage(MP4Error, 'No moov box found'):
+            probe_mp4(io.BytesIO(box(b'ftyp', b'isom') + box(b'mdat', bytes(64))))
+
+    def test_moov_without_mvhd_is_an_error(self):
+        with self.assertRaisesMessage(MP4Error, 'No mvhd box found'):
+            probe_mp4(io.BytesIO(box(b'ftyp', b'isom') + box(b'moov', box(b'udta'))))
+
+
+class ProbeVideoTests(SimpleTestCase):
+    def test_read_position_is_restored(self):
+        upload = SimpleUploadedFile('clip.mp4', movie(), content_type='video/mp4')
+        upload.seek(10)
+        self.assertEqual(probe_video(upload).duration, 5.0)
+        self.assertEqual(upload.tell(), 10)
+
+    def test_read_position_is_restored_after_an_error(self):
+        stream = io.BytesIO(box(b'ftyp', b'isom'))
+        stream.seek(3)
+        with self.assertRaises(MP4Error):
+            probe_video(stream)
+        self.assertEqual(stream.tell(), 3)
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import notifications
+from api.models import Admission, Branch, Inquiry, NotificationDigest
+from api.notifications import LEASE, MAX_ATTEMPTS, RETRY_BASE, SETTLE, collect, send_due
+
+from .test_ingest import ADMISSION
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class FailingBackend(EmailBackend):
+    """A mail server that accepts the connection and refuses every message"""
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP server unavailable')
+
+
+@override_settings(EMAIL_BACKEND=LOCMEM)
+class StaffNotificationTests(TestCase):
+    def setUp(self):
+        recipients = mock.patch.object(notifications, 'RECIPIENTS', ['office@example.com'])
+        recipients.start()
+        self.addCleanup(recipients.stop)
+        self.north = Branch.objects.create(name='North', address='1 Hill Road', phone='1', notification_emails='north@example.com')
+        self.south = Branch.objects.create(name='South', address='2 Sea Road', phone='2')
+
+    def admission(self, age, **fields):
+        admission = Admission.objects.create(**{**ADMISSION, **fields})
+        Admission.objects.filter(pk=admission.pk).update(submitted_at=timezone.now() - age)
+        return admission
+
+    def inquiry(self, branch, age, name='Meera'):
+        inquiry = Inquiry.objects.create(parent_name=name, phone='98123', child_age=3, branch=branch, message='Hello')
+        Inquiry.objects.filter(pk=inquiry.pk).update(created_at=timezone.now() - age)
+        return inquiry
+
+    def test_rows_younger_than_the_settle_window_wait_for_the_next_round(self):
+        settled = self.admission(SETTLE + timedelta(seconds=5))
+        fresh = self.admission(SETTLE - timedelta(seconds=5), student_first_name='Kavya')
+        [digest] = collect()
+        self.assertEqual(digest.object_ids, [settled.pk])
+        [digest] = collect(now=timezone.now() + SETTLE)
+        self.assertEqual(digest.object_ids, [fresh.pk])
+
+    def test_watermark_covers_each_row_once(self):
+        first = self.admission(timedelta(minutes=1))
+        [digest] = collect()
+        self.assertEqual((digest.object_ids, digest.last_object_id), ([first.pk], first.pk))
+        self.assertEqual(collect(), [])
+        second = self.admission(timedelta(minutes=1), student_first_name='Kavya')
+        [digest] = collect()
+        self.assertEqual(digest.object_ids, [second.pk])
+        self.assertIn('Kavya', digest.body)
+        self.assertNotIn('Asha', digest.body)
+
+    def test_first_run_only_announces_the_last_interval(self):
+        self.admission(notifications.INTERVAL + timedelta(minutes=5))
+        recent = self.admission(timedelta(minutes=1))
+        [digest] = collect()
+        self.assertEqual(digest.object_ids, [recent.pk])
+
+    def test_inquiries_are_grouped_per_branch(self):
+        north = [self.inquiry(self.north, timedelta(minutes=1), name) for name in ('Meera', 'Ravi')]
+        south = self.inquiry(self.south, timedelta(minutes=1), 'Anil')
+        digests = {digest.branch: digest for digest in collect()}
+        self.assertEqual(set(digests), {self.north, self.south})
+        self.assertEqual(digests[self.north].object_ids, [inquiry.pk for inquiry in north])
+        self.assertEqual(digests[self.north].subject, '2 new inquiries for North')
+        self.assertEqual(digests[self.north].recipients, ['office@example.com', 'north@example.com'])
+        self.assertEqual(digests[self.south].recipients, ['office@example.com'])
+        # Both carry the round's watermark, so neither branch is collected again
+        self.assertEqual({digest.last_object_id for digest in digests.values()}, {south.pk})
+        self.assertEqual(collect(), [])
+
+        self.assertEqual(send_due(LOCMEM), 2)
+        self.assertEqual(sorted(message.subject for message in mail.outbox), [
+            '1 new inquiry for South', '2 new inquiries for North',
+        ])
+
+    def test_failed_send_backs_off_and_is_retried(self):
+        self.admission(timedelta(minutes=1))
+        [digest] = collect()
+        with self.assertLogs('api.notifications', 'WARNING'):
+            self.assertEqual(send_due(f'{__name__}.FailingBackend'), 0)
+        digest.refresh_from_db()
+        self.assertEqual((digest.status, digest.attempts), ('pending', 1))
+        self.assertIn('SMTP server unavailable', digest.last_error)
+        self.assertAlmostEqual(
+            (digest.next_attempt_at - timezone.now()).total_seconds(), RETRY_BASE.total_seconds(), delta=5,
+        )
+        # Not due yet
+        self.assertEqual(send_due(LOCMEM), 0)
+        self.assertEqual(mail.outbox, [])
+
+        NotificationDigest.objects.filter(pk=digest.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_due(LOCMEM), 1)
+        digest.refresh_from_db()
+        self.assertEqual((digest.status, digest.attempts, digest.last_error), ('sent', 2, ''))
+        self.assertEqual(mail.outbox[0].to, ['office@example.com'])
+
+    def test_backoff_doubles_and_gives_up_after_the_last_attempt(self):
+        self.assertEqual(notifications.retry_delay(3), RETRY_BASE * 4)
+        self.admission(timedelta(minutes=1))
+        [digest] = collect()
+        NotificationDigest.objects.filter(pk=digest.pk).update(attempts=MAX_ATTEMPTS - 1)
+        with self.assertLogs('api.notifications', 'ERROR'):
+            send_due(f'{__name__}.FailingBackend')
+        digest.refresh_from_db()
+        self.assertEqual((digest.status, digest.attempts), ('failed', MAX_ATTEMPTS))
+
+    def test_a_claimed_digest_is_leased_to_its_sender(self):
+        self.admission(timedelta(minutes=1))
+        [digest] = collect()
+        now = timezone.now()
+        self.assertEqual([claimed.pk for claimed in notifications.claim_due(now, 10)], [digest.pk])
+        # A second sender finds nothing while the lease runs, and the digest once it lapses
+        self.assertEqual(notifications.claim_due(now, 10), [])
+        self.assertEqual([claimed.pk for claimed in notifications.claim_due(now + LEASE, 10)], [digest.pk])
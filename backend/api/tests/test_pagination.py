@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import pagination
+from api.cache import API_CACHE
+from api.models import Blog
+from api.pagination import encode_cursor
+
+BLOGS = '/api/blogs/'
+PAGE_SIZE = 20
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Blog.objects.bulk_create([
+            Blog(title=f'Post {index}', slug=f'keyset-{index}', excerpt='Excerpt', content='Content', image='blog/keyset.jpg')
+            for index in range(PAGE_SIZE + 5)
+        ])
+        # Most posts share one timestamp, so only the id orders them
+        cls.tied = timezone.now()
+        ids = list(Blog.objects.order_by('pk').values_list('pk', flat=True))
+        Blog.objects.filter(pk__in=ids[2:]).update(created_at=cls.tied)
+        Blog.objects.filter(pk__in=ids[:2]).update(created_at=cls.tied - timezone.timedelta(days=1))
+        cls.expected = list(Blog.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        enabled = API_CACHE['ENABLED']
+        # Cached responses would answer repeated URLs without paginating
+        API_CACHE['ENABLED'] = False
+        self.addCleanup(API_CACHE.__setitem__, 'ENABLED', enabled)
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_pages_split_inside_a_tie_without_skipping_or_repeating_rows(self):
+        first = self.get(BLOGS, cursor='')
+        second = self.get(first['next'])
+        self.assertEqual([row['id'] for row in first['results'] + second['results']], self.expected)
+        self.assertIsNone(second['next'])
+        # The previous link of the second page leads back to exactly the first
+        back = self.get(second['previous'])
+        self.assertEqual([row['id'] for row in back['results']], self.expected[:PAGE_SIZE])
+        self.assertIsNone(back['previous'])
+
+    def test_cursor_inside_a_tie_continues_after_its_row(self):
+        pk = self.expected[5]
+        page = self.get(BLOGS, cursor=encode_cursor(self.tied, pk))
+        self.assertEqual([row['id'] for row in page['results']], self.expected[6:])
+
+    def test_invalid_cursors_are_not_found(self):
+        for cursor in [
+            'not base64!',
+            encode_cursor('not-a-date', 1),
+            encode_cursor(self.tied, 'not-a-pk'),
+            'eyJ2YWx1ZSI6IDF9',  # {"value": 1}
+        ]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(BLOGS, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Invalid cursor.'})
+
+    def test_count_estimate_small_results_are_counted_exactly(self):
+        page = self.get(BLOGS, cursor='', count='estimate')
+        self.assertEqual((page['count'], page['count_estimated']), (PAGE_SIZE + 5, False))
+
+    def test_count_estimate_large_results_use_the_planner_estimate(self):
+        with mock.patch.object(pagination, 'estimated_count', return_value=250000) as estimate:
+            page = self.get(BLOGS, cursor='', count='estimate')
+        estimate.assert_called_once()
+        self.assertEqual((page['count'], page['count_estimated']), (250000, True))
+
+    def test_exact_count_and_unknown_count_modes(self):
+        self.assertEqual(self.get(BLOGS, cursor='', count='exact')['count'], PAGE_SIZE + 5)
+        response = self.client.get(BLOGS, {'cursor': '', 'count': 'roughly'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,57 @@
+import logging
+import shutil
+import tempfile
+
+from django.test import TransactionTestCase
+
+from api import sampledata
+from api.benchmark import admin_probes, measure_queries, probes, scratch_files, staff_user
+from api.cache import API_CACHE
+from api.querycheck import budget_problems
+
+SMALL, LARGE = 0.5, 10
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """Every route and admin changelist keeps its query count at two data sizes (api/querycheck.py)
+
+    Not a TestCase: its enclosing transaction would turn every atomic block
+    into extra SAVEPOINT queries.
+    """
+
+    def setUp(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        files = scratch_files(workdir)
+        files.__enter__()
+        self.addCleanup(files.__exit__, None, None, None)
+        enabled = API_CACHE['ENABLED']
+        # Cached responses would skip the queries under test
+        API_CACHE['ENABLED'] = False
+        self.addCleanup(API_CACHE.__setitem__, 'ENABLED', enabled)
+        # Staff-only routes are found by their 403 to an anonymous request
+        request_logger = logging.getLogger('django.request')
+        self.addCleanup(request_logger.setLevel, request_logger.level)
+        request_logger.setLevel(logging.ERROR)
+
+    def measure(self):
+        skipped = []
+        selected = [*probes(skipped), *admin_probes()]
+        self.assertEqual(skipped, [])
+        return measure_queries(selected, staff_user())
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        sampledata.seed(SMALL)
+        small = self.measure()
+        # Seeding again adds rows after the existing ones
+        sampledata.seed(LARGE - SMALL)
+        large = self.measure()
+
+        self.assertEqual(small.keys(), large.keys())
+        for (method, name), (status, log) in large.items():
+            with self.subTest(f'{method} {name}'):
+                small_log = small[(method, name)][1]
+                self.assertEqual(
+                    budget_problems(method, name, status, small_log, log), [],
+                    '\n'.join(f'{count}x {sql[:160]}' for sql, count in log.statements.most_common(3)),
+                )
@@ -0,0 +1,36 @@
+import random
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.cache import API_CACHE
+from api.queryplans import CHECKS, check_plans, seed, supported
+
+
+@skipUnless(supported(), 'EXPLAIN parsing is implemented for SQLite and PostgreSQL')
+class QueryPlanTests(TestCase):
+    """Every filtered/ordered list path uses an index (api/queryplans.py)"""
+    rows = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(random.Random(42), cls.rows, active_ratio=0.1)
+        cls.staff = get_user_model().objects.create_user('query-plan-check', is_staff=True)
+
+    def setUp(self):
+        enabled = API_CACHE['ENABLED']
+        # Cached responses would skip the queries under test
+        API_CACHE['ENABLED'] = False
+        self.addCleanup(API_CACHE.__setitem__, 'ENABLED', enabled)
+
+    def test_list_query_paths_use_indexes(self):
+        client = APIClient()
+        for check in CHECKS:
+            with self.subTest(check.label):
+                client.force_authenticate(self.staff if check.staff else None)
+                result = check_plans(client, check)
+                self.assertEqual(result.status, 200)
+                self.assertTrue(result.plans, 'no query on the checked table')
+                self.assertEqual(result.problems, [], '\n'.join(plan for sql, plan in result.plans))
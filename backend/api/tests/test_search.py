@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import NoReverseMatch, reverse
+
+from api.cache import response_cache
+from api.models import FAQ
+
+
+class SearchViewSetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        response_cache.clear()
+
+    def test_only_the_list_is_routed(self):
+        with self.assertRaises(NoReverseMatch):
+            reverse('search-detail', kwargs={'pk': 1})
+
+    def test_list_is_cached(self):
+        FAQ.objects.create(question='When does the playgroup start?', answer='In June.')
+        first = self.client.get('/api/search/', {'q': 'playgroup'})
+        second = self.client.get('/api/search/', {'q': 'playgroup'})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([first['X-Cache'], second['X-Cache']], ['MISS', 'HIT'])
+        self.assertEqual(first.json()['results'][0]['type'], 'faq')
@@ -0,0 +1,102 @@
+import random
+from unittest import mock, skipUnless
+
+from django.test import TestCase
+
+from api import similarity
+from api.models import Blog, BlogVector, RelatedBlog, RelatedBlogUpdate
+
+TOPICS = [
+    'music rhythm songs instruments singing',
+    'garden plants seeds watering flowers',
+    'numbers counting shapes puzzles blocks',
+    'painting colours brushes paper crafts',
+]
+
+
+def post(rng, index):
+    words = ' '.join(rng.sample(rng.choice(TOPICS).split(), 3) + rng.sample(' '.join(TOPICS).split(), 4))
+    return Blog(
+        title=f'Post {index} {words}', slug=f'similarity-{index}', excerpt=words, content=f'{words} {words}',
+        image='blog/seed.jpg',
+    )
+
+
+@skipUnless(similarity.available(), 'needs NumPy')
+class IncrementalUpdateTests(TestCase):
+    """Saving and deleting posts, then running the worker, leaves the neighbour lists a full recompute would"""
+
+    def setUp(self):
+        rng = random.Random(7)
+        Blog.objects.bulk_create([post(rng, index) for index in range(40)])
+        similarity.rebuild()
+        self.rng = rng
+
+    def lists(self):
+        return {
+            pk: list(RelatedBlog.objects.filter(blog_id=pk).order_by('rank').values_list('related_id', flat=True))
+            for pk in Blog.objects.values_list('pk', flat=True)
+        }
+
+    def assertMatchesRebuild(self):
+        """The stored lists are those of every post recomputed from the stored vectors"""
+        ids, vectors, weakest = similarity.load_vectors()
+        related = similarity.related_rows(ids, vectors, list(range(len(ids))))
+        expected = {pk: [] for pk in ids}
+        for entry in related:
+            expected[entry.blog_id].append(entry.related_id)
+        self.assertEqual(self.lists(), expected)
+        for pk, score in similarity.weakest_scores(ids, related).items():
+            self.assertAlmostEqual(weakest[ids.index(pk)], score, places=5)
+
+    def test_a_save_only_queues_the_update(self):
+        blog = post(self.rng, 100)
+        blog.save()
+        self.assertFalse(BlogVector.objects.filter(blog=blog).exists())
+        self.assertTrue(RelatedBlogUpdate.objects.filter(blog=blog, reproject=True).exists())
+        self.assertEqual(similarity.process_updates(), 1)
+        self.assertFalse(RelatedBlogUpdate.objects.exists())
+
+    def test_new_post(self):
+        post(self.rng, 100).save()
+        similarity.process_updates()
+        self.assertMatchesRebuild()
+
+    def test_posts_saved_together_are_applied_in_one_pass(self):
+        for index in range(100, 105):
+            post(self.rng, index).save()
+        Blog.objects.order_by('pk')[2].save()
+        with mock.patch.object(similarity, 'load_vectors', wraps=similarity.load_vectors) as load:
+            self.assertEqual(similarity.process_updates(), 6)
+        load.assert_called_once()
+        self.assertMatchesRebuild()
+
+    def test_edited_post(self):
+        blog = Blog.objects.order_by('pk')[5]
+        blog.title, blog.excerpt, blog.content = 'Garden', 'garden seeds', 'plants watering flowers garden'
+        blog.save()
+        similarity.process_updates()
+        self.assertMatchesRebuild()
+
+    def test_deleted_post(self):
+        Blog.objects.order_by('pk')[3].delete()
+        similarity.process_updates()
+        self.assertMatchesRebuild()
+
+    def test_a_rebuild_clears_the_queue(self):
+        post(self.rng, 100).save()
+        similarity.rebuild()
+        self.assertFalse(RelatedBlogUpdate.objects.exists())
+        self.assertMatchesRebuild()
+
+    def test_a_save_recomputes_only_the_lists_it_can_change(self):
+        blog = post(self.rng, 101)
+        blog.save()
+        similarity.process_updates()
+        blog.save()
+        with mock.patch.object(similarity, 'replace_related', wraps=similarity.replace_related) as replace:
+            similarity.process_updates()
+        ids, _, rows = replace.call_args.args
+        self.assertIn(ids.index(blog.pk), rows)
+        self.assertLess(len(rows), len(ids) // 4)
+        self.assertMatchesRebuild()
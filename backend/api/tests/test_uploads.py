@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from api import media, uploadhandlers
+from api.models import Gallery
+
+from .test_media import png
+
+GALLERY_ADD = '/admin/api/gallery/add/'
+
+
+class UploadLimitTests(TestCase):
+    """Uploads are checked by MediaLimitUploadHandler as they stream in, and refused by UploadLimitMiddleware"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('uploads', 'uploads@example.com', 'uploads')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            STORAGES={**django_settings.STORAGES, 'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'}},
+            MEDIA_ROOT=media_root,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(media._local_variants.clear)
+        self.client.force_login(self.admin)
+
+    def add_gallery(self, upload, field='image'):
+        data = {'title': 'Sports day', 'type': 'image', 'category': 'Activities', field: upload, '_save': 'Save'}
+        return self.client.post(GALLERY_ADD, data)
+
+    def test_image_is_accepted(self):
+        response = self.add_gallery(SimpleUploadedFile('sports.png', png(), content_type='image/png'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Gallery.objects.get().image.name.endswith('.png'))
+
+    def test_oversized_image_is_refused_with_413(self):
+        self.addCleanup(uploadhandlers.upload_rules.cache_clear)
+        uploadhandlers.upload_rules.cache_clear()
+        with mock.patch.object(uploadhandlers, 'IMAGE_UPLOAD_MAX_SIZE', 1024):
+            response = self.add_gallery(SimpleUploadedFile('sports.png', png(), content_type='image/png'))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()['field'], 'image')
+        self.assertIn('1.0\xa0KB limit', response.json()['detail'])
+        self.assertFalse(Gallery.objects.exists())
+
+    def test_file_that_is_not_an_image_is_refused_with_415(self):
+        # Named and labelled as an image, but the magic bytes say otherwise
+        upload = SimpleUploadedFile('sports.png', b'MZ\x90\x00' + bytes(64), content_type='image/png')
+        response = self.add_gallery(upload)
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(response.json(), {'detail': 'sports.png is not a valid image file.', 'field': 'image'})
+        self.assertFalse(Gallery.objects.exists())
+
+    def test_image_posted_as_a_video_is_refused_with_415(self):
+        response = self.add_gallery(SimpleUploadedFile('clip.mp4', png(), content_type='video/mp4'), field='video')
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(response.json()['field'], 'video')
+
+    def test_fields_without_a_rule_are_not_checked(self):
+        response = self.add_gallery(SimpleUploadedFile('notes.txt', b'plain text'), field='attachment')
+        self.assertNotIn(response.status_code, (413, 415))
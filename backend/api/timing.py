@@ -0,0 +1,174 @@
+"""
+Where the time of an API request goes, as Server-Timing headers and a log line.
+
+``ServerTimingMiddleware`` measures requests to /api/ from staff users and,
+when ``SERVER_TIMING['OPT_IN']`` is set, from anyone sending the
+``X-Server-Timing`` header (or ``?server_timing=1``). A measured request
+records, each excluding the phases nested inside it:
+
+* ``db``: SQL queries (count and time), through a connection execute wrapper;
+* ``serializer``: ``to_representation``/``to_internal_value`` of the
+  serializers built on ``TimedModelSerializer``;
+* ``storage``: media URL building (api/media.py);
+* ``render``: the DRF renderers (``TimedJSONRenderer``, ``TimedBrowsableAPIRenderer``);
+* ``app``: everything else between the middleware and the response.
+
+Phases are entered through the ``timed(name)`` decorator, which only looks
+up a context variable when the request isn't measured. With
+``SERVER_TIMING['ENABLED']`` off the middleware removes itself. The body of
+a streaming response is produced after the middleware returns and is not
+measured. ``manage.py benchmark_server_timing`` measures the overhead.
+"""
+import functools
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+OPT_IN_HEADER = 'HTTP_X_SERVER_TIMING'
+OPT_IN_PARAM = 'server_timing'
+PHASES = ('db', 'serializer', 'storage', 'render')
+
+_current = ContextVar('server_timing', default=None)
+
+
+def timing_settings():
+    return {'ENABLED': False, 'OPT_IN': False, 'PREFIX': '/api/', **getattr(settings, 'SERVER_TIMING', {})}
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.active = None
+        self.nested = 0.0
+        self.total = 0.0
+
+    def run(self, name, func, *args, **kwargs):
+        """Call ``func`` as phase ``name``; its time excludes the phases entered inside it"""
+        parent, parent_nested = self.active, self.nested
+        self.active, self.nested = name, 0.0
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.durations[name] += elapsed - self.nested
+            self.counts[name] += 1
+            self.active, self.nested = parent, parent_nested + elapsed
+
+    def __call__(self, execute, sql, params, many, context):
+        # Connection execute wrapper: the db phase
+        return self.run('db', execute, sql, params, many, context)
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 3),
+            'app_ms': round(max(self.total - sum(self.durations.values()), 0) * 1000, 3),
+            'queries': self.counts['db'],
+            **{f'{name}_ms': round(self.durations[name] * 1000, 3) for name in PHASES},
+        }
+
+    def header(self):
+        values = self.as_dict()
+        entries = [f'{name};dur={values[f"{name}_ms"]}' for name in ('total', 'app', *PHASES)]
+        entries[2] += f';desc="{self.counts["db"]} queries"'
+        return ', '.join(entries)
+
+
+def timed(name):
+    """Decorator: calls of the function count towards phase ``name`` of the measured request"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            # Calls nested in the same phase are already counted
+            if timings is None or timings.active == name:
+                return func(*args, **kwargs)
+            return timings.run(name, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer whose work counts as the serializer phase"""
+
+    @timed('serializer')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+    @timed('serializer')
+    def to_internal_value(self, data):
+        return super().to_internal_value(data)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class TimedBrowsableAPIRenderer(BrowsableAPIRenderer):
+    @timed('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class ServerTimingMiddleware:
+    """Measure /api/ requests of staff users or that opt in (see module docstring)
+
+    Goes after AuthenticationMiddleware; queries made before it (loading
+    the session and user) are not counted.
+    """
+
+    def __init__(self, get_response):
+        options = timing_settings()
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.opt_in = options['OPT_IN']
+        self.prefix = options['PREFIX']
+
+    def measured(self, request):
+        if not request.path.startswith(self.prefix):
+            return False
+        if self.opt_in and (request.META.get(OPT_IN_HEADER) or request.GET.get(OPT_IN_PARAM)):
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+
+    def __call__(self, request):
+        if not self.measured(request):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - started
+            _current.reset(token)
+
+        response['Server-Timing'] = timings.header()
+        if not logger.isEnabledFor(logging.INFO):
+            return response
+        values = timings.as_dict()
+        logger.info(
+            'method=%s path=%s status=%s %s', request.method, request.path, response.status_code,
+            ' '.join(f'{key}={value}' for key, value in values.items()),
+            extra={'server_timing': {'method': request.method, 'path': request.path,
+                                     'status': response.status_code, **values}},
+        )
+        return response
@@ -0,0 +1,106 @@
+"""
+Upload limits enforced while the request body streams in.
+
+``MediaLimitUploadHandler`` sits in front of Django's temporary-file handler
+and knows the size and format constraints of every file field in this app
+(``HomeSlider.video`` by its size validator, ImageFields by
+``IMAGE_UPLOAD_MAX_SIZE``). It counts bytes as chunks arrive and checks the
+magic bytes of the first chunk, and stops reading the request as soon as an
+upload is too large or is not the expected kind of file, so the rest of the
+body never reaches disk. The rejection is recorded on the request and turned
+into a 413/415 response by ``api.middleware.UploadLimitMiddleware``.
+"""
+import functools
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import models
+from django.template.defaultfilters import filesizeformat
+
+from .models import MAX_VIDEO_SIZE, validate_video_file_size
+
+IMAGE_UPLOAD_MAX_SIZE = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+SNIFF_BYTES = 16
+
+UploadRule = namedtuple('UploadRule', ['limit', 'kinds'])
+UploadRejection = namedtuple('UploadRejection', ['status', 'field', 'message'])
+
+# Top-level boxes an MP4/MOV file may start with
+MP4_LEADING_BOXES = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide'}
+
+
+def is_image(head):
+    return (
+        head.startswith((b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a', b'BM', b'II*\x00', b'MM\x00*'))
+        or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+        # HEIF/AVIF: leave it to Pillow whether it can decode them
+        or (head[4:8] == b'ftyp' and head[8:12] in (b'heic', b'heix', b'mif1', b'avif'))
+    )
+
+
+def is_mp4(head):
+    return head[4:8] in MP4_LEADING_BOXES
+
+
+SIGNATURES = {'image': is_image, 'video': is_mp4}
+
+
+@functools.lru_cache(maxsize=None)
+def upload_rules():
+    """{form field name: UploadRule} derived from the app's file fields"""
+    rules = {}
+    for model in apps.get_app_config('api').get_models():
+        for field in model._meta.fields:
+            if isinstance(field, models.ImageField):
+                rule = UploadRule(IMAGE_UPLOAD_MAX_SIZE, frozenset(['image']))
+            elif isinstance(field, models.FileField) and validate_video_file_size in field.validators:
+                rule = UploadRule(MAX_VIDEO_SIZE, frozenset(['video']))
+            else:
+                continue
+            # Form field names are shared between models; keep the most permissive rule
+            existing = rules.get(field.name)
+            if existing:
+                rule = UploadRule(max(existing.limit, rule.limit), existing.kinds | rule.kinds)
+            rules[field.name] = rule
+    return rules
+
+
+class MediaLimitUploadHandler(FileUploadHandler):
+    """Abort the upload of an oversized or mislabelled media file mid-stream"""
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.rule = upload_rules().get(field_name)
+        self.received = 0
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rule is None:
+            return raw_data
+        self.received += len(raw_data)
+        if self.received > self.rule.limit:
+            self.reject(413, f'{self.file_name} is larger than the {filesizeformat(self.rule.limit)} limit for {self.field_name}.')
+        if self.head is not None:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self.check_format()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.rule is not None and self.head is not None:
+            # Files shorter than SNIFF_BYTES
+            self.check_format()
+        return None
+
+    def check_format(self):
+        head, self.head = self.head, None
+        if not any(SIGNATURES[kind](head) for kind in self.rule.kinds):
+            expected = ' or '.join(sorted(self.rule.kinds))
+            self.reject(415, f'{self.file_name} is not a valid {expected} file.')
+
+    def reject(self, status, message):
+        self.request.upload_rejection = UploadRejection(status, self.field_name, message)
+        # Stop reading the body right away; nothing more is written to disk
+        raise StopUpload(connection_reset=True)
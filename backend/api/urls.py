@@ -4,7 +4,8 @@ from .views import (
     ProgramViewSet, GalleryViewSet, TestimonialViewSet, EventViewSet,
     BranchViewSet, InquiryViewSet, BlogViewSet, TeamMemberViewSet,
     FAQViewSet, SettingViewSet, AboutPageViewSet, AboutFeatureViewSet,
-    HomeSliderViewSet, HomeStatsViewSet, AdmissionViewSet
+    HomeSliderViewSet, HomeStatsViewSet, AdmissionViewSet, BundleViewSet, SearchViewSet, CacheStatsView,
+    IngestStatsView, ProfileDownloadView, ProfileListView
 )
 
 router = DefaultRouter()
@@ -23,7 +24,13 @@ router.register(r'about-features', AboutFeatureViewSet)
 router.register(r'home-slider', HomeSliderViewSet)
 router.register(r'home-stats', HomeStatsViewSet)
 router.register(r'admissions', AdmissionViewSet)
+router.register(r'bundles', BundleViewSet, basename='bundle')
+router.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('ingest/stats/', IngestStatsView.as_view(), name='ingest-stats'),
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', ProfileDownloadView.as_view(), name='profile-detail'),
     path('', include(router.urls)),
 ]
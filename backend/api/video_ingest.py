@@ -0,0 +1,178 @@
+"""
+Background ingest of HomeSlider videos.
+
+The admin only moves the uploaded file into a local staging directory and
+records a ``VideoIngestJob``; ``manage.py process_video_ingest`` then
+validates the video, extracts a poster frame when none was supplied, uploads
+both to the configured storage and marks the slide ready. Staging is a local
+directory, so the worker must run on the same host as the web process (see
+start.sh).
+"""
+import logging
+import os
+import struct
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.move import file_move_safe
+from django.db import transaction
+from django.utils import timezone
+
+from .models import HomeSlider, VideoIngestJob, validate_video_file_size
+from .mp4 import MP4Error, probe_video
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = getattr(settings, 'VIDEO_INGEST_STAGING_DIR', os.path.join(settings.BASE_DIR, 'media_staging'))
+MAX_ATTEMPTS = getattr(settings, 'VIDEO_INGEST_MAX_ATTEMPTS', 3)
+# Jobs left in "processing" longer than this are assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=getattr(settings, 'VIDEO_INGEST_STALE_MINUTES', 15))
+MAX_DURATION = 15  # seconds
+
+
+def stage_upload(upload):
+    """Move an uploaded file into the staging directory; returns its path"""
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    extension = os.path.splitext(upload.name)[1].lower()
+    path = os.path.join(STAGING_DIR, f'{uuid.uuid4().hex}{extension}')
+    if hasattr(upload, 'temporary_file_path'):
+        file_move_safe(upload.temporary_file_path(), path)
+    else:
+        with open(path, 'wb') as destination:
+            for chunk in upload.chunks():
+                destination.write(chunk)
+    return path
+
+
+def enqueue_video_ingest(slider, upload):
+    """Stage ``upload`` for ``slider`` and queue it for the ingest worker"""
+    path = stage_upload(upload)
+    with transaction.atomic():
+        for job in VideoIngestJob.objects.filter(slider=slider, status='pending'):
+            discard_staged_file(job.staged_path)
+            job.status = 'superseded'
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'finished_at'])
+        return VideoIngestJob.objects.create(
+            slider=slider, staged_path=path, original_name=os.path.basename(upload.name)
+        )
+
+
+def discard_staged_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def probe_duration(path):
+    """Duration of the video at ``path`` in seconds, or None if unknown"""
+    try:
+        return probe_video(path).duration
+    except (MP4Error, OSError, struct.error):
+        return None
+
+
+def extract_poster(path, duration=None):
+    """JPEG bytes of a representative frame, or None if no decoder is available"""
+    try:
+        import cv2
+    except ImportError:
+        logger.info('OpenCV not installed; skipping poster extraction for %s', path)
+        return None
+    capture = cv2.VideoCapture(path)
+    try:
+        # A frame shortly after the start avoids black fade-in frames
+        position = min(1.0, duration / 10) if duration else 0
+        capture.set(cv2.CAP_PROP_POS_MSEC, position * 1000)
+        ok, frame = capture.read()
+        if not ok:
+            return None
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return encoded.tobytes() if ok else None
+    finally:
+        capture.release()
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to "processing" and return it"""
+    stale = timezone.now() - STALE_AFTER
+    VideoIngestJob.objects.filter(status='processing', started_at__lt=stale).update(status='pending')
+    for job in VideoIngestJob.objects.filter(status='pending').order_by('created_at')[:10]:
+        claimed = VideoIngestJob.objects.filter(pk=job.pk, status='pending').update(
+            status='processing', started_at=timezone.now(), attempts=job.attempts + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def set_slider_status(slider, status, error=''):
+    HomeSlider.objects.filter(pk=slider.pk).update(ingest_status=status, ingest_error=error)
+
+
+def process_job(job):
+    slider = job.slider
+    set_slider_status(slider, 'processing')
+    try:
+        with open(job.staged_path, 'rb') as handle:
+            staged = File(handle, name=job.original_name)
+            validate_video_file_size(staged)
+
+            duration = probe_duration(job.staged_path)
+            if duration is not None and duration > MAX_DURATION:
+                raise ValidationError(
+                    f'Video duration is {duration:.1f} seconds. Maximum allowed duration is {MAX_DURATION} seconds.'
+                )
+
+            if not slider.video_poster:
+                poster = extract_poster(job.staged_path, duration)
+                if poster:
+                    poster_name = f'{os.path.splitext(job.original_name)[0]}.jpg'
+                    slider.video_poster.save(poster_name, ContentFile(poster), save=False)
+
+            # The slow part: upload to the configured storage (Cloudinary in production)
+            slider.video.save(job.original_name, staged, save=False)
+    except Exception as exc:
+        message = '; '.join(exc.messages) if isinstance(exc, ValidationError) else str(exc)
+        retry = not isinstance(exc, (ValidationError, FileNotFoundError)) and job.attempts < MAX_ATTEMPTS
+        logger.exception('Video ingest job %s failed', job.pk)
+        job.status = 'pending' if retry else 'failed'
+        job.error = message
+        job.finished_at = None if retry else timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        if not retry:
+            discard_staged_file(job.staged_path)
+        set_slider_status(slider, 'pending' if retry else 'failed', '' if retry else message)
+        return False
+
+    slider.ingest_status = 'ready'
+    slider.ingest_error = ''
+    # Regular save: refreshes resolved media URLs and invalidates cached payloads
+    slider.save(update_fields=['video', 'video_poster', 'ingest_status', 'ingest_error', 'updated_at'])
+    job.status = 'done'
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    discard_staged_file(job.staged_path)
+    return True
+
+
+def run_worker(once=False, interval=5):
+    """Process jobs until interrupted (or until the queue is empty with ``once``)"""
+    processed = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            if once:
+                return processed
+            time.sleep(interval)
+            continue
+        process_job(job)
+        processed += 1
@@ -1,9 +1,20 @@
-from rest_framework import viewsets, status
+import os
+from collections.abc import Iterator
+
+from rest_framework import mixins, viewsets, status
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
 from .models import (
     Program, Gallery, Testimonial, Event, Branch, 
     Inquiry, Blog, TeamMember, FAQ, Setting,
@@ -13,25 +24,39 @@ from .serializers import (
     ProgramSerializer, GallerySerializer, TestimonialSerializer, 
     EventSerializer, BranchSerializer, InquirySerializer, 
     BlogSerializer, TeamMemberSerializer, FAQSerializer, SettingSerializer,
-    AboutPageSerializer, AboutFeatureSerializer, HomeSliderSerializer, HomeStatsSerializer, AdmissionSerializer
+    AboutPageSerializer, AboutFeatureSerializer, HomeSliderSerializer, HomeStatsSerializer, AdmissionSerializer,
+    SearchDocumentSerializer
 )
-
-
-class ProgramViewSet(viewsets.ReadOnlyModelViewSet):
+from . import analytics
+from .batch import bulk_import
+from .bundles import BUNDLES, get_bundle
+from .cache import CachedResponseMixin, CachedViewMixin, cached_view, response_cache
+from .conditional import ConditionalGetMixin, conditional_view, DEFAULT_CACHE_CONTROL
+from .export import ADMISSION_COLUMNS, INQUIRY_COLUMNS, ExportMixin
+from .ingest import IngestCreateMixin, lag as ingest_lag
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS, render_metrics
+from .parsers import NDJSONParser
+from .profiling import PROFILING, get_profile, list_profiles
+from .search import FullTextSearchFilter, SearchRankOrderingFilter
+from .search_index import SEARCH_TYPES, TYPES_BY_NAME, search
+
+
+class ProgramViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Program.objects.all()
     serializer_class = ProgramSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
 
 
-class GalleryViewSet(viewsets.ReadOnlyModelViewSet):
+class GalleryViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Gallery.objects.all()
     serializer_class = GallerySerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['type', 'category']
     search_fields = ['title', 'category']
     ordering_fields = ['title', 'created_at']
+    cursor_ordering = '-created_at'
     
     def get_serializer_context(self):
         """Pass request to serializer for building absolute URLs"""
@@ -40,29 +65,43 @@ class GalleryViewSet(viewsets.ReadOnlyModelViewSet):
         return context
 
 
-class TestimonialViewSet(viewsets.ReadOnlyModelViewSet):
+class TestimonialViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Testimonial.objects.all()
     serializer_class = TestimonialSerializer
     filter_backends = [OrderingFilter]
     ordering_fields = ['rating', 'created_at']
 
 
-class EventViewSet(viewsets.ReadOnlyModelViewSet):
+class EventViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     search_fields = ['title', 'description']
     ordering_fields = ['date', 'created_at']
+    cursor_ordering = '-created_at'
+    cursor_fields = ['date']
+    # "Upcoming" depends on the clock, not only on Event writes
+    cache_timeout = 60
+
+    def get_upcoming_queryset(self):
+        from django.utils import timezone
+        return Event.objects.filter(date__gte=timezone.now())
+
+    def get_validator_queryset(self):
+        if self.action == 'upcoming':
+            return self.get_upcoming_queryset()
+        return super().get_validator_queryset()
 
     @action(detail=False, methods=['get'])
+    @conditional_view
+    @cached_view
     def upcoming(self, request):
-        from django.utils import timezone
-        upcoming_events = Event.objects.filter(date__gte=timezone.now())
+        upcoming_events = self.get_upcoming_queryset()
         serializer = self.get_serializer(upcoming_events, many=True)
         return Response(serializer.data)
 
 
-class BranchViewSet(viewsets.ReadOnlyModelViewSet):
+class BranchViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Branch.objects.all()
     serializer_class = BranchSerializer
     filter_backends = [SearchFilter, OrderingFilter]
@@ -70,41 +109,52 @@ class BranchViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['name']
 
 
-class InquiryViewSet(viewsets.ModelViewSet):
-    queryset = Inquiry.objects.all()
+class InquiryViewSet(IngestCreateMixin, ExportMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+    # Public POST; the only read is the staff export (inquiries are listed in the admin)
+    queryset = Inquiry.objects.select_related('branch')
     serializer_class = InquirySerializer
-    http_method_names = ['post']  # Only allow POST for creating inquiries
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
+    filterset_fields = ['branch']
+    search_fields = ['parent_name', 'phone', 'message']
+    ordering_fields = ['created_at', 'parent_name']
+    ordering = ['-created_at']
+    export_columns = INQUIRY_COLUMNS
+    export_filename = 'inquiries'
 
-    permission_classes = [AllowAny]
+    def get_permissions(self):
+        if self.action in ['create']:
+            return [AllowAny()]
+        return [IsAdminUser()]
 
-    def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
+    def created_response(self, instance):
         return Response(
             {'message': 'Inquiry submitted successfully!'}, 
-            status=status.HTTP_201_CREATED, 
-            headers=headers
+            status=status.HTTP_201_CREATED,
         )
 
 
-class BlogViewSet(viewsets.ReadOnlyModelViewSet):
+class BlogViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Blog.objects.all()
     serializer_class = BlogSerializer
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [FullTextSearchFilter, SearchRankOrderingFilter]
     search_fields = ['title', 'excerpt', 'content']
     ordering_fields = ['created_at', 'title']
+    cursor_ordering = '-created_at'
 
     @action(detail=True, methods=['get'])
+    @conditional_view
+    @cached_view
     def related(self, request, pk=None):
         blog = self.get_object()
-        related_blogs = Blog.objects.exclude(pk=blog.pk)[:3]
+        # Precomputed by api/similarity.py; newest posts until the index is built
+        related_blogs = list(Blog.objects.filter(neighbour_of__blog=blog).order_by('neighbour_of__rank')[:3])
+        if not related_blogs:
+            related_blogs = Blog.objects.exclude(pk=blog.pk)[:3]
         serializer = self.get_serializer(related_blogs, many=True)
         return Response(serializer.data)
 
 
-class TeamMemberViewSet(viewsets.ReadOnlyModelViewSet):
+class TeamMemberViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = TeamMember.objects.all()
     serializer_class = TeamMemberSerializer
     filter_backends = [SearchFilter, OrderingFilter]
@@ -112,15 +162,15 @@ class TeamMemberViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['name', 'created_at']
 
 
-class FAQViewSet(viewsets.ReadOnlyModelViewSet):
+class FAQViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = FAQ.objects.all()
     serializer_class = FAQSerializer
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [FullTextSearchFilter, SearchRankOrderingFilter]
     search_fields = ['question', 'answer']
     ordering_fields = ['order', 'question']
 
 
-class SettingViewSet(viewsets.ReadOnlyModelViewSet):
+class SettingViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Setting.objects.all()
     serializer_class = SettingSerializer
     filter_backends = [SearchFilter, OrderingFilter]
@@ -128,10 +178,12 @@ class SettingViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['key']
 
 
-class AboutPageViewSet(viewsets.ReadOnlyModelViewSet):
+class AboutPageViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = AboutPage.objects.all()
     serializer_class = AboutPageSerializer
     
+    @conditional_view
+    @cached_view
     def list(self, request, *args, **kwargs):
         # Return the first (and only) AboutPage instance
         about_page = AboutPage.objects.first()
@@ -154,7 +206,7 @@ class AboutPageViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(default_data)
 
 
-class AboutFeatureViewSet(viewsets.ReadOnlyModelViewSet):
+class AboutFeatureViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = AboutFeature.objects.filter(is_active=True)
     serializer_class = AboutFeatureSerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
@@ -162,6 +214,8 @@ class AboutFeatureViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['order', 'title']
     
     @action(detail=False, methods=['get'])
+    @conditional_view
+    @cached_view
     def by_category(self, request):
         """Get features grouped by category"""
         features = self.get_queryset()
@@ -176,33 +230,38 @@ class AboutFeatureViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(grouped_features)
 
 
-class HomeSliderViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = HomeSlider.objects.filter(is_active=True)
+class HomeSliderViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    # Slides whose first video is still being ingested are not live yet;
+    # slides replacing a video keep serving the previous one meanwhile
+    queryset = HomeSlider.objects.filter(is_active=True).filter(
+        Q(ingest_status='ready') | (Q(video__isnull=False) & ~Q(video=''))
+    )
     serializer_class = HomeSliderSerializer
     ordering = ['order', 'title']
+    # Never serve stale slides: browsers/CDNs must revalidate on every use,
+    # which costs a 304 instead of the full payload when nothing changed
+    cache_control = 'no-cache, must-revalidate'
 
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        # Prevent stale caching by browsers/CDNs
-        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response['Pragma'] = 'no-cache'
-        return response
 
-
-class HomeStatsViewSet(viewsets.ReadOnlyModelViewSet):
+class HomeStatsViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = HomeStats.objects.filter(is_active=True)
     serializer_class = HomeStatsSerializer
     ordering = ['order', 'stat_type']
 
 
-class AdmissionViewSet(viewsets.ModelViewSet):
+class AdmissionViewSet(IngestCreateMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Admission.objects.all()
     serializer_class = AdmissionSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     filterset_fields = ['status', 'preferred_program', 'student_gender']
     search_fields = ['student_first_name', 'student_last_name', 'parent_first_name', 'parent_last_name', 'parent_email']
     ordering_fields = ['submitted_at', 'student_first_name', 'student_last_name']
     ordering = ['-submitted_at']
+    cursor_ordering = '-submitted_at'
+    batch_chunk_size = 500
+    batch_max_rows = 10000
+    export_columns = ADMISSION_COLUMNS
+    export_filename = 'admissions'
     
     def get_permissions(self):
         # Public can create; only admins can list/retrieve/update/destroy
@@ -213,3 +272,171 @@ class AdmissionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Only admins may access queryset (enforced by permissions above)
         return super().get_queryset()
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def batch(self, request):
+        """Create many admissions at once, e.g. paper forms keyed in by a branch office
+
+        Takes a JSON array, or NDJSON (application/x-ndjson) processed as it
+        streams in. Valid rows are created even when others fail; ``ids`` is
+        aligned with the input rows (null for failures) and ``errors`` lists
+        the failed rows with their field errors. Answers 201 when rows were
+        created, 400 when every row failed and 200 for an empty input.
+        """
+        rows = request.data
+        if not isinstance(rows, (list, Iterator)):
+            raise ValidationError({'non_field_errors': ['Expected a list of admissions.']})
+        result = bulk_import(
+            self.get_serializer_class(), rows, context=self.get_serializer_context(),
+            chunk_size=self.batch_chunk_size, max_rows=self.batch_max_rows,
+        )
+        # bulk_create sends no signals
+        analytics.record_created(result.objects)
+        data = result.as_data()
+        if result.truncated:
+            data['detail'] = f'Only the first {self.batch_max_rows} rows were processed.'
+        if result.created:
+            code = status.HTTP_201_CREATED
+        elif result.errors:
+            # Every row failed
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            # Empty input: nothing to create is not an error
+            code = status.HTTP_200_OK
+        return Response(data, status=code)
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """Admission counts by status, program and gender, per month and by age at start
+
+        Read from the AdmissionStat summary (api/analytics.py), not the
+        Admission table. ``?months=`` sets the length of the monthly series
+        (default 12); ``status``, ``preferred_program`` and ``student_gender``
+        filter like the list.
+        """
+        try:
+            months = int(request.query_params.get('months', 12))
+        except ValueError:
+            raise ValidationError({'months': ['A whole number is required.']})
+        if not 1 <= months <= analytics.MAX_MONTHS:
+            raise ValidationError({'months': [f'Choose between 1 and {analytics.MAX_MONTHS}.']})
+        filters = {
+            field: request.query_params[field] for field in analytics.FILTER_FIELDS if request.query_params.get(field)
+        }
+        return Response(analytics.cached_summary(months=months, filters=filters))
+
+
+class BundleViewSet(viewsets.ViewSet):
+    """Several read-only endpoints composed into one cached JSON document"""
+    permission_classes = [AllowAny]
+
+    def list(self, request):
+        return Response(sorted(BUNDLES))
+
+    def retrieve(self, request, pk=None):
+        bundle = get_bundle(pk)
+        if bundle is None:
+            raise Http404
+        content, etag, last_modified = bundle.render(request._request)
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = DEFAULT_CACHE_CONTROL
+        return response
+
+
+class SearchViewSet(CachedViewMixin, viewsets.ViewSet):
+    """Ranked, typed hits across all public content from one index query
+
+    ``?q=`` is the query, ``?types=blog,event`` restricts the types,
+    ``?per_type=`` caps the hits of each type and ``?limit=`` the total.
+    """
+    permission_classes = [AllowAny]
+    cache_models = [search_type.model for search_type in SEARCH_TYPES]
+    default_per_type, max_per_type = 5, 20
+    default_limit, max_limit = 20, 50
+
+    def bounded_int(self, request, name, default, maximum):
+        value = request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({name: 'A whole number is required.'})
+        return max(1, min(value, maximum))
+
+    @cached_view
+    def list(self, request):
+        text = request.query_params.get('q', '').strip()
+        types = [name for name in request.query_params.get('types', '').split(',') if name]
+        unknown = sorted(set(types) - set(TYPES_BY_NAME))
+        if unknown:
+            raise ValidationError({'types': f"Unknown types: {', '.join(unknown)}. Choose from {', '.join(TYPES_BY_NAME)}."})
+        per_type = self.bounded_int(request, 'per_type', self.default_per_type, self.max_per_type)
+        limit = self.bounded_int(request, 'limit', self.default_limit, self.max_limit)
+
+        terms = text.replace(',', ' ').split()
+        hits = search(text, terms, types, per_type, limit) if terms else []
+        serializer = SearchDocumentSerializer(hits, many=True, context={'request': request})
+        return Response({'query': text, 'results': serializer.data})
+
+
+class IngestStatsView(APIView):
+    """Backlog and throughput of the submission journal (see api/ingest.py)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(ingest_lag())
+
+
+class ProfileListView(APIView):
+    """Stored request profiles, newest first (see api/profiling.py)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+
+class ProfileDownloadView(APIView):
+    """Download a stored profile: pstats, or collapsed stacks"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = get_profile(profile_id)
+        if profile is None:
+            raise Http404
+        path = os.path.join(PROFILING['DIR'], profile['file'])
+        try:
+            handle = open(path, 'rb')
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(handle, as_attachment=True, filename=profile['file'])
+
+
+class CacheStatsView(APIView):
+    """Response cache hit/miss statistics for this worker and, with a shared tier, the deployment"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'worker': response_cache.stats.snapshot(),
+            'shared': response_cache.stats.shared_snapshot(),
+            'local_entries': len(response_cache.local),
+        })
+
+
+def metrics(request):
+    """Prometheus metrics of all workers (api/metrics.py), for staff or ``Authorization: Bearer <METRICS['TOKEN']>``"""
+    if not METRICS['ENABLED']:
+        raise Http404
+    token = METRICS['TOKEN']
+    authorized = request.user.is_staff or (
+        token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    )
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
@@ -13,6 +13,18 @@ pip install -r requirements_render.txt
 # Run migrations
 python manage.py migrate --noinput
 
+# Store resolved media URLs for rows saved before they were tracked
+python manage.py backfill_media_urls
+
+# Rebuild the site-wide search index behind /api/search/
+python manage.py rebuild_search_index
+
+# Precompute related blog posts
+python manage.py rebuild_related_blogs
+
+# Rebuild the admission summary behind /api/admissions/analytics/
+python manage.py recompute_admission_stats
+
 # Collect static files
 python manage.py collectstatic --noinput
 
@@ -269,17 +269,25 @@ cloudinary.config(
 # e.g. 'https://res.cloudinary.com/<cloud>/image/upload/v<ver>/placeholders/default.jpg'
 CLOUDINARY_PLACEHOLDER_URL = os.getenv('CLOUDINARY_PLACEHOLDER_URL', '')
 
+# Widths (px) of the responsive image variants exposed as *_variants in the API
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+
 # -----------------------------
 # MIDDLEWARE
 # -----------------------------
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',  # request counts/latency for /metrics; first, to time everything below
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # serve static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api.middleware.UploadLimitMiddleware',  # reject oversized/bogus uploads before the view
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',  # staff: ?profile=1 or ?profile=sample
+    'api.timing.ServerTimingMiddleware',  # Server-Timing headers when SERVER_TIMING['ENABLED']
+    'api.querycheck.RepeatedQueryMiddleware',  # DEBUG only: warn about per-row queries
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -372,22 +380,97 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100 MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100 MB
 
-# Stream large uploads to temporary files (helps avoid memory spikes/timeouts)
+# Stream large uploads to temporary files (helps avoid memory spikes/timeouts);
+# media size/format limits are enforced while the bytes arrive
 FILE_UPLOAD_HANDLERS = [
+    'api.uploadhandlers.MediaLimitUploadHandler',
     'django.core.files.uploadhandler.TemporaryFileUploadHandler',
 ]
+IMAGE_UPLOAD_MAX_SIZE = int(os.getenv('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024))  # 10 MB
+
+# HomeSlider videos are staged locally and uploaded by `manage.py process_video_ingest`
+VIDEO_INGEST_STAGING_DIR = os.getenv('VIDEO_INGEST_STAGING_DIR', str(BASE_DIR / 'media_staging'))
+
+# Inquiry/Admission POSTs: 'sync' inserts in the request; 'queue' journals validated
+# submissions locally and answers 202, and `manage.py drain_submissions` inserts them.
+# 'queue' also needs REDIS_URL (a cache shared by the workers); without it, 'sync' is used
+SUBMISSION_INGEST_MODE = os.getenv('SUBMISSION_INGEST_MODE', 'sync')
+SUBMISSION_QUEUE_DIR = os.getenv('SUBMISSION_QUEUE_DIR', str(BASE_DIR / 'submission_queue'))
 
 # -----------------------------
 # REST FRAMEWORK
 # -----------------------------
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page numbers, or keyset pages with ?cursor on views that set cursor_ordering
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.FlexiblePagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # The stock renderers, timed for Server-Timing headers
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.timing.TimedJSONRenderer',
+        'api.timing.TimedBrowsableAPIRenderer',
+    ],
+}
+
+# Server-Timing headers (db, serializer, storage, render) and an 'api.timing' log
+# line for /api/ requests of staff users, and with OPT_IN for any request sending
+# an X-Server-Timing header. Disabled, the middleware isn't installed at all.
+SERVER_TIMING = {
+    'ENABLED': os.getenv('SERVER_TIMING_ENABLED', '0') == '1',
+    'OPT_IN': os.getenv('SERVER_TIMING_OPT_IN', '0') == '1',
+}
+
+# -----------------------------
+# CACHES / API RESPONSE CACHE
+# -----------------------------
+# Set REDIS_URL to share cached API payloads between gunicorn workers.
+# Without it each worker keeps its own bounded in-process cache; invalidation
+# is always consistent because content versions are stored in the database.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+API_CACHE = {
+    'ENABLED': os.getenv('API_CACHE_ENABLED', '1') == '1',
+    'MAX_ENTRIES': int(os.getenv('API_CACHE_MAX_ENTRIES', '512')),
+    'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', '300')),
+    'SHARED_ALIAS': 'default' if REDIS_URL else None,
+}
+
+# Public endpoints emit ETag/Last-Modified; clients revalidate and get 304s
+API_CACHE_CONTROL = 'no-cache'
+
+# Prometheus metrics at /metrics (api/metrics.py). Every worker writes its totals
+# to METRICS_DIR, which the workers of a host must share; scrapers send
+# 'Authorization: Bearer <METRICS_TOKEN>' (staff sessions work too).
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', '1') == '1',
+    'DIR': os.getenv('METRICS_DIR', str(BASE_DIR / 'metrics')),
+    'FLUSH_INTERVAL': int(os.getenv('METRICS_FLUSH_INTERVAL', '10')),  # seconds
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+}
+
+# DEBUG: warn when one request runs this many queries differing only in their
+# parameters (api/querycheck.py); `manage.py check_query_budgets` guards every route
+REPEATED_QUERY_THRESHOLD = int(os.getenv('REPEATED_QUERY_THRESHOLD', '5'))
+
+# Staff can profile a request with ?profile=1 (cProfile) or ?profile=sample (stack
+# sampling); profiles are kept in PROFILING_DIR, the newest MAX_PROFILES of the
+# last MAX_AGE_DAYS, and listed at /api/profiles/ and by `manage.py profiles`.
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING_ENABLED', '1') == '1',
+    'DIR': os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles')),
+    'MAX_PROFILES': int(os.getenv('PROFILING_MAX_PROFILES', '200')),
+    'MAX_AGE_DAYS': int(os.getenv('PROFILING_MAX_AGE_DAYS', '7')),
 }
 
 # -----------------------------
@@ -411,6 +494,13 @@ except:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
     DEFAULT_FROM_EMAIL = 'noreply@kidoopreschool.com'
 
+# Digests of new admissions/inquiries, sent by `manage.py send_staff_notifications`.
+# Branches can add their own addresses (Branch.notification_emails).
+STAFF_NOTIFICATION_RECIPIENTS = [email.strip() for email in os.getenv('STAFF_NOTIFICATION_RECIPIENTS', '').split(',') if email.strip()]
+STAFF_NOTIFICATION_INTERVAL = int(os.getenv('STAFF_NOTIFICATION_INTERVAL', 15))  # minutes
+# e.g. 'django.core.mail.backends.filebased.EmailBackend' (with EMAIL_FILE_PATH) locally
+STAFF_NOTIFICATION_EMAIL_BACKEND = os.getenv('STAFF_NOTIFICATION_EMAIL_BACKEND', EMAIL_BACKEND)
+
 # -----------------------------
 # DEFAULT PK FIELD
 # -----------------------------
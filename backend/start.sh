@@ -1,11 +1,33 @@
 #!/usr/bin/env bash
-# Start script for Render.com deployment
+# Start script for every deployment (Render, Procfile/Railway, Docker): the
+# background workers and the web server must run together on one host, since
+# the workers read directories the web process writes locally.
+# Extra arguments are passed to gunicorn, e.g. start.sh --workers 3
 
-# Change to backend directory
-cd backend
+# Always run from this script's directory (the backend folder)
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+cd "$SCRIPT_DIR"
 
-# Set Django settings module
-export DJANGO_SETTINGS_MODULE=kidoo_preschool.settings_production
+# Restart a worker command whenever it exits, e.g. after a lost database connection
+supervise() {
+    while true; do
+        python manage.py "$@"
+        echo "manage.py $1 exited with status $?; restarting in 5s" >&2
+        sleep 5
+    done
+}
+
+# Background worker for HomeSlider video uploads (reads the local staging dir)
+supervise process_video_ingest &
+
+# Inserts submissions journaled in SUBMISSION_INGEST_MODE=queue (reads the local queue dir)
+supervise drain_submissions &
+
+# Refreshes related posts after blog posts are saved or deleted (off the request path)
+supervise update_related_blogs &
+
+# Mails staff digests of new admissions/inquiries (never on the request path)
+supervise send_staff_notifications &
 
 # Start the application
-exec gunicorn kidoo_preschool.wsgi:application --bind 0.0.0.0:$PORT
+exec gunicorn kidoo_preschool.wsgi:application --bind "0.0.0.0:${PORT:-8000}" "$@"
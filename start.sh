@@ -1,4 +1,4 @@
 #!/usr/bin/env bash
-cd backend
-export DJANGO_SETTINGS_MODULE=kidoo_preschool.settings_production
-exec gunicorn kidoo_preschool.wsgi:application --bind 0.0.0.0:$PORT
+# Start script (root wrapper): runs backend/start.sh, which starts the
+# background workers next to gunicorn
+exec bash "$(dirname "$0")/backend/start.sh" "$@"